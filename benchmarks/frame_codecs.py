@@ -0,0 +1,41 @@
+"""
+Reports the bytes per frame and the encode/decode time of every frame codec
+whose dependencies are installed.
+
+Usage: python -m benchmarks.frame_codecs [-r REPEAT]
+"""
+import argparse
+
+from pipert.core.codecs import CODECS, get_codec, decode_frame
+from benchmarks.utils import RESOLUTIONS, create_frame, time_operation, format_row, mb_per_second
+
+
+def benchmark_codec(codec, frame, repeat):
+    data = codec.encode(frame)
+    encode_ns = time_operation(lambda: codec.encode(frame), repeat=repeat)
+    decode_ns = time_operation(lambda: decode_frame(codec.name, data, frame.shape, frame.dtype),
+                               repeat=repeat)
+    return len(data), encode_ns, decode_ns
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--repeat', help='Number of measured runs', type=int, default=20)
+    opts = parser.parse_args()
+
+    print(format_row("resolution", "codec", "bytes", "ratio", "encode ns", "encode MB/s",
+                     "decode ns", "decode MB/s"))
+    for resolution in RESOLUTIONS:
+        # random noise doesn't compress, use a smooth gradient instead
+        frame = create_frame(resolution)
+        frame.sort(axis=1)
+        for codec_name in CODECS:
+            try:
+                codec = get_codec(codec_name)
+            except ImportError as error:
+                print(format_row(resolution, codec_name, f"skipped: {error}"))
+                continue
+            size, encode_ns, decode_ns = benchmark_codec(codec, frame, opts.repeat)
+            print(format_row(resolution, codec_name, size, round(frame.nbytes / size, 2),
+                             round(encode_ns), mb_per_second(frame.nbytes, encode_ns),
+                             round(decode_ns), mb_per_second(frame.nbytes, decode_ns)))
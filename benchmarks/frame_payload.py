@@ -0,0 +1,61 @@
+"""
+Reports the encode/decode time of FramePayload for every frame size and
+dtype, as raw bytes and through the shared memory ring of
+MpSharedMemoryGenerator.
+
+Usage: python -m benchmarks.frame_payload [-r REPEAT]
+"""
+import argparse
+
+import numpy as np
+
+from pipert.core.message import FramePayload
+from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator
+from benchmarks.utils import RESOLUTIONS, create_frame, time_operation, format_row, mb_per_second
+
+DTYPES = (np.uint8, np.float32)
+
+
+def encoded_payload(frame, generator):
+    payload = FramePayload(frame)
+    payload.encode(generator)
+    return payload
+
+
+def decode_payload(payload):
+    # decode replaces the data, so decode a copy of the encoded state
+    decoded = FramePayload(None)
+    decoded.__dict__.update(payload.__dict__)
+    decoded.decode()
+    return decoded
+
+
+def benchmark_frame_payload(frame, generator, repeat):
+    encode_ns = time_operation(lambda: encoded_payload(frame, generator), repeat=repeat)
+    payload = encoded_payload(frame, generator)
+    decode_ns = time_operation(lambda: decode_payload(payload), repeat=repeat)
+    return encode_ns, decode_ns
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--repeat', help='Number of measured runs', type=int, default=100)
+    opts = parser.parse_args()
+
+    # the decoded payload is always the last one that was encoded, so one
+    # slot is enough
+    generator = MpSharedMemoryGenerator("bench_frame_payload", max_count=1)
+    print(format_row("resolution", "dtype", "transport", "encode ns", "encode MB/s",
+                     "decode ns", "decode MB/s"))
+    try:
+        for resolution in RESOLUTIONS:
+            for dtype in DTYPES:
+                frame = create_frame(resolution, dtype=dtype)
+                for transport, transport_generator in (("bytes", None), ("shm", generator)):
+                    encode_ns, decode_ns = benchmark_frame_payload(frame, transport_generator,
+                                                                   opts.repeat)
+                    print(format_row(resolution, np.dtype(dtype).name, transport,
+                                     round(encode_ns), mb_per_second(frame.nbytes, encode_ns),
+                                     round(decode_ns), mb_per_second(frame.nbytes, decode_ns)))
+    finally:
+        generator.cleanup()
@@ -0,0 +1,46 @@
+"""
+Compares the pickle and the binary wire formats of a Message, with the frame
+inside the message or passed through shared memory.
+
+Usage: python -m benchmarks.message_format [-r REPEAT]
+"""
+import argparse
+
+from pipert.core.message import Message, message_encode, message_decode
+from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator
+from benchmarks.utils import RESOLUTIONS, create_frame, time_operation, format_row, mb_per_second
+
+
+def benchmark_message_format(resolution, binary, repeat, generator=None):
+    frame = create_frame(resolution)
+    # the pickle path encodes the payload in place, so start from a new message
+    encode_ns = time_operation(
+        lambda: message_encode(Message(frame, "localhost"), generator=generator, binary=binary),
+        repeat=repeat)
+    # the decoded message has to be the last one that was encoded, its
+    # shared memory slot is reused by the next one
+    encoded_msg = message_encode(Message(frame, "localhost"), generator=generator, binary=binary)
+    decode_ns = time_operation(lambda: message_decode(encoded_msg, allow_pickle=True), repeat=repeat)
+    return len(encoded_msg), encode_ns, decode_ns
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--repeat', help='Number of measured runs', type=int, default=100)
+    opts = parser.parse_args()
+
+    generator = MpSharedMemoryGenerator("bench_message_format", max_count=1)
+    print(format_row("resolution", "format", "transport", "bytes", "encode ns", "encode MB/s",
+                     "decode ns", "decode MB/s"))
+    try:
+        for resolution in RESOLUTIONS:
+            frame_size = create_frame(resolution).nbytes
+            for binary in (False, True):
+                for transport, transport_generator in (("inline", None), ("shm", generator)):
+                    size, encode_ns, decode_ns = benchmark_message_format(resolution, binary, opts.repeat,
+                                                                          generator=transport_generator)
+                    print(format_row(resolution, "binary" if binary else "pickle", transport, size,
+                                     round(encode_ns), mb_per_second(frame_size, encode_ns),
+                                     round(decode_ns), mb_per_second(frame_size, decode_ns)))
+    finally:
+        generator.cleanup()
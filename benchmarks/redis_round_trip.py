@@ -0,0 +1,81 @@
+"""
+Reports the round trip time of encoded messages through a local redis
+server: one handler sends a message to a stream and another one reads it,
+for frames in every resolution and for a message whose frame is passed
+through shared memory. The batch columns are the time per message of a
+pipelined send of BATCH messages and a batched read of them. The server is taken from REDIS_URL, like the redis
+routines do.
+
+Usage: python -m benchmarks.redis_round_trip [-r REPEAT] [-b BATCH]
+"""
+import argparse
+import os
+from urllib.parse import urlparse
+
+import redis
+
+from pipert.core.message import Message, message_encode
+from pipert.core.message_handlers import RedisHandler
+from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator
+from benchmarks.utils import RESOLUTIONS, create_frame, time_operation, format_row, mb_per_second
+
+STREAM_KEY = "pipert_bench_round_trip"
+
+
+def round_trip(sender, receiver, encoded_msg):
+    sender.send(STREAM_KEY, encoded_msg)
+    return receiver.read_batch(STREAM_KEY, max_count=1, block_ms=1000)
+
+
+def batch_round_trip(sender, receiver, encoded_msgs):
+    sender.send_many(STREAM_KEY, encoded_msgs)
+    received = []
+    while len(received) < len(encoded_msgs):
+        received.extend(receiver.read_batch(STREAM_KEY, max_count=len(encoded_msgs), block_ms=1000))
+    return received
+
+
+def benchmark_round_trip(url, encoded_msg, repeat, batch):
+    sender, receiver = RedisHandler(url, maxlen=max(batch, 10)), RedisHandler(url)
+    try:
+        sender.conn.delete(STREAM_KEY)
+        # the receiver reads only what is sent after its first read
+        sender.send(STREAM_KEY, encoded_msg)
+        receiver.read_batch(STREAM_KEY, max_count=1)
+        single_ns = time_operation(lambda: round_trip(sender, receiver, encoded_msg), repeat=repeat)
+        batch_ns = time_operation(lambda: batch_round_trip(sender, receiver, [encoded_msg] * batch),
+                                  repeat=max(repeat // batch, 1)) / batch
+        sender.conn.delete(STREAM_KEY)
+    finally:
+        sender.close()
+        receiver.close()
+    return single_ns, batch_ns
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--repeat', help='Number of measured runs', type=int, default=100)
+    parser.add_argument('-b', '--batch', help='Number of messages in a pipelined send', type=int, default=10)
+    opts = parser.parse_args()
+
+    url = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
+    try:
+        redis.Redis(host=url.hostname, port=url.port).ping()
+    except redis.ConnectionError as error:
+        raise SystemExit(f"Can't connect to redis at {url.geturl()}: {error}")
+
+    generator = MpSharedMemoryGenerator("bench_redis_round_trip", max_count=1)
+    print(format_row("resolution", "transport", "bytes", "single ns", "single MB/s",
+                     "batch ns", "batch MB/s"))
+    try:
+        for resolution in RESOLUTIONS:
+            frame = create_frame(resolution)
+            for transport, transport_generator in (("inline", None), ("shm", generator)):
+                encoded_msg = message_encode(Message(frame, "localhost"), generator=transport_generator,
+                                             binary=True)
+                single_ns, batch_ns = benchmark_round_trip(url, encoded_msg, opts.repeat, opts.batch)
+                print(format_row(resolution, transport, len(encoded_msg),
+                                 round(single_ns), mb_per_second(len(encoded_msg), single_ns),
+                                 round(batch_ns), mb_per_second(len(encoded_msg), batch_ns)))
+    finally:
+        generator.cleanup()
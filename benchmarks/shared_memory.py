@@ -0,0 +1,60 @@
+"""
+Compares writing a frame into shared memory and reading it back with
+MpSharedMemoryGenerator (multiprocessing.shared_memory) and
+SharedMemoryGenerator (posix_ipc, skipped if it isn't installed).
+
+Usage: python -m benchmarks.shared_memory [-r REPEAT]
+"""
+import argparse
+
+from pipert.core.message import _write_frame, _read_frame
+from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator
+from benchmarks.utils import RESOLUTIONS, create_frame, time_operation, format_row, mb_per_second
+
+
+def benchmark_mp_generator(frame, repeat):
+    generator = MpSharedMemoryGenerator("bench_mp_shm", max_count=1)
+    try:
+        write_ns = time_operation(lambda: _write_frame(frame, generator), repeat=repeat)
+        memory_name, sequence = _write_frame(frame, generator)
+        read_ns = time_operation(lambda: _read_frame(memory_name, frame.shape, frame.dtype,
+                                                     frame.nbytes, sequence=sequence),
+                                 repeat=repeat)
+    finally:
+        generator.cleanup()
+    return write_ns, read_ns
+
+
+def benchmark_posix_generator(frame, repeat):
+    from pipert.core.shared_memory import HEADER_SIZE
+    from pipert.core.shared_memory_generator import SharedMemoryGenerator
+
+    generator = SharedMemoryGenerator("bench_posix_shm", max_count=1, size=HEADER_SIZE + frame.nbytes)
+    generator.create_memories()
+    try:
+        memory = generator.shared_memories[generator.get_next_shared_memory_name()]
+        write_ns = time_operation(lambda: memory.write_frame(frame), repeat=repeat)
+        read_ns = time_operation(lambda: memory.read_frame(), repeat=repeat)
+    finally:
+        generator.cleanup()
+    return write_ns, read_ns
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-r', '--repeat', help='Number of measured runs', type=int, default=100)
+    opts = parser.parse_args()
+
+    generators = (("mp", benchmark_mp_generator), ("posix_ipc", benchmark_posix_generator))
+    print(format_row("resolution", "generator", "write ns", "write MB/s", "read ns", "read MB/s"))
+    for resolution in RESOLUTIONS:
+        frame = create_frame(resolution)
+        for generator_name, benchmark in generators:
+            try:
+                write_ns, read_ns = benchmark(frame, opts.repeat)
+            except ImportError as error:
+                print(format_row(resolution, generator_name, f"skipped: {error}"))
+                continue
+            print(format_row(resolution, generator_name,
+                             round(write_ns), mb_per_second(frame.nbytes, write_ns),
+                             round(read_ns), mb_per_second(frame.nbytes, read_ns)))
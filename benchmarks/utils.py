@@ -0,0 +1,46 @@
+import time
+import numpy as np
+
+RESOLUTIONS = {
+    "480p": (480, 640, 3),
+    "720p": (720, 1280, 3),
+    "1080p": (1080, 1920, 3),
+}
+
+
+def create_frame(resolution, dtype=np.uint8):
+    """
+    Creates a random frame in one of the RESOLUTIONS.
+    """
+    shape = RESOLUTIONS[resolution]
+    return (np.random.rand(*shape) * 255).astype(dtype)
+
+
+def time_operation(operation, repeat=100, warmup=5):
+    """
+    Runs 'operation' repeatedly and returns the average time it took in
+    nanoseconds.
+
+    Args:
+        operation: a function without parameters.
+        repeat: the amount of measured runs.
+        warmup: the amount of runs before measuring.
+    """
+    for _ in range(warmup):
+        operation()
+    start = time.perf_counter_ns()
+    for _ in range(repeat):
+        operation()
+    return (time.perf_counter_ns() - start) / repeat
+
+
+def mb_per_second(nbytes, ns):
+    """
+    Returns the throughput of an operation on 'nbytes' bytes that took 'ns'
+    nanoseconds, in megabytes per second.
+    """
+    return round(nbytes / 1e6 / (ns / 1e9), 1) if ns else float("inf")
+
+
+def format_row(*columns, width=14):
+    return "".join(str(column).ljust(width) for column in columns)
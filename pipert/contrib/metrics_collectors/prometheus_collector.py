@@ -1,23 +1,73 @@
-from prometheus_client import Histogram, start_http_server
-from prometheus_client.utils import INF
+from bisect import bisect_left
+from itertools import accumulate
+import threading
+
+from prometheus_client import Histogram, REGISTRY, start_http_server
+from prometheus_client.core import HistogramMetricFamily
+from prometheus_client.utils import INF, floatToGoString
 
 from pipert.core.metrics_collector import MetricsCollector
 
+# pipert.core.metrics_aggregator.EXECUTION_TIME_BUCKETS, and INF
+BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
+           0.1, 0.2, 0.5, 1, 2, 5, INF)
+
+
+class ExecutionTimeHistograms:
+    """
+    A prometheus collector of the routine_processing_seconds histogram of
+    every routine. The execution times are mostly added as the
+    ExecutionTimeStats of a flush interval, whose counts are already
+    bucketed over the buckets of the histogram and whose sum is the real
+    one, which a prometheus_client Histogram can't take.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (routine, component) -> [counts of the buckets, sum of the times]
+        self._histograms = {}
+
+    def add(self, routine_name, component_name, counts, sum_seconds):
+        with self._lock:
+            histogram = self._histograms.setdefault((routine_name, component_name), [[0] * len(BUCKETS), 0.0])
+            histogram[0] = [total + count for total, count in zip(histogram[0], counts)]
+            histogram[1] += sum_seconds
+
+    def observe(self, execution_time, routine_name, component_name):
+        counts = [0] * len(BUCKETS)
+        counts[bisect_left(BUCKETS, execution_time)] = 1
+        self.add(routine_name, component_name, counts, execution_time)
+
+    def collect(self):
+        family = HistogramMetricFamily('routine_processing_seconds', 'Time spent processing routine',
+                                       labels=['routine', 'component'])
+        with self._lock:
+            histograms = [(labels, list(counts), sum_seconds)
+                          for labels, (counts, sum_seconds) in self._histograms.items()]
+        for labels, counts, sum_seconds in histograms:
+            family.add_metric(list(labels),
+                              [(floatToGoString(bound), count) for bound, count in zip(BUCKETS, accumulate(counts))],
+                              sum_seconds)
+        yield family
+
 
 class PrometheusCollector(MetricsCollector):
-    buckets = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05,
-               0.1, 0.2, 0.5, 1, 2, 5, INF)
+    buckets = BUCKETS
 
-    REQUEST_TIME = Histogram('routine_processing_seconds',
-                             'Time spent processing routine',
-                             ['routine', 'component'],
-                             buckets=buckets)
+    REQUEST_TIME = ExecutionTimeHistograms()
+    REGISTRY.register(REQUEST_TIME)
 
     REQUEST_LATENCY = Histogram('message_latency',
                                 'End to end latency',
                                 ['output_component'],
                                 buckets=buckets)
 
+    STAGE_LATENCY = Histogram('stage_latency_seconds',
+                              'Time a message spent in a stage, by kind '
+                              '(queue_wait, compute or transport)',
+                              ['stage', 'kind'],
+                              buckets=buckets)
+
     def __init__(self, port):
         super().__init__()
         self.port = port
@@ -26,9 +76,17 @@ class PrometheusCollector(MetricsCollector):
         start_http_server(self.port)
 
     def collect_execution_time(self, execution_time, routine_name, component_name):
-        self.REQUEST_TIME.labels(routine=routine_name,
-                                 component=component_name) \
-            .observe(execution_time)
+        self.REQUEST_TIME.observe(execution_time, routine_name, component_name)
+
+    def collect_execution_time_stats(self, execution_times, routine_name, component_name):
+        self.REQUEST_TIME.add(routine_name, component_name, execution_times.counts,
+                              execution_times.sum_ns / 1e9)
 
     def collect_latency(self, latency, output_component):
-        self.REQUEST_LATENCY.labels(output_component=output_component).observe(latency)
\ No newline at end of file
+        self.REQUEST_LATENCY.labels(output_component=output_component).observe(latency)
+
+    def collect_latency_breakdown(self, breakdown, component_name):
+        self.collect_latency(breakdown["total"], component_name)
+        for stage in breakdown["stages"]:
+            for kind in ("queue_wait", "compute", "transport"):
+                self.STAGE_LATENCY.labels(stage=stage["stage"], kind=kind).observe(stage[kind])
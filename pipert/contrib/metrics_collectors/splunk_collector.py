@@ -21,7 +21,27 @@ class SplunkCollector(MetricsCollector):
                             "component": component_name}}
         self.HEC_sender.batchEvent(event)
 
+    def collect_execution_time_stats(self, execution_times, routine_name, component_name):
+        stats = execution_times.to_dict()
+        event = {"fields": {"metric_name:execution_time_count": stats["count"],
+                            "metric_name:execution_time_sum": stats["sum"],
+                            "metric_name:execution_time_max": stats["max"],
+                            "execution_time_buckets": stats["buckets"],
+                            "execution_time_counts": stats["counts"],
+                            "routine": routine_name,
+                            "component": component_name}}
+        self.HEC_sender.batchEvent(event)
+
     def collect_latency(self, latency, output_component):
         event = {"fields": {"metric_name:latency": latency,
                             "output_component": output_component}}
         self.HEC_sender.batchEvent(event)
+
+    def collect_latency_breakdown(self, breakdown, component_name):
+        event = {"fields": {"metric_name:latency": breakdown["total"],
+                            "metric_name:queue_wait": breakdown["queue_wait"],
+                            "metric_name:compute": breakdown["compute"],
+                            "metric_name:transport": breakdown["transport"],
+                            "stages": breakdown["stages"],
+                            "output_component": component_name}}
+        self.HEC_sender.batchEvent(event)
@@ -0,0 +1,65 @@
+import time
+from queue import Empty
+
+from pipert.core.message import Message
+from pipert.core.routine import Routine, RoutineTypes
+
+
+class CountingSink(Routine):
+    """
+    An output routine that takes the messages out of its input queue and
+    only counts them, along with their latency from the first timestamp of
+    their history, in place of the outputs of a pipeline when benchmarking
+    it.
+
+    The latencies are kept in memory, so the sink is meant to run as a
+    thread of the benchmarking process.
+    """
+    routine_type = RoutineTypes.OUTPUT
+
+    def __init__(self, in_queue, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_queue = in_queue
+        self.count = 0
+        self.latencies_ns = []
+
+    def reset(self):
+        self.count = 0
+        self.latencies_ns = []
+
+    def main_logic(self, *args, **kwargs):
+        try:
+            item = self.in_queue.get(block=False)
+        except Empty:
+            return False
+        now = time.time_ns()
+        # a routine may output a tuple of messages, like (frame, prediction)
+        messages = item if isinstance(item, tuple) else (item,)
+        messages = [msg for msg in messages if isinstance(msg, Message)]
+        self.count += 1
+        timestamps = [timestamp for msg in messages for _, _, timestamp in msg.history]
+        if timestamps:
+            self.latencies_ns.append(now - min(timestamps))
+        for msg in messages:
+            msg.record_exit(self.component_name, self.logger, pipeline_exit=True)
+        return True
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "in_queue": "QueueIn",
+        })
+        return dicts
+
+    def get_input_queues(self):
+        return [self.in_queue]
+
+    def does_routine_use_queue(self, queue):
+        return self.in_queue == queue
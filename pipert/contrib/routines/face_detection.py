@@ -3,7 +3,6 @@ from pipert.core.message import Message
 from pipert.core.routine import RoutineTypes, Routine
 from pipert.utils.structures import Instances, Boxes
 from queue import Empty
-import time
 import cv2
 import pkg_resources
 
@@ -51,7 +50,6 @@ class FaceDetection(Routine):
             return True
 
         except Empty:
-            time.sleep(0)
             return False
 
     def setup(self, *args, **kwargs):
@@ -71,6 +69,8 @@ class FaceDetection(Routine):
         })
         return dicts
 
+    def get_input_queues(self):
+        return [self.in_queue]
+
     def does_routine_use_queue(self, queue):
         return (self.in_queue == queue) or (self.out_queue == queue)
-
@@ -0,0 +1,28 @@
+from pipert.contrib.routines.classification_logic import Classifier
+from pipert.core.batch_routine import FanInBatchRoutine
+from pipert.core.routine import RoutineTypes
+
+
+class FanInClassificationLogic(FanInBatchRoutine):
+    """
+    Classifies the frames of several cameras with one model instance,
+    the predictions of every camera go to the output queue at the index of
+    its input queue.
+    """
+    routine_type = RoutineTypes.PROCESSING
+
+    def __init__(self, in_queues, out_queues, weights, *args, **kwargs):
+        super().__init__(in_queues, out_queues, *args, **kwargs)
+        self.weights = weights
+        self.classifier = Classifier(weights)
+
+    def process_batch(self, batch):
+        return self.classifier(batch)
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = FanInBatchRoutine.get_constructor_parameters()
+        dicts.update({
+            "weights": "String",
+        })
+        return dicts
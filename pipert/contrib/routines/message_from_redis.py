@@ -1,9 +1,9 @@
 import os
-import time
 from queue import Empty, Full
 from urllib.parse import urlparse
 
-from pipert.core.message_handlers import RedisHandler
+from pipert.core.message_handlers import RedisHandler, AsyncRedisHandler
+from pipert.core import tracing
 from pipert.core.message import message_decode
 from pipert.core.routine import Routine, RoutineTypes
 
@@ -11,9 +11,15 @@ from pipert.core.routine import Routine, RoutineTypes
 class MessageFromRedis(Routine):
     routine_type = RoutineTypes.INPUT
 
-    def __init__(self, redis_read_key, message_queue, *args, **kwargs):
+    def __init__(self, redis_read_key, message_queue, read_timeout_ms=100, allow_pickle=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.redis_read_key = redis_read_key
+        # how long a read waits in redis for a new message, so the routine
+        # doesn't spin while idle but still notices the stop event
+        self.read_timeout_ms = read_timeout_ms
+        # whether pickled messages are decoded too, only for trusted senders
+        # (see message_decode)
+        self.allow_pickle = allow_pickle
         self.url = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
         self.message_queue = message_queue
         self.msg_handler = None
@@ -21,24 +27,37 @@ class MessageFromRedis(Routine):
         self.negative = False
 
     def main_logic(self, *args, **kwargs):
-        encoded_msg = self.msg_handler.read_most_recent_msg(self.redis_read_key)
-        if encoded_msg:
-            msg = message_decode(encoded_msg)
-            msg.record_entry(self.component_name, self.logger)
+        encoded_msg = self.msg_handler.read_most_recent_msg(self.redis_read_key,
+                                                            block_ms=self.read_timeout_ms)
+        if not encoded_msg:
+            return False
+        self._put_msg(self._decode_msg(encoded_msg))
+        return True
+
+    def _decode_msg(self, encoded_msg):
+        """
+        Decodes a message that was read from redis and records that it was
+        received.
+        """
+        msg = message_decode(encoded_msg, allow_pickle=self.allow_pickle)
+        tracing.trace(msg, tracing.REDIS_RECEIVED)
+        msg.record_entry(self.component_name, self.logger)
+        return msg
+
+    def _put_msg(self, msg):
+        """
+        Puts a message in the queue, in place of the oldest message if the
+        queue is full.
+        """
+        try:
+            self.message_queue.put(msg, block=False)
+        except Full:
             try:
+                self.message_queue.get(block=False)
+            except Empty:
+                pass
+            finally:
                 self.message_queue.put(msg, block=False)
-                return True
-            except Full:
-                try:
-                    self.message_queue.get(block=False)
-                except Empty:
-                    pass
-                finally:
-                    self.message_queue.put(msg, block=False)
-                    return True
-        else:
-            time.sleep(0)
-            return False
 
     def setup(self, *args, **kwargs):
         self.msg_handler = RedisHandler(self.url)
@@ -46,12 +65,31 @@ class MessageFromRedis(Routine):
     def cleanup(self, *args, **kwargs):
         self.msg_handler.close()
 
+    async def async_main_logic(self):
+        encoded_msg = await self.msg_handler.read_most_recent_msg(self.redis_read_key,
+                                                                  block_ms=self.read_timeout_ms)
+        if not encoded_msg:
+            return False
+        # decompressing the frame would hold up the other routines of the
+        # event loop, only the redis I/O is awaited on it
+        self._put_msg(await self.async_runtime.run_in_executor(self._decode_msg, encoded_msg))
+        return True
+
+    async def async_setup(self):
+        self.msg_handler = AsyncRedisHandler(self.url)
+        await self.msg_handler.connect()
+
+    async def async_cleanup(self):
+        await self.msg_handler.close()
+
     @staticmethod
     def get_constructor_parameters():
         dicts = Routine.get_constructor_parameters()
         dicts.update({
             "redis_read_key": "String",
-            "message_queue": "QueueOut"
+            "message_queue": "QueueOut",
+            "read_timeout_ms": "Integer",
+            "allow_pickle": "Boolean"
         })
         return dicts
 
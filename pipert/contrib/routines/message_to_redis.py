@@ -1,8 +1,8 @@
-import time
 from queue import Empty
 from urllib.parse import urlparse
 
-from pipert.core.message_handlers import RedisHandler
+from pipert.core import tracing
+from pipert.core.message_handlers import RedisHandler, AsyncRedisHandler
 from pipert.core.message import message_encode, FramePayload
 from pipert.core.routine import Routine, RoutineTypes
 import os
@@ -13,25 +13,42 @@ import os
 class MessageToRedis(Routine):
     routine_type = RoutineTypes.OUTPUT
 
-    def __init__(self, redis_send_key, message_queue, max_stream_length, *args, **kwargs):
+    def __init__(self, redis_send_key, message_queue, max_stream_length, binary_format=True, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.redis_send_key = redis_send_key
         self.url = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
         self.message_queue = message_queue
         self.max_stream_length = max_stream_length
+        # whether the messages are sent in the binary wire format instead of
+        # pickled (see message_encode), pickled messages are only decoded by
+        # receivers that allow pickle
+        self.binary_format = binary_format
         self.msg_handler = None
 
-    def main_logic(self, *args, **kwargs):
+    def _take_msg(self):
+        """
+        Takes a message out of the queue and records that it is sent.
+
+        Returns: the message, or None if the queue is empty.
+        """
         try:
             msg = self.message_queue.get(block=False)
-            msg.record_exit(self.component_name, self.logger)
-            encoded_msg = message_encode(msg, generator=self.generator)
-            self.msg_handler.send(self.redis_send_key, encoded_msg)
-            time.sleep(0)
-            return True
         except Empty:
-            time.sleep(0)  # yield the control of the thread
+            return None
+        msg.record_exit(self.component_name, self.logger)
+        tracing.trace(msg, tracing.REDIS_SENT)
+        return msg
+
+    def _encode_msg(self, msg):
+        return message_encode(msg, generator=self.generator, binary=self.binary_format,
+                              codec=self.frame_codec)
+
+    def main_logic(self, *args, **kwargs):
+        msg = self._take_msg()
+        if msg is None:
             return False
+        self.msg_handler.send(self.redis_send_key, self._encode_msg(msg))
+        return True
 
     def setup(self, *args, **kwargs):
         self.msg_handler = RedisHandler(self.url, self.max_stream_length)
@@ -40,15 +57,36 @@ class MessageToRedis(Routine):
     def cleanup(self, *args, **kwargs):
         self.msg_handler.close()
 
+    async def async_main_logic(self):
+        msg = self._take_msg()
+        if msg is None:
+            return False
+        # compressing the frame would hold up the other routines of the
+        # event loop, only the redis I/O is awaited on it
+        encoded_msg = await self.async_runtime.run_in_executor(self._encode_msg, msg)
+        await self.msg_handler.send(self.redis_send_key, encoded_msg)
+        return True
+
+    async def async_setup(self):
+        self.msg_handler = AsyncRedisHandler(self.url, self.max_stream_length)
+        await self.msg_handler.connect()
+
+    async def async_cleanup(self):
+        await self.msg_handler.close()
+
     @staticmethod
     def get_constructor_parameters():
         dicts = Routine.get_constructor_parameters()
         dicts.update({
             "redis_send_key": "String",
             "message_queue": "QueueIn",
-            "max_stream_length": "Integer"
+            "max_stream_length": "Integer",
+            "binary_format": "Boolean"
         })
         return dicts
 
+    def get_input_queues(self):
+        return [self.message_queue]
+
     def does_routine_use_queue(self, queue):
         return self.message_queue == queue
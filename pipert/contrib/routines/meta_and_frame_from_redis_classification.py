@@ -4,39 +4,47 @@ from urllib.parse import urlparse
 from pipert.core.routine import Routine, RoutineTypes
 from queue import Empty
 import cv2
+from pipert.core import tracing
 from pipert.core.message import message_decode
 from pipert.core.message_handlers import RedisHandler
-import time
 
 
 class MetaAndFrameFromRedisClassification(Routine):
     routine_type = RoutineTypes.INPUT
 
-    def __init__(self, redis_read_meta_key, redis_read_image_key, image_meta_queue, *args, **kwargs):
+    def __init__(self, redis_read_meta_key, redis_read_image_key, image_meta_queue,
+                 read_timeout_ms=100, allow_pickle=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.redis_read_meta_key = redis_read_meta_key
         self.redis_read_image_key = redis_read_image_key
+        # how long a frame read waits in redis for a new frame, so the
+        # routine doesn't spin while idle but still notices the stop event
+        self.read_timeout_ms = read_timeout_ms
+        # whether pickled messages are decoded too, only for trusted senders
+        # (see message_decode)
+        self.allow_pickle = allow_pickle
         self.url = urlparse(os.environ.get('REDIS_URL', "redis://127.0.0.1:6379"))
         self.image_meta_queue = image_meta_queue
         self.msg_handler = None
         self.flip = False
         self.negative = False
 
-    def receive_msg(self, in_key, most_recent=True):
+    def receive_msg(self, in_key, most_recent=True, block_ms=None):
         if most_recent:
-            encoded_msg = self.msg_handler.read_most_recent_msg(in_key)
+            encoded_msg = self.msg_handler.read_most_recent_msg(in_key, block_ms=block_ms)
         else:
             encoded_msg = self.msg_handler.receive(in_key)
         if not encoded_msg:
             return None
-        msg = message_decode(encoded_msg)
+        msg = message_decode(encoded_msg, allow_pickle=self.allow_pickle)
+        tracing.trace(msg, tracing.REDIS_RECEIVED)
         msg.record_entry(self.component_name, self.logger)
         return msg
 
     def main_logic(self, *args, **kwargs):
-        pred_msg = self.receive_msg(self.redis_read_meta_key, most_recent=False)
-        frame_msg = self.receive_msg(self.redis_read_image_key)
+        frame_msg = self.receive_msg(self.redis_read_image_key, block_ms=self.read_timeout_ms)
         if frame_msg:
+            pred_msg = self.receive_msg(self.redis_read_meta_key, most_recent=False)
             arr = frame_msg.get_payload()
 
             if self.flip:
@@ -54,7 +62,6 @@ class MetaAndFrameFromRedisClassification(Routine):
             return True
 
         else:
-            time.sleep(0)
             return False
 
     def setup(self, *args, **kwargs):
@@ -70,6 +77,8 @@ class MetaAndFrameFromRedisClassification(Routine):
             "redis_read_meta_key": "String",
             "redis_read_image_key": "String",
             "image_meta_queue": "QueueOut",
+            "read_timeout_ms": "Integer",
+            "allow_pickle": "Boolean"
         })
         return dicts
 
@@ -0,0 +1,81 @@
+import time
+from queue import Empty, Full
+
+import numpy as np
+
+from pipert.core.message import Message
+from pipert.core.routine import Routine, RoutineTypes, Events
+
+
+class SyntheticFrameSource(Routine):
+    """
+    An input routine that puts generated frames into its output queue at a
+    fixed rate, in place of a camera or a video file when benchmarking a
+    pipeline.
+
+    The frames are copies of one random frame of the given size, the oldest
+    frame in the queue is dropped when the queue is full, like
+    ListenToStream does. A fps of 0 puts frames as fast as possible.
+    """
+    routine_type = RoutineTypes.INPUT
+
+    def __init__(self, out_queue, fps=30, width=640, height=480, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.out_queue = out_queue
+        self.fps = fps
+        self.width = width
+        self.height = height
+        self.frame = None
+        self.counter = 0
+        self._next_frame_time = None
+        if self.fps:
+            # the routine waits for the next frame after main_logic, so the
+            # wait isn't part of the latency of the frames
+            self.add_event_handler(Events.AFTER_LOGIC, SyntheticFrameSource._wait_for_next_frame,
+                                   last=True)
+
+    def _wait_for_next_frame(self):
+        # the frames are scheduled on fixed times, so a slow put doesn't
+        # lower the rate of the frames after it
+        self._next_frame_time = max(self._next_frame_time + 1 / self.fps,
+                                    time.monotonic() - 1 / self.fps)
+        delay = self._next_frame_time - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def main_logic(self, *args, **kwargs):
+        msg = Message(self.frame.copy(), self.name)
+        self.counter += 1
+        msg.record_entry(self.component_name, self.logger)
+        try:
+            self.out_queue.put(msg, block=False)
+        except Full:
+            try:
+                self.out_queue.get(block=False)
+                self.state.dropped += 1
+            except Empty:
+                pass
+            self.out_queue.put(msg, block=False)
+        return True
+
+    def setup(self, *args, **kwargs):
+        self.state.dropped = 0
+        self.frame = np.random.randint(0, 256, (self.height, self.width, 3), dtype=np.uint8)
+        self._next_frame_time = time.monotonic()
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "out_queue": "QueueOut",
+            "fps": "Integer",
+            "width": "Integer",
+            "height": "Integer"
+        })
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return self.out_queue == queue
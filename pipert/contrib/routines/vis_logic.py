@@ -2,16 +2,18 @@ from pipert.core.routine import Routine, RoutineTypes
 from queue import Empty, Full
 from pipert.utils.visualizer import VideoVisualizer
 from pipert.utils.visualizer.catalog import MetadataCatalog
-import time
 
 
 class VisLogic(Routine):
     routine_type = RoutineTypes.PROCESSING
 
-    def __init__(self, in_queue, out_queue, *args, **kwargs):
+    def __init__(self, in_queue, out_queue, pipeline_exit=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.in_queue = in_queue
         self.out_queue = out_queue
+        # whether the messages leave the pipeline here, like when the frames
+        # are only displayed by the next routine of the component
+        self.pipeline_exit = pipeline_exit
         self.vis = VideoVisualizer(MetadataCatalog.get("coco_2017_train"))
         self.NAMES = "pipert/contrib/YoloResources/coco.names"
 
@@ -27,8 +29,8 @@ class VisLogic(Routine):
                 image = self.vis.draw_instance_predictions(frame, pred, self.NAMES) \
                     .get_image()
                 frame_msg.update_payload(image)
-                frame_msg.history = pred_msg.history
-            frame_msg.record_exit(self.component_name, self.logger)
+                frame_msg.history.merge(pred_msg.history)
+            frame_msg.record_exit(self.component_name, self.logger, pipeline_exit=self.pipeline_exit)
             try:
                 self.out_queue.put(frame_msg, block=False)
                 return True
@@ -46,7 +48,6 @@ class VisLogic(Routine):
                     return True
 
         except Empty:
-            time.sleep(0)
             return False
 
     def setup(self, *args, **kwargs):
@@ -61,8 +62,12 @@ class VisLogic(Routine):
         dicts.update({
             "in_queue": "QueueIn",
             "out_queue": "QueueOut",
+            "pipeline_exit": "Boolean",
         })
         return dicts
 
+    def get_input_queues(self):
+        return [self.in_queue]
+
     def does_routine_use_queue(self, queue):
         return (self.in_queue == queue) or (self.out_queue == queue)
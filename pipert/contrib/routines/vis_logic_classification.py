@@ -1,16 +1,18 @@
 import cv2
 from pipert.core.routine import Routine, RoutineTypes
 from queue import Empty, Full
-import time
 
 
 class VisLogicClassification(Routine):
     routine_type = RoutineTypes.PROCESSING
 
-    def __init__(self, in_queue, out_queue, *args, **kwargs):
+    def __init__(self, in_queue, out_queue, pipeline_exit=False, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.in_queue = in_queue
         self.out_queue = out_queue
+        # whether the messages leave the pipeline here, like when the frames
+        # are only displayed by the next routine of the component
+        self.pipeline_exit = pipeline_exit
 
     def main_logic(self, *args, **kwargs):
         # TODO implement input that takes both frame and metadata
@@ -23,8 +25,8 @@ class VisLogicClassification(Routine):
                 pred = pred_msg.get_payload()
                 image = self.draw_pred_on_frame(frame, pred)
                 frame_msg.update_payload(image)
-                frame_msg.history = pred_msg.history
-            frame_msg.record_exit(self.component_name, self.logger)
+                frame_msg.history.merge(pred_msg.history)
+            frame_msg.record_exit(self.component_name, self.logger, pipeline_exit=self.pipeline_exit)
             try:
                 self.out_queue.put(frame_msg, block=False)
                 return True
@@ -42,7 +44,6 @@ class VisLogicClassification(Routine):
                     return True
 
         except Empty:
-            time.sleep(0)
             return False
 
     def draw_pred_on_frame(self, frame, pred):
@@ -66,8 +67,12 @@ class VisLogicClassification(Routine):
         dicts.update({
             "in_queue": "QueueIn",
             "out_queue": "QueueOut",
+            "pipeline_exit": "Boolean",
         })
         return dicts
 
+    def get_input_queues(self):
+        return [self.in_queue]
+
     def does_routine_use_queue(self, queue):
         return (self.in_queue == queue) or (self.out_queue == queue)
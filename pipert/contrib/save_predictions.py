@@ -3,6 +3,7 @@ from urllib.parse import urlparse
 from pipert.core.mini_logics import MessageFromRedis
 from pipert.core import Routine, BaseComponent, QueueHandler, Events
 from pipert.contrib.database import PSQLDBHandler, format_sqla_error
+from pipert.core.message_history import to_wall_time
 from sqlalchemy import Column, Integer, ARRAY, Float, JSON, Text, DateTime
 from sqlalchemy.exc import SQLAlchemyError
 from datetime import datetime as dt
@@ -95,7 +96,7 @@ class PredsToDatabase(Routine):
 		# Only do something if msg isn't empty and saving is toggled on
 		if self.is_on and msg:
 			msg_id = msg.id.split("_")[-1]
-			timestamp = dt.fromtimestamp(msg.history["VideoCapture"]["entry"])
+			timestamp = dt.fromtimestamp(to_wall_time(msg.history.get("VideoCapture", "entry")))
 			for prediction in msg.get_payload():
 				# get the needed fields and convert to a format that is good to be inserted into the db
 				box = prediction.pred_boxes.tensor.numpy().squeeze().astype(int) if prediction.has("pred_boxes") else None
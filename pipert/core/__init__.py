@@ -1,5 +1,26 @@
-from .routine import Routine, Events
-from .component import BaseComponent
-from .message import Message, Payload
-from .message_handlers import MessageHandler, RedisHandler
-from .utlis import QueueHandler
+import importlib
+
+# the classes that the package exports are imported on first use, so
+# importing one module of the package doesn't import the others (and redis,
+# zerorpc and such with them)
+_EXPORTS = {
+    "Routine": ".routine",
+    "Events": ".routine",
+    "BatchRoutine": ".batch_routine",
+    "BaseComponent": ".component",
+    "Message": ".message",
+    "Payload": ".message",
+    "MessageHandler": ".message_handlers",
+    "RedisHandler": ".message_handlers",
+    "QueueHandler": ".utlis",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,133 @@
+"""
+The runtime of the routines that run as coroutines (see Routine.as_async):
+one event loop on one thread, shared by the async routines of a component,
+and a thread pool executor that runs their blocking, CPU bound parts.
+
+An I/O bound routine that implements async_main_logic (like the redis
+routines, with an async redis client) spends its waits on the event loop
+instead of holding a thread, and the main_logic of any other routine runs
+on the executor, so a component with many routines needs a few threads
+rather than one per routine.
+"""
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import os
+import threading
+
+# the number of threads of the executor, the event loop is one more thread
+DEFAULT_EXECUTOR_WORKERS = min(4, os.cpu_count() or 1)
+
+
+class AsyncRuntime:
+    """
+    An event loop that runs on a daemon thread, which is started with the
+    first coroutine that is submitted to it.
+
+    Args:
+        executor_workers: the number of threads of the executor.
+    """
+
+    def __init__(self, executor_workers=DEFAULT_EXECUTOR_WORKERS):
+        self.executor_workers = executor_workers
+        self.loop = None
+        self.executor = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.executor_workers,
+                                                                  thread_name_prefix="pipert-async-executor")
+            self.loop = asyncio.new_event_loop()
+            self.loop.set_default_executor(self.executor)
+            self._thread = threading.Thread(target=self._run, daemon=True, name="pipert-event-loop")
+            self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    @property
+    def ident(self):
+        """
+        The ident of the thread of the event loop, None before it started.
+        """
+        return None if self._thread is None else self._thread.ident
+
+    def submit(self, coroutine):
+        """
+        Schedules a coroutine on the event loop.
+
+        Returns: a concurrent.futures.Future of the coroutine's result.
+        """
+        self._ensure_started()
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    async def run_in_executor(self, function, *args):
+        """
+        Runs a blocking function on the executor, in the context of the
+        calling task so the function records its messages under the stage
+        of the routine (see pipert.core.tracing).
+        """
+        context = contextvars.copy_context()
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, functools.partial(context.run, function, *args))
+
+
+class AsyncRunner:
+    """
+    The runner of a routine that runs on an AsyncRuntime, with the part of
+    the threading.Thread interface that the component uses.
+
+    Args:
+        target: the coroutine function that runs the routine.
+        runtime: the AsyncRuntime to run it on.
+    """
+
+    def __init__(self, target, runtime):
+        self.target = target
+        self.runtime = runtime
+        self._future = None
+
+    @property
+    def ident(self):
+        return self.runtime.ident
+
+    def start(self):
+        self._future = self.runtime.submit(self.target())
+
+    def is_alive(self):
+        return self._future is not None and not self._future.done()
+
+    def join(self, timeout=None):
+        if self._future is None:
+            return
+        try:
+            self._future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            pass
+        except Exception:
+            # the routine logs its own errors
+            pass
+
+
+_runtime = None
+_runtime_pid = None
+
+
+def get_async_runtime():
+    """
+    Returns the AsyncRuntime of the current process, for async routines
+    that aren't given the runtime of a component.
+    """
+    global _runtime, _runtime_pid
+    if _runtime_pid != os.getpid():
+        # the thread of a runtime that was created before a fork doesn't
+        # exist in the child
+        _runtime = AsyncRuntime()
+        _runtime_pid = os.getpid()
+    return _runtime
@@ -0,0 +1,279 @@
+from abc import abstractmethod
+from collections import deque
+from queue import Empty, Full
+import time
+
+import numpy as np
+
+from .message import Message
+from .routine import Routine
+from .utlis.queue_handler import wait_for_any
+
+
+def _result_message(msg, result):
+    """
+    Creates the message of a result, with the id and source address of the
+    message it came from and a copy of its history.
+    """
+    result_msg = Message(result, msg.source_address)
+    result_msg.id = msg.id
+    result_msg.history = msg.history.copy()
+    return result_msg
+
+
+def _put_dropping_oldest(q, item):
+    """
+    Puts the item into the queue, dropping the oldest item in it if it is
+    full to keep the output real-time.
+
+    Returns: True if an item was dropped, else False
+    """
+    try:
+        q.put(item, block=False)
+        return False
+    except Full:
+        try:
+            q.get(block=False)
+            dropped = True
+        except Empty:
+            dropped = False
+        q.put(item, block=False)
+        return dropped
+
+
+class BatchRoutine(Routine):
+    """
+    A routine that processes the messages of its input queue in batches.
+
+    Every call to main_logic takes up to 'batch_size' messages from the input
+    queue, waiting up to 'max_batch_wait_ms' milliseconds after the first
+    one for the rest to arrive, and hands their payloads to process_batch.
+    The payloads are stacked into one numpy array when all of them are
+    arrays of the same shape and dtype, otherwise they are passed as a list.
+    Each result of process_batch is put into the output queue as a message
+    that keeps the id, source address and history of the message it came
+    from.
+
+    By default a batch is a single message that is processed as soon as it
+    arrives, so a configuration that doesn't set 'batch_size' and
+    'max_batch_wait_ms' keeps the latency it had without batching.
+
+    Subclasses implement process_batch instead of main_logic.
+    """
+
+    def __init__(self, in_queue, out_queue, batch_size=1, max_batch_wait_ms=0,
+                 *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.in_queue = in_queue
+        self.out_queue = out_queue
+        self.batch_size = batch_size
+        self.max_batch_wait_ms = max_batch_wait_ms
+
+    @abstractmethod
+    def process_batch(self, batch):
+        """
+        Processes a batch of payloads.
+
+        Args:
+            batch: a numpy array of the stacked payloads, or a list of the
+            payloads if they can't be stacked.
+
+        Returns: a list with a result for every payload of the batch, in
+        the same order.
+        """
+        raise NotImplementedError
+
+    def collect_batch(self):
+        """
+        Takes up to 'batch_size' messages from the input queue, the first
+        one without blocking and the rest until 'max_batch_wait_ms' passes.
+
+        Returns: a list of (output queue, message) tuples, where the output
+        queue is the one that the result of the message is put into, empty
+        if the queue was empty.
+        """
+        try:
+            batch = [self.in_queue.get(block=False)]
+        except Empty:
+            return []
+        deadline = time.monotonic() + self.max_batch_wait_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self.in_queue.get(timeout=remaining))
+                else:
+                    batch.append(self.in_queue.get(block=False))
+            except Empty:
+                break
+        return [(self.out_queue, msg) for msg in batch]
+
+    @staticmethod
+    def stack_payloads(payloads):
+        """
+        Stacks the payloads into one array if they are all numpy arrays of
+        the same shape and dtype, otherwise returns them as they are.
+        """
+        first = payloads[0]
+        for payload in payloads:
+            if not isinstance(payload, np.ndarray) or payload.shape != first.shape \
+                    or payload.dtype != first.dtype:
+                return payloads
+        return np.stack(payloads)
+
+    def main_logic(self, *args, **kwargs):
+        batch = self.collect_batch()
+        if not batch:
+            return False
+        payloads = self.stack_payloads([msg.get_payload() for _, msg in batch])
+        results = self.process_batch(payloads)
+        for (out_queue, msg), result in zip(batch, results):
+            if _put_dropping_oldest(out_queue, _result_message(msg, result)):
+                self.state.dropped += 1
+        return True
+
+    def setup(self, *args, **kwargs):
+        self.state.dropped = 0
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "in_queue": "QueueIn",
+            "out_queue": "QueueOut",
+            "batch_size": "Integer",
+            "max_batch_wait_ms": "Integer",
+        })
+        return dicts
+
+    def get_input_queues(self):
+        return [self.in_queue]
+
+    def does_routine_use_queue(self, queue):
+        return (self.in_queue == queue) or (self.out_queue == queue)
+
+
+class FanInBatchRoutine(BatchRoutine):
+    """
+    A routine that batches the messages of several sources (for example
+    cameras) together, so one model instance serves all of them.
+
+    The messages of every input queue are pulled into a pending list of the
+    source, which keeps only the 'max_pending' newest messages. Every call
+    to main_logic schedules up to 'batch_size' pending messages into a batch
+    and hands their payloads to process_batch, like BatchRoutine does. The
+    result of each message is put into the output queue at the index of the
+    input queue it came from.
+
+    The scheduling is one of:
+    round_robin - the sources take turns, starting from the source after
+    the last one that was served, so every source gets its share of the
+    batch.
+    deadline - the messages with the earliest deadline go first, where the
+    deadline of a message is the time it was pulled plus the latency budget
+    of its source (the same for all sources by default).
+
+    Subclasses implement process_batch instead of main_logic.
+    """
+    SCHEDULING_POLICIES = ("round_robin", "deadline")
+
+    def __init__(self, in_queues, out_queues, batch_size=1, max_batch_wait_ms=0,
+                 scheduling="round_robin", max_pending=1, latency_budgets_ms=None,
+                 *args, **kwargs):
+        super().__init__(None, None, batch_size, max_batch_wait_ms, *args, **kwargs)
+        if len(in_queues) != len(out_queues):
+            raise ValueError("Every input queue needs an output queue")
+        if scheduling not in self.SCHEDULING_POLICIES:
+            raise ValueError(f"Unknown scheduling '{scheduling}', the policies are "
+                             f"{', '.join(self.SCHEDULING_POLICIES)}")
+        if latency_budgets_ms is not None and len(latency_budgets_ms) != len(in_queues):
+            raise ValueError("Every input queue needs a latency budget")
+        self.in_queues = list(in_queues)
+        self.out_queues = list(out_queues)
+        self.scheduling = scheduling
+        self.max_pending = max_pending
+        self.latency_budgets_ms = latency_budgets_ms
+        # (deadline, message) of every source, oldest first
+        self._pending = [deque() for _ in self.in_queues]
+        self._next_source = 0
+
+    def _pull(self):
+        now = time.monotonic()
+        for source, in_queue in enumerate(self.in_queues):
+            pending = self._pending[source]
+            deadline = now
+            if self.latency_budgets_ms is not None:
+                deadline += self.latency_budgets_ms[source] / 1000
+            while True:
+                try:
+                    msg = in_queue.get(block=False)
+                except Empty:
+                    break
+                pending.append((deadline, msg))
+                if len(pending) > self.max_pending:
+                    pending.popleft()
+                    self.state.dropped += 1
+
+    def _pending_count(self):
+        return sum(len(pending) for pending in self._pending)
+
+    def _schedule(self):
+        batch = []
+        if self.scheduling == "round_robin":
+            source = self._next_source
+            while len(batch) < self.batch_size and self._pending_count():
+                if self._pending[source]:
+                    batch.append((self.out_queues[source], self._pending[source].popleft()[1]))
+                source = (source + 1) % len(self._pending)
+            self._next_source = source
+        else:
+            while len(batch) < self.batch_size and self._pending_count():
+                source = min((source for source, pending in enumerate(self._pending) if pending),
+                             key=lambda source: self._pending[source][0][0])
+                batch.append((self.out_queues[source], self._pending[source].popleft()[1]))
+        return batch
+
+    def collect_batch(self):
+        """
+        Pulls the messages of the input queues, waiting up to
+        'max_batch_wait_ms' after the first one for a full batch, and
+        schedules a batch out of the pending messages.
+
+        Returns: a list of (output queue, message) tuples, where the output
+        queue is the one of the message's source, empty if there are no
+        pending messages.
+        """
+        self._pull()
+        if not self._pending_count():
+            return []
+        full_batch = min(self.batch_size, self.max_pending * len(self.in_queues))
+        deadline = time.monotonic() + self.max_batch_wait_ms / 1000
+        while self._pending_count() < full_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not wait_for_any(self.in_queues, remaining, self.stop_event):
+                break
+            self._pull()
+        return self._schedule()
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "in_queues": "QueueInList",
+            "out_queues": "QueueOutList",
+            "batch_size": "Integer",
+            "max_batch_wait_ms": "Integer",
+            "scheduling": "String",
+            "max_pending": "Integer",
+            "latency_budgets_ms": "IntegerList",
+        })
+        return dicts
+
+    def get_input_queues(self):
+        return self.in_queues
+
+    def does_routine_use_queue(self, queue):
+        return (queue in self.in_queues) or (queue in self.out_queues)
@@ -1,12 +1,40 @@
+import hashlib
 import importlib
+import importlib.util
+import json
+import os
 import re
+import threading
 from typing import Optional
 
+# the entry point groups that installed packages register their classes in,
+# e.g. in setup.py: entry_points={"pipert.routines": ["MyRoutine = my_package.my_routine:MyRoutine"]}
+ROUTINES_ENTRY_POINT_GROUP = "pipert.routines"
+COMPONENTS_ENTRY_POINT_GROUP = "pipert.components"
+METRICS_COLLECTORS_ENTRY_POINT_GROUP = "pipert.metrics_collectors"
+
+# the folder of the pipert package, whose modules the classes build on
+PIPERT_FOLDER_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# the folder of the manifests that describe the classes of a folder
+MANIFESTS_FOLDER_PATH = os.environ.get("PIPERT_CACHE_PATH",
+                                       os.path.join(os.path.expanduser("~"), ".cache", "pipert"))
+
+# absolute path -> (mtime_ns, size, module) of the modules that were loaded
+_modules = {}
+_modules_lock = threading.Lock()
+
 
 class ClassFactory:
-    """Class that generates the class object of files from the given folder path"""
-    def __init__(self, classes_folder_path):
+    """
+    Class that generates the class object of files from the given folder path.
+
+    Every file is loaded once and kept until it changes on disk, and classes
+    that aren't in the folder are looked up in the entry points of the
+    installed packages.
+    """
+    def __init__(self, classes_folder_path, entry_point_group=None):
         self.classes_folder_path = classes_folder_path
+        self.entry_point_group = entry_point_group
 
     def get_class(self, class_name) -> Optional['class_object']:
         """
@@ -14,22 +42,173 @@ class ClassFactory:
         :param class_name: The name of the class
         :return: The class object from the given name or None if the name doesn't exist
         """
-        path = self.classes_folder_path + "/" + \
+        class_object = _get_class_object_by_path(self._get_path(class_name), class_name)
+        if class_object is None:
+            entry_point = self._get_entry_points().get(class_name)
+            if entry_point is not None:
+                class_object = entry_point.load()
+        return class_object
+
+    def get_class_names(self):
+        """
+        Returns the names of the classes of the folder's files and of the
+        entry points, without loading them.
+        """
+        class_names = [_file_name_to_class_name(file_name[:-3])
+                       for file_name in sorted(os.listdir(self.classes_folder_path))
+                       if file_name.endswith(".py") and not file_name.startswith("__")]
+        class_names.extend(name for name in self._get_entry_points() if name not in class_names)
+        return class_names
+
+    def describe_classes(self, describe):
+        """
+        Returns a description of every class (see get_class_names) that can
+        be loaded, without loading the classes whose files didn't change
+        since they were last described: the descriptions are kept in a
+        manifest file, keyed by the modification time and size of the class's
+        file (or the version of the entry point's package).
+
+        A class also depends on the files it imports, like its base class or
+        helper modules, so the whole manifest is rebuilt once any python file
+        of the folder or of the pipert package changes. Changes to other
+        installed packages are only noticed through the versions of the
+        entry points' packages, the manifest can be stale after a package
+        is edited in place (delete the manifests folder to rebuild it).
+
+        Args:
+            describe: a function that returns the description of a class
+            object, which must be serializable to JSON. The manifest is kept
+            per folder and describe function.
+
+        Returns: a dictionary of class name to its description.
+        """
+        manifest_path = self._get_manifest_path(describe)
+        sources_key = self._get_sources_key()
+        manifest = _read_manifest(manifest_path)
+        if manifest.get("sources") != sources_key:
+            manifest = {"sources": sources_key, "classes": {}}
+        entry_points = self._get_entry_points()
+        descriptions, new_manifest = {}, {"sources": sources_key, "classes": {}}
+        for class_name in self.get_class_names():
+            key = self._get_manifest_key(class_name, entry_points)
+            if key is None:
+                continue
+            entry = manifest["classes"].get(class_name)
+            if entry is None or entry["key"] != key:
+                try:
+                    class_object = self.get_class(class_name)
+                except ImportError:
+                    # its dependencies aren't installed
+                    continue
+                if class_object is None:
+                    continue
+                entry = {"key": key, "description": describe(class_object)}
+            new_manifest["classes"][class_name] = entry
+            descriptions[class_name] = entry["description"]
+        if new_manifest != manifest:
+            _write_manifest(manifest_path, new_manifest)
+        return descriptions
+
+    def _get_path(self, class_name):
+        return self.classes_folder_path + "/" + \
             re.sub(r'[A-Z]',
                    _add_underscore_before_uppercase,
                    class_name)[1:] + ".py"
-        return _get_class_object_by_path(path, class_name)
+
+    def _get_entry_points(self):
+        if self.entry_point_group is None:
+            return {}
+        # importlib.metadata takes longer to import than the rest of the module
+        import importlib.metadata
+        try:
+            entry_points = importlib.metadata.entry_points(group=self.entry_point_group)
+        except TypeError:
+            # python < 3.10
+            entry_points = importlib.metadata.entry_points().get(self.entry_point_group, [])
+        return {entry_point.name: entry_point for entry_point in entry_points}
+
+    def _get_manifest_key(self, class_name, entry_points):
+        try:
+            stat = os.stat(self._get_path(class_name))
+            return [stat.st_mtime_ns, stat.st_size]
+        except OSError:
+            entry_point = entry_points.get(class_name)
+            if entry_point is None:
+                return None
+            distribution = getattr(entry_point, "dist", None)
+            return [entry_point.value, getattr(distribution, "version", None)]
+
+    def _get_sources_key(self):
+        """
+        Returns a hash of the paths, modification times and sizes of the
+        python files of the folder and of the pipert package.
+        """
+        # the folder may be inside the pipert package
+        stats = set()
+        for folder in sorted({os.path.abspath(self.classes_folder_path), PIPERT_FOLDER_PATH}):
+            for directory, _, file_names in os.walk(folder):
+                for file_name in file_names:
+                    if not file_name.endswith(".py"):
+                        continue
+                    path = os.path.join(directory, file_name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    stats.add(f"{path}:{stat.st_mtime_ns}:{stat.st_size}")
+        return hashlib.sha1("\n".join(sorted(stats)).encode()).hexdigest()
+
+    def _get_manifest_path(self, describe):
+        key = f"{os.path.abspath(self.classes_folder_path)}:{self.entry_point_group}:" \
+              f"{describe.__module__}.{describe.__qualname__}"
+        return os.path.join(MANIFESTS_FOLDER_PATH,
+                            "manifest-" + hashlib.sha1(key.encode()).hexdigest()[:16] + ".json")
 
 
 def _add_underscore_before_uppercase(match):
     return '_' + match.group(0).lower()
 
 
-def _get_class_object_by_path(path, class_name):
+def _file_name_to_class_name(file_name):
+    return file_name[0].upper() + re.sub(r'_\w', lambda match: match.group(0).upper()[1], file_name)[1:]
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as manifest_file:
+            return json.load(manifest_file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest_path, manifest):
+    # the manifest is only a cache, it isn't written on a read-only file system
     try:
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        temporary_path = f"{manifest_path}.{os.getpid()}"
+        with open(temporary_path, "w") as manifest_file:
+            json.dump(manifest, manifest_file)
+        os.replace(temporary_path, manifest_path)
+    except OSError:
+        pass
+
+
+def _load_module(path, class_name):
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    with _modules_lock:
+        cached = _modules.get(path)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
         spec = importlib.util.spec_from_file_location(class_name, path)
-        class_object = importlib.util.module_from_spec(spec)
-        spec.loader.exec_module(class_object)
-        return getattr(class_object, class_name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        _modules[path] = (stat.st_mtime_ns, stat.st_size, module)
+        return module
+
+
+def _get_class_object_by_path(path, class_name):
+    try:
+        return getattr(_load_module(path, class_name), class_name)
     except (AttributeError, FileNotFoundError):
         return None
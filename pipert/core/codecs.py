@@ -0,0 +1,177 @@
+from abc import ABC, abstractmethod
+import numpy as np
+
+
+class FrameCodec(ABC):
+    """
+    Compresses frames into bytes before they are sent to the message broker,
+    the name of the codec is saved in the payload so the receiving side can
+    decode the frame without any configuration.
+    """
+    name = ""
+
+    @abstractmethod
+    def encode(self, frame):
+        """
+        Compresses a frame.
+
+        Args:
+            frame: the numpy array to compress.
+
+        Returns: the compressed frame as a bytes like object.
+        """
+        pass
+
+    @abstractmethod
+    def decode(self, data, shape, dtype):
+        """
+        Decompresses a frame.
+
+        Args:
+            data: the compressed frame.
+            shape: the shape of the original frame.
+            dtype: the dtype of the original frame.
+
+        Returns: the frame as a numpy array.
+        """
+        pass
+
+
+class RawCodec(FrameCodec):
+    """
+    Passes the frame bytes as they are.
+    """
+    name = "none"
+
+    def encode(self, frame):
+        return np.ascontiguousarray(frame).tobytes()
+
+    def decode(self, data, shape, dtype):
+        return np.frombuffer(data, dtype=dtype).reshape(shape)
+
+
+class _ImageCodec(FrameCodec):
+    """
+    Compresses uint8 images using cv2.imencode.
+    """
+    extension = ""
+
+    def __init__(self, params=()):
+        import cv2
+        self.cv2 = cv2
+        self.params = list(params)
+
+    def encode(self, frame):
+        if frame.dtype != np.uint8:
+            raise ValueError(f"The {self.name} codec supports only uint8 frames, got {frame.dtype}")
+        success, data = self.cv2.imencode(self.extension, frame, self.params)
+        if not success:
+            raise ValueError(f"Failed to encode the frame as {self.name}")
+        return data.tobytes()
+
+    def decode(self, data, shape, dtype):
+        frame = self.cv2.imdecode(np.frombuffer(data, dtype=np.uint8),
+                                  self.cv2.IMREAD_UNCHANGED)
+        return frame.reshape(shape)
+
+
+class JpegCodec(_ImageCodec):
+    """
+    Lossy jpeg compression, quality is between 0 and 100.
+    """
+    name = "jpeg"
+    extension = ".jpg"
+
+    def __init__(self, quality=90):
+        import cv2
+        super().__init__((cv2.IMWRITE_JPEG_QUALITY, quality))
+
+
+class PngCodec(_ImageCodec):
+    """
+    Lossless png compression, compression is between 0 and 9.
+    """
+    name = "png"
+    extension = ".png"
+
+    def __init__(self, compression=1):
+        import cv2
+        super().__init__((cv2.IMWRITE_PNG_COMPRESSION, compression))
+
+
+class Lz4Codec(FrameCodec):
+    """
+    Lossless lz4 compression of the raw frame bytes, requires the lz4
+    package.
+    """
+    name = "lz4"
+
+    def __init__(self, compression_level=0):
+        import lz4.frame
+        self.lz4 = lz4.frame
+        self.compression_level = compression_level
+
+    def encode(self, frame):
+        return self.lz4.compress(np.ascontiguousarray(frame),
+                                 compression_level=self.compression_level)
+
+    def decode(self, data, shape, dtype):
+        return np.frombuffer(self.lz4.decompress(data), dtype=dtype).reshape(shape)
+
+
+class ZstdCodec(FrameCodec):
+    """
+    Lossless zstd compression of the raw frame bytes, requires the
+    zstandard package.
+    """
+    name = "zstd"
+
+    def __init__(self, level=1):
+        import zstandard
+        self.compressor = zstandard.ZstdCompressor(level=level)
+        self.decompressor = zstandard.ZstdDecompressor()
+
+    def encode(self, frame):
+        return self.compressor.compress(np.ascontiguousarray(frame))
+
+    def decode(self, data, shape, dtype):
+        return np.frombuffer(self.decompressor.decompress(data), dtype=dtype).reshape(shape)
+
+
+CODECS = {codec.name: codec for codec in
+          (RawCodec, JpegCodec, PngCodec, Lz4Codec, ZstdCodec)}
+
+_decoders = {}
+
+
+def get_codec(codec_config):
+    """
+    Creates a codec from its configuration.
+
+    Args:
+        codec_config: the name of the codec, or a dictionary with the name
+        of the codec under 'name' and the parameters of the codec, for
+        example {"name": "jpeg", "quality": 80}.
+
+    Raises:
+        ValueError: if there is no codec with the given name.
+        ImportError: if the package that the codec requires isn't installed.
+    """
+    if isinstance(codec_config, dict):
+        codec_params = codec_config.copy()
+        codec_name = codec_params.pop("name", "")
+    else:
+        codec_params = {}
+        codec_name = codec_config
+    if codec_name not in CODECS:
+        raise ValueError(f"There is no frame codec named '{codec_name}'")
+    return CODECS[codec_name](**codec_params)
+
+
+def decode_frame(codec_name, data, shape, dtype):
+    """
+    Decodes a frame that was encoded by the codec named 'codec_name'.
+    """
+    if codec_name not in _decoders:
+        _decoders[codec_name] = get_codec(codec_name)
+    return _decoders[codec_name].decode(data, shape, dtype)
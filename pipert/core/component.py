@@ -1,36 +1,59 @@
 import os
-if os.environ.get('TORCHVISION', 'no') == 'yes':
-    from torch.multiprocessing import Event, Process
-else:
-    from multiprocessing import Event, Process
+from pipert.core.multiprocessing_utils import get_multiprocessing
 from pipert.core.routine import Routine
 from threading import Thread
 from typing import Union
 import signal
-import gevent
+import time
 from pipert.core.metrics_collector import NullCollector
+from pipert.core.metrics_aggregator import get_metrics_flusher
 import sys
 if sys.version_info.minor >= 8:
     from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator as smGen
 else:
     from pipert.core.shared_memory_generator import SharedMemoryGenerator as smGen
-from pipert.core.errors import RegisteredException, QueueDoesNotExist
-from pipert.core.class_factory import ClassFactory
-from queue import Queue
+from pipert.core.errors import RegisteredException, QueueDoesNotExist, RoutineDoesNotExist
+from pipert.core.class_factory import ClassFactory, METRICS_COLLECTORS_ENTRY_POINT_GROUP, \
+    ROUTINES_ENTRY_POINT_GROUP
+from pipert.core.codecs import get_codec
+from pipert.core.shared_memory_queue import SharedMemoryQueue
+from pipert.core.latest_slot import LatestSlot
+from pipert.core.policy_queue import PolicyQueue, POLICIES
+from pipert.core.profiler import profile_threads, DEFAULT_SAMPLING_INTERVAL
+from pipert.core.utlis import wake_waiters
 from pipert.utils.logger_utils import create_parent_logger
 
 
+# the lines that the component factory prints once the component's zerorpc
+# server is bound, and once the routines of a run of the component finished
+# their setup (see BaseComponent._notify_when_ready and
+# PipelineManager.wait_until_ready)
+COMPONENT_SERVING_MESSAGE = "pipert-component-serving"
+COMPONENT_READY_MESSAGE = "pipert-component-ready"
+
+
 class BaseComponent:
+    EXECUTION_MODES = ("thread", "process", "async")
+    QUEUE_KINDS = ("queue", "latest")
 
     def __init__(self, component_config, start_component=False):
         self.name = ""
         self.ROUTINES_FOLDER_PATH = "pipert/contrib/routines"
         self.MONITORING_SYSTEMS_FOLDER_PATH = "pipert/contrib/metrics_collectors"
         self.use_memory = False
-        self.stop_event = Event()
+        self.frame_codec = None
+        self.frame_codec_config = None
+        self.stop_event = get_multiprocessing().Event()
         self.stop_event.set()
         self.queues = {}
         self._routines = {}
+        # the event loop of the routines that run as coroutines, created
+        # with the first of them
+        self.async_runtime = None
+        # called (from another thread) once the routines of a run finished
+        # their setup: loaded their models, connected to redis... It is set
+        # by the component factory, and private so zerorpc doesn't expose it.
+        self._ready_callback = None
         self.metrics_collector = NullCollector()
         self.parent_logger = None
         self.logger = None
@@ -54,33 +77,92 @@ class BaseComponent:
             self.use_memory = True
             self.generator = smGen(self.name)
 
+        if "frame_codec" in component_parameters:
+            self.set_frame_codec(component_parameters["frame_codec"])
+
         if "monitoring_system" in component_parameters:
             self.set_monitoring_system(component_parameters["monitoring_system"])
 
+        process_queues = self._get_queues_of_process_routines(component_parameters["routines"])
         for queue in component_parameters["queues"]:
-            self.create_queue(queue_name=queue, queue_size=1)
-
-        routine_factory = ClassFactory(self.ROUTINES_FOLDER_PATH)
-        for routine_name, routine_parameters_real in component_parameters["routines"].items():
-            routine_parameters = routine_parameters_real.copy()
-            routine_parameters["name"] = routine_name
-            routine_parameters['metrics_collector'] = self.metrics_collector
-            routine_parameters["logger"] = self.parent_logger.getChild(routine_name)
-            routine_class = routine_factory.get_class(routine_parameters.pop("routine_type_name", ""))
-            if routine_class is None:
-                continue
+            if not isinstance(queue, dict):
+                queue = {"name": queue}
+            self.create_queue(queue_name=queue["name"],
+                              queue_size=queue.get("size", 1),
+                              between_processes=queue["name"] in process_queues,
+                              kind=queue.get("kind", "queue"),
+                              policy=queue.get("policy", "block"))
+
+        for routine_name, routine_parameters in component_parameters["routines"].items():
             try:
-                self._replace_queue_names_with_queue_objects(routine_parameters)
-            except QueueDoesNotExist as e:
+                routine = self._create_routine(routine_name, routine_parameters)
+            except QueueDoesNotExist:
                 continue
+            if routine is not None:
+                self.register_routine(routine)
+
+    def _create_routine(self, routine_name, routine_parameters_real):
+        """
+        Creates a routine from its configuration, the way the routines of
+        the component's configuration are created.
 
-            routine_parameters["component_name"] = self.name
+        Returns: the routine, or None if its type or execution mode doesn't
+        exist.
 
-            self.register_routine(routine_class(**routine_parameters).as_thread())
+        Raises:
+            QueueDoesNotExist - if the routine uses a queue that doesn't exist
+        """
+        routine_factory = ClassFactory(self.ROUTINES_FOLDER_PATH, ROUTINES_ENTRY_POINT_GROUP)
+        routine_parameters = routine_parameters_real.copy()
+        routine_parameters["name"] = routine_name
+        routine_parameters['metrics_collector'] = self.metrics_collector
+        routine_parameters["logger"] = self.parent_logger.getChild(routine_name)
+        routine_class = routine_factory.get_class(routine_parameters.pop("routine_type_name", ""))
+        if routine_class is None:
+            return None
+        execution_mode = routine_parameters.pop("execution_mode", "thread")
+        if execution_mode not in self.EXECUTION_MODES:
+            self.logger.error("Unknown execution mode '%s' for routine %s",
+                              execution_mode, routine_name)
+            return None
+        self._replace_queue_names_with_queue_objects(routine_parameters)
+
+        routine_parameters["component_name"] = self.name
+
+        routine = routine_class(**routine_parameters)
+        if execution_mode == "process":
+            routine.as_process()
+        elif execution_mode == "async":
+            if self.async_runtime is None:
+                from pipert.core.async_runtime import AsyncRuntime
+                self.async_runtime = AsyncRuntime()
+            routine.as_async(self.async_runtime)
+        else:
+            routine.as_thread()
+        return routine
+
+    @staticmethod
+    def _get_queues_of_process_routines(routines_parameters):
+        """
+        Returns the names of the queues that routines which run as
+        processes use, these queues have to be shared between processes.
+        """
+        process_queues = set()
+        for routine_parameters in routines_parameters.values():
+            if routine_parameters.get("execution_mode", "thread") != "process":
+                continue
+            for key, value in routine_parameters.items():
+                if 'queue' in key.lower() and isinstance(value, list):
+                    process_queues.update(value)
+                elif 'queue' in key.lower():
+                    process_queues.add(value)
+        return process_queues
 
     def _replace_queue_names_with_queue_objects(self, routine_parameters_kwargs):
         for key, value in routine_parameters_kwargs.items():
-            if 'queue' in key.lower():
+            if 'queue' in key.lower() and isinstance(value, list):
+                routine_parameters_kwargs[key] = [self.get_queue(queue_name=name) for name in value]
+            elif 'queue' in key.lower():
                 routine_parameters_kwargs[key] = self.get_queue(queue_name=value)
 
     def _start(self):
@@ -102,9 +184,27 @@ class BaseComponent:
         if self.use_memory and sys.version_info.minor < 8:
             self.generator.create_memories()
         self._start()
+        if self._ready_callback is not None:
+            Thread(target=self._notify_when_ready, daemon=True, name="pipert-ready-notifier").start()
+        # gevent is only imported by a component that runs
+        import gevent
         gevent.signal_handler(signal.SIGTERM, self.stop_run)
 
-    def register_routine(self, routine: Union[Routine, Process, Thread]):
+    def _notify_when_ready(self):
+        """
+        Calls the ready callback once every routine of the run finished its
+        setup, unless the component stops or a routine exits first.
+        """
+        for routine in list(self._routines.values()):
+            if not isinstance(routine, Routine):
+                continue
+            while not routine.ready_event.wait(routine.input_timeout):
+                if self.stop_event.is_set() or not routine.runner.is_alive():
+                    return
+        if not self.stop_event.is_set():
+            self._ready_callback()
+
+    def register_routine(self, routine: Union[Routine, 'Process', Thread]):
         """
         Registers routine to the list of component's routines
         Args:
@@ -121,7 +221,12 @@ class BaseComponent:
                 routine.stop_event = self.stop_event
                 if self.use_memory:
                     routine.use_memory = self.use_memory
-                    routine.generator = self.generator
+                    if routine.execution_mode == "process":
+                        # a process can't share the ring of the component
+                        routine.generator = smGen(f"{self.name}_{routine.name}")
+                    else:
+                        routine.generator = self.generator
+                routine.frame_codec = self.frame_codec
             else:
                 self.logger.error("Routine is already registered")
                 raise RegisteredException("routine is already registered")
@@ -147,6 +252,8 @@ class BaseComponent:
         if self.stop_event.is_set():
             return 0
         self.stop_event.set()
+        for queue in self.queues.values():
+            wake_waiters(queue)
 
         try:
             self._teardown_callback()
@@ -157,26 +264,124 @@ class BaseComponent:
                 self.logger.info("Stopping routine {0}".format(routine.name))
                 if isinstance(routine, Routine):
                     routine.runner.join()
-                elif isinstance(routine, (Process, Thread)):
+                elif isinstance(routine, (get_multiprocessing().Process, Thread)):
                     routine.join()
                 self.logger.info("Routine {0} stopped".format(routine.name))
+            for queue in self.queues.values():
+                if isinstance(queue, SharedMemoryQueue):
+                    queue.close()
             return 0
         except RuntimeError:
             return 1
 
-    def create_queue(self, queue_name, queue_size=1):
+    def create_queue(self, queue_name, queue_size=1, between_processes=False,
+                     kind="queue", policy="block"):
         """
            Create a new queue for the component.
            Returns True if created or False otherwise
            Args:
                queue_name: the name of the queue, must be unique
                queue_size: the size of the queue
+               between_processes: whether the queue is used by routines
+               that run as processes, in which case frames are passed
+               through shared memory.
+               kind: 'queue' for a regular queue, or 'latest' for a
+               LatestSlot that holds only the latest item put into it
+               (queue_size is ignored).
+               policy: what a full queue does with a new item, one of
+               pipert.core.policy_queue.POLICIES.
         """
         if queue_name in self.queues:
             return False
-        self.queues[queue_name] = Queue(maxsize=queue_size)
+        if kind not in self.QUEUE_KINDS:
+            self.logger.error("Unknown kind '%s' for queue %s", kind, queue_name)
+            return False
+        if policy not in POLICIES:
+            self.logger.error("Unknown policy '%s' for queue %s", policy, queue_name)
+            return False
+        if kind == "latest" and between_processes:
+            self.logger.warning("Queue %s is used by a process routine, so it "
+                                "is created as a regular queue", queue_name)
+        elif kind == "latest":
+            self.queues[queue_name] = LatestSlot()
+            return True
+        if between_processes:
+            if policy != "block":
+                self.logger.warning("Queue %s is used by a process routine, so "
+                                    "it uses the block policy", queue_name)
+            self.queues[queue_name] = SharedMemoryQueue(maxsize=queue_size,
+                                                        name=f"{self.name}_{queue_name}")
+        else:
+            self.queues[queue_name] = PolicyQueue(maxsize=queue_size, policy=policy)
         return True
 
+    def get_queue_stats(self, queue_name=None):
+        """
+           Returns a dictionary of queue name to the counters of the queue
+           (see PolicyQueue.get_stats), for all of the component's queues
+           or only for queue_name.
+           Args:
+               queue_name: the name of the queue, or None for all queues
+           Raises:
+               QueueDoesNotExist - if no queue has the name
+        """
+        if queue_name is None:
+            queue_names = self.get_all_queue_names()
+        else:
+            self.get_queue(queue_name)
+            queue_names = [queue_name]
+        stats = {}
+        for name in queue_names:
+            queue = self.queues[name]
+            if hasattr(queue, "get_stats"):
+                stats[name] = queue.get_stats()
+            else:
+                stats[name] = {"size": queue.maxsize, "length": queue.qsize()}
+        return stats
+
+    def start_profiling(self, duration, routine=None, interval=DEFAULT_SAMPLING_INTERVAL):
+        """
+           Samples the stacks of the component's routines for 'duration'
+           seconds and returns them in the collapsed stack format (see
+           pipert.core.profiler), ready to be turned into a flamegraph.
+           Only routines that run on threads of their own can be sampled,
+           routines that run as processes or as coroutines on the event loop
+           of the component (whose stacks are those of the loop) are skipped
+           and listed under 'skipped_routines'.
+           Args:
+               duration: the number of seconds to sample for
+               routine: the name of the routine to sample, or None for all
+               of the routines
+               interval: the number of seconds between two samples
+           Raises:
+               RoutineDoesNotExist - if no routine has the name
+        """
+        if routine is None:
+            routines = self._routines
+        elif routine in self._routines:
+            routines = {routine: self._routines[routine]}
+        else:
+            raise RoutineDoesNotExist(routine)
+        threads = {}
+        skipped = []
+        for routine_name, routine_object in routines.items():
+            runner = routine_object.runner if isinstance(routine_object, Routine) else routine_object
+            if isinstance(runner, Thread) and runner.ident is not None:
+                threads[runner.ident] = routine_name
+            else:
+                skipped.append(routine_name)
+        # gevent.sleep keeps the zerorpc server of the component responsive
+        import gevent
+        sampler = profile_threads(threads, duration, interval=interval, sleep=gevent.sleep)
+        return {
+            "duration": duration,
+            "interval": interval,
+            "samples": sampler.samples,
+            "routines": list(threads.values()),
+            "skipped_routines": skipped,
+            "collapsed_stacks": sampler.collapsed_stacks()
+        }
+
     def get_queue(self, queue_name):
         """
            Returns the queue object by its name
@@ -229,12 +434,184 @@ class BaseComponent:
         return routine_name in self._routines
 
     def remove_routine(self, routine_name):
+        """
+           Removes a routine from the component, a routine of a running
+           component is drained first: it finishes the iteration it is in
+           and cleans up, while the other routines keep running.
+           Args:
+               routine_name: the name of the routine
+           Returns: True if the routine was removed, False if it doesn't exist
+        """
+        if self.does_routine_name_exist(routine_name):
+            routine = self._routines.pop(routine_name)
+            if self.is_component_running() and isinstance(routine, Routine):
+                self._drain_routine(routine)
+            return True
+        else:
+            return False
+
+    def add_routine(self, routine_name, routine_parameters):
+        """
+           Creates a routine from its configuration, in the format of the
+           routines of the component's configuration, and registers it. The
+           routine of a running component starts right away.
+           Args:
+               routine_name: the name of the routine
+               routine_parameters: the parameters of the routine, including
+               its 'routine_type_name'
+           Returns: True if the routine was added, False if it can't be created
+           Raises:
+               RegisteredException - if a routine with the name exists
+               QueueDoesNotExist - if the routine uses a queue that doesn't exist
+        """
         if self.does_routine_name_exist(routine_name):
+            raise RegisteredException("routine name already exist")
+        routine = self._create_live_routine(routine_name, routine_parameters)
+        if routine is None:
+            return False
+        self.register_routine(routine)
+        if self.is_component_running():
+            routine.start()
+            self.logger.info("{0} Started".format(routine.name))
+        return True
+
+    def replace_routine(self, routine_name, routine_parameters, ready_timeout=60):
+        """
+           Replaces a routine with a new one that is created from the given
+           configuration, without stopping the rest of the component.
+
+           On a running component this is a drain-and-swap: the new routine
+           is started first and runs its setup (loading a model, connecting
+           to redis...) while the old routine keeps working. Once the new
+           routine is ready, the old one is drained - it finishes the
+           iteration it is in and cleans up - and the new one takes over its
+           queues, so the messages in the queues aren't lost.
+           Args:
+               routine_name: the name of the routine to replace
+               routine_parameters: the parameters of the new routine,
+               including its 'routine_type_name'
+               ready_timeout: the number of seconds to wait for the setup of
+               the new routine, the old routine is kept if it isn't ready
+           Returns: True if the routine was replaced, False if the new
+           routine can't be created or didn't get ready
+           Raises:
+               RoutineDoesNotExist - if no routine has the name
+               QueueDoesNotExist - if the new routine uses a queue that
+               doesn't exist
+        """
+        if not self.does_routine_name_exist(routine_name):
+            raise RoutineDoesNotExist(routine_name)
+        new_routine = self._create_live_routine(routine_name, routine_parameters)
+        if new_routine is None:
+            return False
+        if not self.is_component_running():
             del self._routines[routine_name]
+            self.register_routine(new_routine)
             return True
+        old_routine = self._routines[routine_name]
+        if not isinstance(old_routine, Routine):
+            self.logger.error("Routine %s can't be drained, stop the component to replace it", routine_name)
+            return False
+
+        del self._routines[routine_name]
+        new_routine.start_gate = new_routine._create_event()
+        self.register_routine(new_routine)
+        new_routine.start()
+        if not self._wait_until_ready(new_routine, ready_timeout):
+            self.logger.error("Routine %s didn't get ready in time, keeping the old routine",
+                              routine_name)
+            self._routines[routine_name] = old_routine
+            self._drain_routine(new_routine)
+            return False
+        self._drain_routine(old_routine)
+        new_routine.start_gate.set()
+        self.logger.info("Routine %s replaced", routine_name)
+        return True
+
+    def rewire_queue(self, routine_name, parameter_name, queue_name):
+        """
+           Connects a routine to another queue (or list of queues) in place
+           of the one that it gets in the parameter 'parameter_name'.
+           A routine that runs as a thread switches between two iterations
+           of its main logic, a routine that runs as a process has its own
+           copy of its queues, so it is replaced (see replace_routine).
+           Args:
+               routine_name: the name of the routine
+               parameter_name: the name of the routine's queue parameter
+               queue_name: the name of the new queue, or a list of names
+           Returns: True if the routine was connected to the queue, False if
+           it doesn't have the parameter or couldn't be replaced
+           Raises:
+               RoutineDoesNotExist - if no routine has the name
+               QueueDoesNotExist - if the queue doesn't exist
+        """
+        routine = self._routines.get(routine_name)
+        if not isinstance(routine, Routine):
+            raise RoutineDoesNotExist(routine_name)
+        if isinstance(queue_name, list):
+            queue = [self.get_queue(name) for name in queue_name]
         else:
+            queue = self.get_queue(queue_name)
+        if 'queue' not in parameter_name.lower() or not hasattr(routine, parameter_name):
+            self.logger.error("Routine %s has no queue parameter named %s", routine_name, parameter_name)
             return False
 
+        if routine.execution_mode == "process" and self.is_component_running():
+            routine_parameters = self._get_routine_creation(routine)
+            routine_parameters.pop("name")
+            routine_parameters[parameter_name] = queue_name
+            return self.replace_routine(routine_name, routine_parameters)
+
+        old_queue = getattr(routine, parameter_name)
+        if self.is_component_running():
+            routine.update_between_iterations(parameter_name, queue)
+            # a routine that waits on the old queue moves on to the new one
+            for input_queue in old_queue if isinstance(old_queue, list) else [old_queue]:
+                wake_waiters(input_queue)
+        else:
+            setattr(routine, parameter_name, queue)
+        return True
+
+    def _create_live_routine(self, routine_name, routine_parameters):
+        """
+        Creates a routine that is added to the component after its setup,
+        a routine that runs as a process can only use queues that were
+        created between processes.
+        """
+        routine = self._create_routine(routine_name, routine_parameters)
+        if routine is None:
+            self.logger.error("Can't create routine %s", routine_name)
+            return None
+        process_queues = self._get_queues_of_process_routines({routine_name: routine_parameters})
+        for queue_name in process_queues:
+            if not isinstance(self.queues[queue_name], SharedMemoryQueue):
+                self.logger.error("Routine %s runs as a process but queue %s isn't shared between processes",
+                                  routine_name, queue_name)
+                return None
+        return routine
+
+    @staticmethod
+    def _wait_until_ready(routine, timeout):
+        deadline = time.monotonic() + timeout
+        while not routine.ready_event.wait(min(routine.input_timeout, max(deadline - time.monotonic(), 0))):
+            if not routine.runner.is_alive() or time.monotonic() >= deadline:
+                return False
+        return True
+
+    def _drain_routine(self, routine):
+        """
+        Stops a single routine of a running component and waits for it to
+        finish the iteration it is in and clean up.
+        """
+        routine.detach_event.set()
+        if routine.start_gate is not None:
+            routine.start_gate.set()
+        for queue in routine.get_input_queues():
+            wake_waiters(queue)
+        if routine.runner is not None:
+            routine.runner.join()
+        self.logger.info("Routine {0} stopped".format(routine.name))
+
     def does_routines_use_queue(self, queue_name):
         for routine in self._routines.values():
             if routine.does_routine_use_queue(self.queues[queue_name]):
@@ -244,17 +621,34 @@ class BaseComponent:
     def is_component_running(self):
         return not self.stop_event.is_set()
 
+    def is_ready(self):
+        """
+           Returns True if the component is ready: every routine of a running
+           component finished its setup (loading models, connecting to
+           redis...), a component that isn't running is ready once it was
+           created.
+        """
+        if not self.is_component_running():
+            return True
+        return all(routine.ready_event.is_set() for routine in self._routines.values()
+                   if isinstance(routine, Routine))
+
     def get_routines(self):
         return self._routines
 
     def get_component_configuration(self):
         component_dict = {
             "shared_memory": self.use_memory,
-            "queues":
-                list(self.get_all_queue_names()),
+            "queues": [],
             "routines": {}
         }
 
+        for queue_name, queue in self.queues.items():
+            component_dict["queues"].append(self._get_queue_creation(queue_name, queue))
+
+        if self.frame_codec_config is not None:
+            component_dict["frame_codec"] = self.frame_codec_config
+
         if type(self).__name__ != BaseComponent.__name__:
             component_dict["component_type_name"] = type(self).__name__
         for current_routine_object in self._routines.values():
@@ -265,24 +659,50 @@ class BaseComponent:
                 routine_creation_dict
         return {self.name: component_dict}
 
+    @staticmethod
+    def _get_queue_creation(queue_name, queue):
+        if isinstance(queue, LatestSlot):
+            return {"name": queue_name, "kind": "latest"}
+        queue_dict = {"name": queue_name}
+        if queue.maxsize != 1:
+            queue_dict["size"] = queue.maxsize
+        if getattr(queue, "policy", "block") != "block":
+            queue_dict["policy"] = queue.policy
+        if len(queue_dict) == 1:
+            return queue_name
+        return queue_dict
+
     def _get_routine_creation(self, routine):
         routine_dict = routine.get_creation_dictionary()
         routine_dict["routine_type_name"] = routine.__class__.__name__
+        if routine.execution_mode != "thread":
+            routine_dict["execution_mode"] = routine.execution_mode
         for routine_param_name in routine_dict.keys():
             if "queue" in routine_param_name:
-                for queue_name in self.queues.keys():
-                    if getattr(routine, routine_param_name) is \
-                            self.queues[queue_name]:
-                        routine_dict[routine_param_name] = queue_name
+                routine_queue = getattr(routine, routine_param_name)
+                if isinstance(routine_queue, list):
+                    routine_dict[routine_param_name] = \
+                        [self._get_queue_name(queue) for queue in routine_queue]
+                else:
+                    routine_dict[routine_param_name] = self._get_queue_name(routine_queue)
 
         return routine_dict
 
+    def _get_queue_name(self, queue):
+        for queue_name in self.queues.keys():
+            if queue is self.queues[queue_name]:
+                return queue_name
+        return queue
+
     def set_monitoring_system(self, monitoring_system_parameters):
-        monitoring_system_factory = ClassFactory(self.MONITORING_SYSTEMS_FOLDER_PATH)
+        monitoring_system_factory = ClassFactory(self.MONITORING_SYSTEMS_FOLDER_PATH,
+                                                 METRICS_COLLECTORS_ENTRY_POINT_GROUP)
         if "name" not in monitoring_system_parameters:
             print("No name parameter found inside the monitoring system")
             return
         monitoring_system_name = monitoring_system_parameters.pop("name") + "Collector"
+        if "flush_interval" in monitoring_system_parameters:
+            get_metrics_flusher().interval = monitoring_system_parameters.pop("flush_interval")
         monitoring_system_class = monitoring_system_factory.get_class(monitoring_system_name)
         if monitoring_system_class is None:
             return
@@ -291,6 +711,25 @@ class BaseComponent:
         except TypeError:
             print("Bad parameters given for the monitoring system " + monitoring_system_name)
 
+    def set_frame_codec(self, frame_codec_config):
+        """
+        Sets the codec that the component's output routines use to compress
+        frames that aren't passed through shared memory.
+        Args:
+            frame_codec_config: the name of the codec or a dictionary with
+            the name and the codec parameters, see pipert.core.codecs.
+        """
+        try:
+            frame_codec = get_codec(frame_codec_config)
+        except (ValueError, TypeError, ImportError) as error:
+            self.logger.error("Can't use the frame codec %s: %s", frame_codec_config, error)
+            return
+        self.frame_codec = frame_codec
+        self.frame_codec_config = frame_codec_config
+        for routine in self._routines.values():
+            if isinstance(routine, Routine):
+                routine.frame_codec = frame_codec
+
     def set_routine_attribute(self, routine_name, attribute_name, attribute_value):
         routine = self._routines.get(routine_name, None)
         if routine is not None:
@@ -26,3 +26,15 @@ class QueueDoesNotExist(Exception):
 
     def message(self):
         return "The queue " + self.queue_name + " doesn't exist"
+
+
+class RoutineDoesNotExist(Exception):
+    """
+        Exception class to raise if Routine doesn't exist in a component
+    """
+
+    def __init__(self, routine_name):
+        self.routine_name = routine_name
+
+    def message(self):
+        return "The routine " + self.routine_name + " doesn't exist"
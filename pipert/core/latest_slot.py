@@ -0,0 +1,140 @@
+import queue
+import threading
+
+from pipert.core import tracing
+from pipert.core.utlis.queue_handler import QueueListeners
+
+
+class LatestSlot:
+    """
+    A single slot mailbox for one producer and one consumer that always
+    holds the latest item that was put into it.
+
+    Putting an item replaces the item in the slot, whether the consumer took
+    it or not, so a put never blocks or raises queue.Full, and the consumer
+    always gets the newest frame. Every item is tagged with an increasing
+    sequence number, which is how the consumer knows whether the slot holds
+    an item it didn't take yet.
+
+    Storing and reading the slot are single attribute accesses, which are
+    atomic under the GIL, so no lock is taken on the way unless the consumer
+    is blocked waiting for an item.
+
+    The slot has the put/get interface of queue.Queue, so it can replace a
+    Queue(maxsize=1) that is used with QueueHandler or with the
+    "get(block=False) and put" pattern.
+    """
+
+    def __init__(self):
+        self.maxsize = 1
+        # (sequence, item) of the latest item that was put into the slot
+        self._entry = (0, None)
+        self._taken_sequence = 0
+        self.dropped = 0
+        self._consumer_waiting = False
+        self._new_item = threading.Event()
+        self.listeners = QueueListeners()
+
+    @property
+    def sequence(self):
+        """
+        The sequence number of the latest item that was put into the slot.
+        """
+        return self._entry[0]
+
+    def put(self, item, block=True, timeout=None):
+        """
+        Replaces the item in the slot, the block and timeout arguments exist
+        for compatibility with queue.Queue and are ignored.
+        """
+        tracing.on_enqueue(item)
+        sequence, _ = self._entry
+        if sequence != self._taken_sequence:
+            self.dropped += 1
+        self._entry = (sequence + 1, item)
+        if self._consumer_waiting:
+            self._new_item.set()
+        self.listeners.notify()
+
+    def put_nowait(self, item):
+        self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        """
+        Takes the latest item out of the slot.
+
+        Raises:
+            queue.Empty: if there is no item that wasn't taken yet, and none
+            was put in time (when blocking).
+        """
+        sequence, item = self._entry
+        if sequence == self._taken_sequence:
+            if not block or not self.wait_for_item(timeout):
+                raise queue.Empty
+            sequence, item = self._entry
+        self._taken_sequence = sequence
+        tracing.on_dequeue(item)
+        return item
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def wait_for_item(self, timeout=None, sequence=None):
+        """
+        Blocks until the slot holds an item that is newer than the given
+        sequence number (the last taken item by default), or until the
+        timeout passes or the waiters are woken up.
+
+        Returns:
+            True if there is a newer item, else False
+        """
+        if sequence is None:
+            sequence = self._taken_sequence
+        if self._entry[0] != sequence:
+            return True
+        self._new_item.clear()
+        self._consumer_waiting = True
+        try:
+            if self._entry[0] == sequence:
+                self._new_item.wait(timeout)
+        finally:
+            self._consumer_waiting = False
+        return self._entry[0] != sequence
+
+    def read(self, sequence=0, timeout=None):
+        """
+        Returns the latest item and its sequence number if it is newer than
+        the given sequence number, waiting up to timeout seconds for one,
+        without taking it out of the slot.
+
+        Returns:
+            a tuple of (sequence, item), or None if there is no newer item
+        """
+        if not self.wait_for_item(timeout, sequence=sequence):
+            return None
+        return self._entry
+
+    def get_stats(self):
+        """
+        Returns the counters of the slot as a dictionary, in the format of
+        PolicyQueue.get_stats.
+        """
+        return {
+            "policy": "latest",
+            "size": 1,
+            "length": self.qsize(),
+            "enqueued": self.sequence,
+            "dropped": self.dropped,
+        }
+
+    def wake_waiters(self):
+        self._new_item.set()
+
+    def qsize(self):
+        return 0 if self.empty() else 1
+
+    def empty(self):
+        return self._entry[0] == self._taken_sequence
+
+    def full(self):
+        return False
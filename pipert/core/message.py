@@ -1,15 +1,20 @@
-import collections
 from abc import ABC, abstractmethod
+from array import array
 
 import sys
 if sys.version_info.minor >= 8:
-    from pipert.core.multiprocessing_shared_memory import get_shared_memory_object
+    from pipert.core.multiprocessing_shared_memory import get_shared_memory_object, \
+        read_sequence, HEADER_SIZE
 else:
     from pipert.core.shared_memory_generator import get_shared_memory_object
+    from pipert.core.shared_memory import TornReadError
 
 import numpy as np
-import time
 import pickle
+import struct
+from pipert.core.codecs import decode_frame
+from pipert.core.message_history import MessageHistory
+from pipert.core.wire_data import encode_data, decode_data
 
 
 class Payload(ABC):
@@ -24,13 +29,96 @@ class Payload(ABC):
         pass
 
     @abstractmethod
-    def encode(self, generator):
+    def encode(self, generator, codec=None):
         pass
 
     @abstractmethod
     def is_empty(self):
         pass
 
+    def release(self):
+        """
+        Releases any external resource that the decoded payload data is
+        backed by (for example a shared memory segment).
+        """
+        pass
+
+
+def _write_frame(frame, generator):
+    """
+    Writes a frame into the next shared memory of the generator.
+
+    On python 3.8+ the frame is copied straight into an ndarray that is
+    backed by the shared memory buffer, so no intermediate bytes object
+    is created.
+
+    Args:
+        frame: the numpy array to write.
+        generator: the shared memory generator of the component.
+
+    Returns: the name of the shared memory that holds the frame and the
+    sequence number it was written with.
+    """
+    if sys.version_info.minor >= 8:
+        memory = generator.get_next_shared_memory(size=frame.nbytes)
+        shared_frame = np.ndarray(frame.shape, dtype=frame.dtype,
+                                  buffer=memory.buf, offset=HEADER_SIZE)
+        shared_frame[...] = frame
+        del shared_frame
+        return memory.name, read_sequence(memory)
+    else:
+        memory_name = generator.get_next_shared_memory_name()
+        memory = get_shared_memory_object(memory_name)
+        return memory_name, memory.write_frame(frame)
+
+
+def _read_frame(memory_name, shape, dtype, frame_size, sequence=None,
+                zero_copy=False):
+    """
+    Reads a frame from a shared memory.
+
+    Args:
+        memory_name: the name of the shared memory that holds the frame.
+        shape: the shape of the frame.
+        dtype: the dtype of the frame.
+        frame_size: the size of the frame in bytes.
+        sequence: the sequence number the frame was written with, used to
+        detect that the shared memory was already reused for another frame.
+        zero_copy: if this is True, a read-only view on the shared memory is
+        returned instead of a copy of the frame.
+
+    Returns: a tuple of the frame and the shared memory that has to be kept
+    open while the frame is in use (None if the frame is a copy), or
+    (None, None) if the shared memory doesn't exist or was overwritten.
+    """
+    memory = get_shared_memory_object(memory_name)
+    if not memory:
+        return None, None
+
+    if sys.version_info.minor >= 8:
+        if read_sequence(memory) != sequence:
+            memory.close()
+            return None, None
+        frame = np.ndarray(shape, dtype=dtype, buffer=memory.buf,
+                           offset=HEADER_SIZE)
+        if zero_copy:
+            frame.flags.writeable = False
+            return frame, memory
+        frame = frame.copy()
+        overwritten = read_sequence(memory) != sequence
+        memory.close()
+        if overwritten:
+            return None, None
+        return frame, None
+
+    try:
+        frame, version = memory.read_frame(copy=not zero_copy)
+    except TornReadError:
+        return None, None
+    if version != sequence:
+        return None, None
+    return frame, None
+
 
 class FramePayload(Payload):
 
@@ -39,56 +127,86 @@ class FramePayload(Payload):
         self.shape = None
         self.dtype = None
         self.frame_size = 0
+        self.sequence = None
+        self.codec = None
+        self.zero_copy = False
+        self._shared_memory = None
 
     def decode(self):
         if self.encoded:
             if isinstance(self.data, str):
                 decoded_img = self._get_frame()
+            elif self.codec is not None:
+                decoded_img = decode_frame(self.codec, self.data, self.shape, self.dtype)
             else:
                 decoded_img = np.frombuffer(self.data, dtype=self.dtype)
                 decoded_img = decoded_img.reshape(self.shape)
             self.data = decoded_img
             self.encoded = False
 
-    def encode(self, generator):
+    def encode(self, generator, codec=None):
+        """
+        Args:
+            generator: generator necessary for shared memory usage.
+            codec: a FrameCodec that compresses the frame if it isn't passed
+            through shared memory.
+        """
         if not self.encoded:
             self.shape = self.data.shape
             self.dtype = self.data.dtype
-            buf = self.data.tobytes()
-            if generator is None:
-                self.data = buf
+            self.frame_size = self.data.nbytes
+            if generator is None and codec is not None:
+                data = codec.encode(self.data)
+                self.codec = codec.name
+            elif generator is None:
+                data = self.data.tobytes()
             else:
-                if sys.version_info.minor >= 8:
-                    memory = generator.get_next_shared_memory(size=len(buf))
-                    memory.buf[:] = bytes(buf)
-                    self.data = memory.name
-                else:
-                    self.frame_size = len(buf)
-                    memory_name = generator.get_next_shared_memory_name()
-                    memory = get_shared_memory_object(memory_name)
-                    memory.acquire_semaphore()
-                    memory.write_to_memory(buf)
-                    memory.release_semaphore()
-                    self.data = memory_name
+                data, self.sequence = _write_frame(self.data, generator)
+            self.release()
+            self.data = data
             self.encoded = True
 
     def is_empty(self):
         return self.data is None
 
+    def release(self):
+        """
+        Closes the shared memory that a zero copy frame is viewing.
+        The frame itself is dropped from the payload before closing, so
+        make sure no other reference to it is used afterwards.
+        """
+        if self._shared_memory is not None:
+            if not self.encoded:
+                self.data = None
+            try:
+                self._shared_memory.close()
+                self._shared_memory = None
+            except BufferError:
+                # the frame is still referenced outside of the payload,
+                # the memory will be closed once it is garbage collected
+                pass
+
     def _get_frame(self):
-        memory = get_shared_memory_object(self.data)
+        frame, self._shared_memory = _read_frame(self.data, self.shape,
+                                                 self.dtype, self.frame_size,
+                                                 sequence=self.sequence,
+                                                 zero_copy=self.zero_copy)
+        return frame
 
-        if memory:
-            if sys.version_info.minor >= 8:
-                data = bytes(memory.buf)
-                memory.close()
-            else:
-                memory.acquire_semaphore()
-                data = memory.read_from_memory(self.frame_size)
-                memory.release_semaphore()
-            frame = np.frombuffer(data, dtype=self.dtype)
-            return frame.reshape(self.shape)
-        return None
+    def is_overwritten(self):
+        """
+        Returns True if the shared memory that a zero copy frame is viewing
+        was already reused by the producer for a newer frame.
+        """
+        return self._shared_memory is not None and \
+            read_sequence(self._shared_memory) != self.sequence
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shared_memory"] = None
+        if isinstance(self.data, memoryview):
+            state["data"] = self.data.tobytes()
+        return state
 
 
 class PredictionPayload(Payload):
@@ -98,7 +216,7 @@ class PredictionPayload(Payload):
     def decode(self):
         pass
 
-    def encode(self, generator):
+    def encode(self, generator, codec=None):
         pass
 
     def is_empty(self):
@@ -115,56 +233,87 @@ class FrameMetadataPayload(Payload):
         self.shape = None
         self.dtype = None
         self.frame_size = 0
+        self.sequence = None
+        self.codec = None
+        self.zero_copy = False
+        self._shared_memory = None
 
     def decode(self):
         if self.encoded:
             if isinstance(self.data[0], str):
                 decoded_img = self._get_frame()
+            elif self.codec is not None:
+                decoded_img = decode_frame(self.codec, self.data[0], self.shape, self.dtype)
             else:
                 decoded_img = np.frombuffer(self.data[0], dtype=self.dtype)
                 decoded_img = decoded_img.reshape(self.shape)
             self.data = (decoded_img, self.data[1])
             self.encoded = False
 
-    def encode(self, generator):
+    def encode(self, generator, codec=None):
+        """
+        Args:
+            generator: generator necessary for shared memory usage.
+            codec: a FrameCodec that compresses the frame if it isn't passed
+            through shared memory.
+        """
         if not self.encoded:
             self.shape = self.data[0].shape
             self.dtype = self.data[0].dtype
-            buf = self.data[0].tobytes()
-            if generator is None:
-                self.data = (buf, self.data[1])
+            self.frame_size = self.data[0].nbytes
+            if generator is None and codec is not None:
+                data = (codec.encode(self.data[0]), self.data[1])
+                self.codec = codec.name
+            elif generator is None:
+                data = (self.data[0].tobytes(), self.data[1])
             else:
-                if sys.version_info.minor >= 8:
-                    memory = generator.get_next_shared_memory(size=len(buf))
-                    memory.buf[:] = bytes(buf)
-                    self.data = (memory.name, self.data[1])
-                else:
-                    self.frame_size = len(buf)
-                    memory_name = generator.get_next_shared_memory_name()
-                    memory = get_shared_memory_object(memory_name)
-                    memory.acquire_semaphore()
-                    memory.write_to_memory(buf)
-                    memory.release_semaphore()
-                    self.data = (memory_name, self.data[1])
+                memory_name, self.sequence = _write_frame(self.data[0], generator)
+                data = (memory_name, self.data[1])
+            self.release()
+            self.data = data
             self.encoded = True
 
     def is_empty(self):
         return self.data is None
 
+    def release(self):
+        """
+        Closes the shared memory that a zero copy frame is viewing.
+        The frame itself is dropped from the payload before closing, so
+        make sure no other reference to it is used afterwards.
+        """
+        if self._shared_memory is not None:
+            if not self.encoded:
+                self.data = (None, self.data[1])
+            try:
+                self._shared_memory.close()
+                self._shared_memory = None
+            except BufferError:
+                # the frame is still referenced outside of the payload,
+                # the memory will be closed once it is garbage collected
+                pass
+
     def _get_frame(self):
-        memory = get_shared_memory_object(self.data[0])
+        frame, self._shared_memory = _read_frame(self.data[0], self.shape,
+                                                 self.dtype, self.frame_size,
+                                                 sequence=self.sequence,
+                                                 zero_copy=self.zero_copy)
+        return frame
 
-        if memory:
-            if sys.version_info.minor >= 8:
-                data = bytes(memory.buf)
-                memory.close()
-            else:
-                memory.acquire_semaphore()
-                data = memory.read_from_memory(self.frame_size)
-                memory.release_semaphore()
-            frame = np.frombuffer(data, dtype=self.dtype)
-            return frame.reshape(self.shape)
-        return None
+    def is_overwritten(self):
+        """
+        Returns True if the shared memory that a zero copy frame is viewing
+        was already reused by the producer for a newer frame.
+        """
+        return self._shared_memory is not None and \
+            read_sequence(self._shared_memory) != self.sequence
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_shared_memory"] = None
+        if self.data is not None and isinstance(self.data[0], memoryview):
+            state["data"] = (self.data[0].tobytes(), self.data[1])
+        return state
 
 
 class Message:
@@ -178,7 +327,7 @@ class Message:
         else:
             self.payload = PredictionPayload(data)
         self.source_address = source_address
-        self.history = collections.defaultdict(dict)  # TODO: Maybe use OrderedDict?
+        self.history = MessageHistory()
         self.reached_exit = False
         self.id = f"{self.source_address}_{Message.counter}"
         Message.counter += 1
@@ -186,6 +335,7 @@ class Message:
     def update_payload(self, data):
         if self.payload.encoded:
             self.payload.decode()
+        self.payload.release()
         self.payload.data = data
 
     def get_payload(self):
@@ -205,7 +355,7 @@ class Message:
             component_name: the name of the component that the message entered.
             logger: the logger object of the component's input routine.
         """
-        self.history[component_name]["entry"] = time.time()
+        self.history.record(component_name, "entry")
         logger.debug("Received the following message: %s", str(self))
 
     def record_custom(self, component_name, section):
@@ -218,9 +368,9 @@ class Message:
             section: the name of the section within the component that the
             message entered.
         """
-        self.history[component_name][section] = time.time()
+        self.history.record(component_name, section)
 
-    def record_exit(self, component_name, logger):
+    def record_exit(self, component_name, logger, pipeline_exit=False):
         """
         Records the timestamp of the message's exit out of a component.
         Additionally, it enables a flag called 'reached_exit' if the message is exiting
@@ -229,10 +379,12 @@ class Message:
         Args:
             component_name: the name of the component that the message exited.
             logger: the logger object of the component's output routine.
+            pipeline_exit: whether the component is an output component of
+            the pipeline.
         """
-        if "exit" not in self.history[component_name]:
-            self.history[component_name]["exit"] = time.time()
-            if component_name == "FlaskVideoDisplay" or component_name == "VideoWriter":
+        if not self.history.has(component_name, "exit"):
+            self.history.record(component_name, "exit")
+            if pipeline_exit:
                 logger.debug("The following message has reached the exit: %s", str(self))
                 self.reached_exit = True
             else:
@@ -249,11 +401,10 @@ class Message:
         Args:
             component_name: the name of the relevant component.
         """
-        if component_name in self.history and \
-                'entry' in self.history[component_name] and \
-                'exit' in self.history[component_name]:
-            return self.history[component_name]['exit'] - \
-                self.history[component_name]['entry']
+        entry = self.history.get(component_name, "entry")
+        exit_ = self.history.get(component_name, "exit")
+        if entry is not None and exit_ is not None:
+            return (exit_ - entry) / 1e9
         else:
             return None
 
@@ -264,13 +415,13 @@ class Message:
         Args:
             output_component: the name of the pipeline's output component.
         """
-        if output_component in self.history and self.reached_exit:
-            try:
-                return self.history[output_component]['exit'] - self.history['VideoCapture']['entry']
-            except KeyError:
-                return None
-        else:
-            return None
+        if self.reached_exit:
+            exit_ = self.history.get(output_component, "exit")
+            if exit_ is not None and len(self.history):
+                # the first timestamp is where the message entered the pipeline
+                entry = min(timestamp for _, _, timestamp in self.history)
+                return (exit_ - entry) / 1e9
+        return None
 
     def __str__(self):
         return f"{{msg id: {self.id}, " \
@@ -284,34 +435,225 @@ class Message:
                f"history: {self.history} \n"
 
 
-def message_encode(msg, generator=None):
+# The binary wire format of a message is made of a fixed header, followed
+# by the frame shape, the message id, the source address, the frame dtype,
+# the frame codec name, the shared memory name, the history name table, the
+# history entries, the non frame data of the payload (see
+# pipert.core.wire_data) and finally the frame bytes. The numbers are little
+# endian, whatever the byte order of the host.
+BINARY_MAGIC = b"PRTM"
+BINARY_FORMAT_VERSION = 4
+# magic, format version, payload kind, flags, ndim, shared memory sequence,
+# frame bytes size, id length, source address length, dtype length, codec
+# name length, shared memory name length, history names count, history
+# entries count, extra data length
+_BINARY_HEADER = struct.Struct("<4sBBBBqQHHBBHHII")
+
+_FRAME_KIND = 0
+_FRAME_METADATA_KIND = 1
+_PREDICTION_KIND = 2
+
+_REACHED_EXIT_FLAG = 1
+_SHARED_MEMORY_FLAG = 2
+_INT_SOURCE_FLAG = 4
+_FRAME_FLAG = 8
+
+
+def _binary_encode(msg, generator, codec):
+    payload = msg.payload
+    flags = _REACHED_EXIT_FLAG if msg.reached_exit else 0
+    shape, dtype, frame_size, sequence = (), b"", 0, -1
+    codec_name, memory_name, frame_buffer, extra = b"", b"", b"", b""
+
+    if isinstance(payload, (FramePayload, FrameMetadataPayload)):
+        if generator is not None or codec is not None:
+            payload.encode(generator, codec)
+        if isinstance(payload, FrameMetadataPayload):
+            kind = _FRAME_METADATA_KIND
+            frame, metadata = payload.data
+            extra = encode_data(metadata)
+        else:
+            kind = _FRAME_KIND
+            frame = payload.data
+
+        if frame is None:
+            pass
+        elif not payload.encoded:
+            frame = np.ascontiguousarray(frame)
+            shape, dtype, frame_size = frame.shape, frame.dtype.str.encode(), frame.nbytes
+            frame_buffer = memoryview(frame).cast("B")
+            flags |= _FRAME_FLAG
+        else:
+            shape = payload.shape
+            dtype = np.dtype(payload.dtype).str.encode()
+            if isinstance(frame, str):
+                flags |= _SHARED_MEMORY_FLAG
+                memory_name = frame.encode()
+                frame_size = payload.frame_size
+                if payload.sequence is not None:
+                    sequence = payload.sequence
+            else:
+                frame_buffer = frame
+                frame_size = len(frame_buffer)
+                flags |= _FRAME_FLAG
+                if payload.codec is not None:
+                    codec_name = payload.codec.encode()
+    else:
+        kind = _PREDICTION_KIND
+        extra = encode_data(payload.data)
+
+    if isinstance(msg.source_address, int):
+        flags |= _INT_SOURCE_FLAG
+    msg_id = str(msg.id).encode()
+    source_address = str(msg.source_address).encode()
+
+    history_names, history_entries = msg.history.to_table()
+    history_names = [name.encode() for name in history_names]
+
+    parts = [_BINARY_HEADER.pack(BINARY_MAGIC, BINARY_FORMAT_VERSION, kind,
+                                 flags, len(shape), sequence, frame_size,
+                                 len(msg_id), len(source_address), len(dtype),
+                                 len(codec_name), len(memory_name),
+                                 len(history_names), len(msg.history),
+                                 len(extra)),
+             struct.pack(f"<{len(shape)}Q", *shape),
+             msg_id, source_address, dtype, codec_name, memory_name,
+             struct.pack(f"<{len(history_names)}H", *map(len, history_names))]
+    parts.extend(history_names)
+    if sys.byteorder != "little":
+        history_entries.byteswap()
+    parts.append(history_entries.tobytes())
+    parts.append(extra)
+    parts.append(frame_buffer)
+    return b"".join(parts)
+
+
+def _binary_decode(encoded_msg, lazy, zero_copy):
+    view = memoryview(encoded_msg)
+    magic, version, kind, flags, ndim, sequence, frame_size, id_length, \
+        source_length, dtype_length, codec_length, name_length, history_names_count, \
+        history_count, extra_length = _BINARY_HEADER.unpack_from(view, 0)
+    if version != BINARY_FORMAT_VERSION:
+        raise ValueError(f"Unsupported message format version {version}")
+    offset = _BINARY_HEADER.size
+
+    def read_bytes(length):
+        nonlocal offset
+        offset += length
+        return view[offset - length:offset]
+
+    shape = struct.unpack_from(f"<{ndim}Q", view, offset)
+    offset += 8 * ndim
+    msg_id = bytes(read_bytes(id_length)).decode()
+    source_address = bytes(read_bytes(source_length)).decode()
+    if flags & _INT_SOURCE_FLAG:
+        source_address = int(source_address)
+    dtype = bytes(read_bytes(dtype_length)).decode()
+    codec_name = bytes(read_bytes(codec_length)).decode()
+    memory_name = bytes(read_bytes(name_length)).decode()
+
+    history_name_lengths = struct.unpack_from(f"<{history_names_count}H", view, offset)
+    offset += 2 * history_names_count
+    history_names = [bytes(read_bytes(length)).decode() for length in history_name_lengths]
+    history_entries = array("q")
+    history_entries.frombytes(read_bytes(history_count * MessageHistory.ENTRY_SIZE
+                                         * history_entries.itemsize))
+    if sys.byteorder != "little":
+        history_entries.byteswap()
+    history = MessageHistory.from_table(history_names, history_entries)
+
+    extra = read_bytes(extra_length)
+
+    if kind == _PREDICTION_KIND:
+        payload = PredictionPayload(decode_data(extra))
+    else:
+        if flags & _SHARED_MEMORY_FLAG:
+            frame = memory_name
+        elif flags & _FRAME_FLAG:
+            frame = read_bytes(frame_size)
+        else:
+            frame = None
+        if kind == _FRAME_METADATA_KIND:
+            payload = FrameMetadataPayload((frame, decode_data(extra)))
+        else:
+            payload = FramePayload(frame)
+        payload.shape = shape
+        payload.dtype = np.dtype(dtype)
+        payload.frame_size = frame_size
+        payload.sequence = sequence if sequence >= 0 else None
+        payload.codec = codec_name or None
+        payload.zero_copy = zero_copy
+        payload.encoded = frame is not None
+
+    msg = Message.__new__(Message)
+    msg.payload = payload
+    msg.source_address = source_address
+    msg.history = history
+    msg.reached_exit = bool(flags & _REACHED_EXIT_FLAG)
+    msg.id = msg_id
+    if not lazy:
+        msg.payload.decode()
+    return msg
+
+
+def message_encode(msg, generator=None, binary=True, codec=None):
     """
     Encodes the message object.
 
     This method compresses the message payload and then serializes the whole
-    message object into bytes, using pickle.
+    message object into bytes, using the binary wire format or pickle.
+
+    The binary format doesn't pickle anything: the frame bytes are written
+    after a fixed header, so they can be decoded without a copy, and the non
+    frame data of the payload (predictions or frame metadata) is encoded as
+    data only (see pipert.core.wire_data).
 
     Args:
         msg: the message to encode.
         generator: generator necessary for shared memory usage.
+        binary: if this is False, the message is pickled instead, for
+        receivers that don't support the binary format. Only decode those
+        messages from trusted senders (see message_decode).
+        codec: a FrameCodec (see pipert.core.codecs) that compresses frames
+        which aren't passed through shared memory, the receiving side
+        decodes them automatically.
     """
-    msg.payload.encode(generator)
+    if binary:
+        return _binary_encode(msg, generator, codec)
+    msg.payload.encode(generator, codec)
     return pickle.dumps(msg)
 
 
-def message_decode(encoded_msg, lazy=False):
+def message_decode(encoded_msg, lazy=False, zero_copy=False, allow_pickle=False):
     """
     Decodes the message object.
 
-    This method deserializes the pickled message, and decodes the message
-    payload if 'lazy' is False.
+    This method deserializes the binary encoded (or pickled, if allowed)
+    message, and decodes the message payload if 'lazy' is False.
 
     Args:
         encoded_msg: the message to decode.
         lazy: if this is True, then the payload will only be decoded once it's
         accessed.
+        zero_copy: if this is True, a frame that was passed through shared
+        memory is decoded into a read-only view on the shared memory instead
+        of being copied. The shared memory stays open until
+        `msg.payload.release()` is called or the payload is replaced.
+        allow_pickle: if this is True, messages that aren't in the binary
+        format are unpickled. Unpickling runs any code that the sender
+        chooses, so only allow it for trusted senders.
+
+    Raises:
+        ValueError: if the message isn't in the binary format and pickle
+        isn't allowed.
     """
+    if encoded_msg[:len(BINARY_MAGIC)] == BINARY_MAGIC:
+        return _binary_decode(encoded_msg, lazy, zero_copy)
+    if not allow_pickle:
+        raise ValueError("The message isn't in the binary format, and unpickling it isn't allowed")
     msg = pickle.loads(encoded_msg)
+    if hasattr(msg.payload, "zero_copy"):
+        msg.payload.zero_copy = zero_copy
     if not lazy:
         msg.payload.decode()
     return msg
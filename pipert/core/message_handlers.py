@@ -1,5 +1,4 @@
 from abc import ABC, abstractmethod
-import redis
 
 
 class MessageHandler(ABC):
@@ -30,7 +29,7 @@ class MessageHandler(ABC):
         pass
 
     @abstractmethod
-    def read_most_recent_msg(self, in_key):
+    def read_most_recent_msg(self, in_key, block_ms=None):
         """
         Reads the latest message in the message broker,
         cannot read the same message twice.
@@ -38,6 +37,25 @@ class MessageHandler(ABC):
         Args:
             in_key: the name of the queue/stream at which the relevant message
             is located.
+            block_ms: the number of milliseconds to wait for a new message
+            if there isn't any, None to return immediately.
+        """
+        pass
+
+    @abstractmethod
+    def read_batch(self, in_key, max_count, block_ms=None):
+        """
+        Reads all of the messages that follow the one that was last read,
+        up to max_count messages, in the order in which they were sent.
+        If no message has been read before, then read the last message in
+        the message broker.
+
+        Args:
+            in_key: the name of the queue/stream at which the relevant
+            messages are located.
+            max_count: the maximal number of messages to read.
+            block_ms: the number of milliseconds to wait for new messages
+            if there aren't any, None to return immediately.
         """
         pass
 
@@ -53,6 +71,18 @@ class MessageHandler(ABC):
         """
         pass
 
+    @abstractmethod
+    def send_many(self, out_key, msgs):
+        """
+        Sends several messages to the message broker at once.
+
+        Args:
+            out_key: the name of the queue/stream at which the relevant
+            messages will be placed.
+            msgs: the message objects that are being sent, in order.
+        """
+        pass
+
     @abstractmethod
     def connect(self):
         """
@@ -68,70 +98,123 @@ class MessageHandler(ABC):
         pass
 
 
-class RedisHandler(MessageHandler):
+class RedisStreamHandler(MessageHandler, ABC):
+    """
+    The state that the redis handlers keep about the streams they read:
+    the id of the last message that was read, which the next read starts
+    after, and how the replies of redis are parsed. The handlers only
+    differ in how they talk to redis.
+    """
+    MSG_FIELD = b"msg"
 
     def __init__(self, url, maxlen=100):
         self.conn = None
         self.url = url
         self.maxlen = maxlen
         self.last_msg_id = None
-        self.connect()
 
-    def read_next_msg(self, in_key):
-        return self._read_from_redis_using_method(
-            in_key=in_key,
-            reading_method=self.conn.xrange,
-            name=in_key,
-            count=1,
-            min=self._add_offset_to_stream_id(self.last_msg_id, 1)
-        )
-
-    def read_most_recent_msg(self, in_key):
-        return self._read_from_redis_using_method(
-            in_key=in_key,
-            reading_method=self.conn.xrevrange,
-            name=in_key,
-            count=1,
-            min=self._add_offset_to_stream_id(self.last_msg_id, 1)
-        )
+    def _next_msg_min_id(self):
+        """
+        Returns the smallest id of a message that wasn't read yet.
+        """
+        return self._add_offset_to_stream_id(self.last_msg_id, 1)
 
-    def receive(self, in_key):
-        # Need to set value in last_msg_id so
-        # _read_from_redis_using_method will not cause an infinite loop
-        self.last_msg_id = ""
-        msg = self._read_from_redis_using_method(
-            in_key,
-            self.conn.xrevrange,
-            name=in_key,
-            count=1
-        )
+    def _xread_arguments(self, in_key, max_count, block_ms):
+        """
+        Returns the arguments of an xread of the messages that follow the
+        last read one, or of the messages that are sent next if none was
+        read yet.
+        """
+        # nothing was sent yet, wait only for messages that come next
+        last_msg_id = "$" if self.last_msg_id is None else self.last_msg_id
+        # block=0 means waiting forever in redis, so make sure it is positive
+        if block_ms is not None:
+            block_ms = max(int(block_ms), 1)
+        return {"streams": {in_key: last_msg_id}, "count": max_count, "block": block_ms}
+
+    def _take_xread_msgs(self, redis_msgs):
+        """
+        Returns the messages of an xread reply, and marks them as read.
+        """
+        if not redis_msgs:
+            return []
+        _, stream_msgs = redis_msgs[0]
+        self.last_msg_id = stream_msgs[-1][0].decode()
+        return [fields[self.MSG_FIELD] for _, fields in stream_msgs]
+
+    def _take_range_msg(self, redis_msg):
+        """
+        Returns the first message of an xrange or xrevrange reply, or None
+        if it is empty, and marks it as read.
+        """
+        if not redis_msg:
+            return None
+        self.last_msg_id = redis_msg[0][0].decode()
+        return redis_msg[0][1][self.MSG_FIELD]
+
+    def _take_received_msg(self, redis_msg):
+        """
+        Returns the message of the xrevrange reply of a receive, where
+        nothing counts as read if the stream is empty.
+        """
+        msg = self._take_range_msg(redis_msg)
         if msg is None:
             self.last_msg_id = None
-
         return msg
 
-    def _read_from_redis_using_method(self,
-                                      in_key,
-                                      reading_method,
-                                      **method_args):
+    @staticmethod
+    def _add_offset_to_stream_id(stream_id, offset):
+        if stream_id is None:
+            return None
+        fixed_id = stream_id.split("-")
+        last_msg_id_to_read = '-'.join([fixed_id[0],
+                                        str(int(fixed_id[1]) + offset)])
+        return last_msg_id_to_read
+
+
+class RedisHandler(RedisStreamHandler):
+
+    def __init__(self, url, maxlen=100):
+        super().__init__(url, maxlen)
+        self.connect()
+
+    def read_next_msg(self, in_key):
         if self.last_msg_id is None:
             return self.receive(in_key)
-        redis_msg = reading_method(**method_args)
-
-        if not redis_msg:
-            return None
-        self.last_msg_id = redis_msg[0][0].decode()
-        msg = redis_msg[0][1]["msg".encode("utf-8")]
+        return self._take_range_msg(self.conn.xrange(name=in_key, count=1, min=self._next_msg_min_id()))
 
+    def read_most_recent_msg(self, in_key, block_ms=None):
+        if self.last_msg_id is None:
+            msg = self.receive(in_key)
+        else:
+            msg = self._take_range_msg(self.conn.xrevrange(name=in_key, count=1, min=self._next_msg_min_id()))
+        if msg is None and block_ms is not None:
+            msgs = self.read_batch(in_key, max_count=None, block_ms=block_ms)
+            if msgs:
+                msg = msgs[-1]
         return msg
 
+    def read_batch(self, in_key, max_count, block_ms=None):
+        if self.last_msg_id is None:
+            msg = self.receive(in_key)
+            if msg is not None:
+                return [msg]
+        return self._take_xread_msgs(self.conn.xread(**self._xread_arguments(in_key, max_count, block_ms)))
+
+    def receive(self, in_key):
+        return self._take_received_msg(self.conn.xrevrange(name=in_key, count=1))
+
     def send(self, out_key, msg):
-        fields = {
-            "msg": msg
-        }
-        _ = self.conn.xadd(out_key, fields, maxlen=self.maxlen)
+        _ = self.conn.xadd(out_key, {self.MSG_FIELD: msg}, maxlen=self.maxlen)
+
+    def send_many(self, out_key, msgs):
+        pipe = self.conn.pipeline(transaction=False)
+        for msg in msgs:
+            pipe.xadd(out_key, {self.MSG_FIELD: msg}, maxlen=self.maxlen)
+        _ = pipe.execute()
 
     def connect(self):
+        import redis
         self.conn = redis.Redis(host=self.url.hostname, port=self.url.port)
         if not self.conn.ping():
             raise Exception('Redis unavailable')
@@ -139,11 +222,58 @@ class RedisHandler(MessageHandler):
     def close(self):
         self.conn.close()
 
-    @staticmethod
-    def _add_offset_to_stream_id(stream_id, offset):
-        if stream_id is None:
-            return None
-        fixed_id = stream_id.split("-")
-        last_msg_id_to_read = '-'.join([fixed_id[0],
-                                        str(int(fixed_id[1]) + offset)])
-        return last_msg_id_to_read
+
+class AsyncRedisHandler(RedisStreamHandler):
+    """
+    A MessageHandler whose methods are coroutines, for the routines that run
+    on an event loop (see Routine.as_async): every method that talks to
+    redis is awaited instead of blocking the loop, with the same semantics
+    as in RedisHandler. connect has to be awaited before the handler is
+    used.
+    """
+
+    async def read_next_msg(self, in_key):
+        if self.last_msg_id is None:
+            return await self.receive(in_key)
+        return self._take_range_msg(await self.conn.xrange(name=in_key, count=1, min=self._next_msg_min_id()))
+
+    async def read_most_recent_msg(self, in_key, block_ms=None):
+        if self.last_msg_id is None:
+            msg = await self.receive(in_key)
+        else:
+            msg = self._take_range_msg(await self.conn.xrevrange(name=in_key, count=1,
+                                                                 min=self._next_msg_min_id()))
+        if msg is None and block_ms is not None:
+            msgs = await self.read_batch(in_key, max_count=None, block_ms=block_ms)
+            if msgs:
+                msg = msgs[-1]
+        return msg
+
+    async def read_batch(self, in_key, max_count, block_ms=None):
+        if self.last_msg_id is None:
+            msg = await self.receive(in_key)
+            if msg is not None:
+                return [msg]
+        return self._take_xread_msgs(await self.conn.xread(**self._xread_arguments(in_key, max_count, block_ms)))
+
+    async def receive(self, in_key):
+        return self._take_received_msg(await self.conn.xrevrange(name=in_key, count=1))
+
+    async def send(self, out_key, msg):
+        _ = await self.conn.xadd(out_key, {self.MSG_FIELD: msg}, maxlen=self.maxlen)
+
+    async def send_many(self, out_key, msgs):
+        pipe = self.conn.pipeline(transaction=False)
+        for msg in msgs:
+            pipe.xadd(out_key, {self.MSG_FIELD: msg}, maxlen=self.maxlen)
+        _ = await pipe.execute()
+
+    async def connect(self):
+        import redis.asyncio
+        self.conn = redis.asyncio.Redis(host=self.url.hostname, port=self.url.port)
+        if not await self.conn.ping():
+            raise Exception('Redis unavailable')
+
+    async def close(self):
+        # aclose replaced close in redis 5.0.1
+        await getattr(self.conn, "aclose", self.conn.close)()
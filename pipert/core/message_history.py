@@ -0,0 +1,173 @@
+from array import array
+import threading
+import time
+
+# Process wide table of interned component and section names, the history
+# entries hold indices into it instead of the names themselves.
+_name_ids = {}
+_names = []
+_names_lock = threading.Lock()
+
+
+def _intern_name(name):
+    name_id = _name_ids.get(name)
+    if name_id is None:
+        with _names_lock:
+            name_id = _name_ids.get(name)
+            if name_id is None:
+                name_id = len(_names)
+                _names.append(name)
+                _name_ids[name] = name_id
+    return name_id
+
+
+def to_wall_time(timestamp_ns):
+    """
+    Converts a history timestamp to seconds since the epoch, like the ones
+    returned by time.time().
+    """
+    return timestamp_ns / 1e9
+
+
+class MessageHistory:
+    """
+    A compact trace of the timestamps at which a message reached sections
+    (entry, exit or custom ones) of components.
+
+    Every entry is a (component id, section id, time_ns) triple kept in
+    a flat integer array, where the ids index an interned name table. This
+    keeps recording to a dictionary lookup and a single extend of the array
+    (so a triple is never split by a concurrent record), and makes the
+    history cheap to serialize and to merge.
+
+    The timestamps come from the wall clock rather than a monotonic one,
+    since the message passes between processes and hosts whose monotonic
+    clocks don't share an epoch.
+    """
+    ENTRY_SIZE = 3
+
+    def __init__(self):
+        self._entries = array("q")
+
+    def record(self, component_name, section, timestamp_ns=None):
+        """
+        Records the timestamp of the message's entry into some section of a
+        component.
+
+        Args:
+            component_name: the name of the component that the message is in.
+            section: the name of the section within the component.
+            timestamp_ns: the time.time_ns() of the entry, now if None.
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+        self._entries.extend((_intern_name(component_name), _intern_name(section), timestamp_ns))
+
+    def get(self, component_name, section):
+        """
+        Returns the last timestamp (in nanoseconds) recorded for the section
+        of the component, or None if it wasn't recorded.
+        """
+        component_id = _name_ids.get(component_name)
+        section_id = _name_ids.get(section)
+        if component_id is None or section_id is None:
+            return None
+        entries = self._entries
+        for index in range(len(entries) - self.ENTRY_SIZE, -1, -self.ENTRY_SIZE):
+            if entries[index] == component_id and entries[index + 1] == section_id:
+                return entries[index + 2]
+        return None
+
+    def has(self, component_name, section=None):
+        """
+        Returns True if the section of the component was recorded, or any
+        section of it if 'section' is None.
+        """
+        if section is not None:
+            return self.get(component_name, section) is not None
+        component_id = _name_ids.get(component_name)
+        return component_id is not None and \
+            component_id in self._entries[::self.ENTRY_SIZE]
+
+    def copy(self):
+        history = MessageHistory()
+        history._entries = array("q", self._entries)
+        return history
+
+    def merge(self, other):
+        """
+        Adds the entries of another message's history that this history
+        doesn't have yet, for example when two messages are joined. The
+        entries are kept in the order of their timestamps, so the last entry
+        of a section is still its latest one.
+        """
+        own_entries = set(self)
+        new_entries = [entry for entry in other if entry not in own_entries]
+        if not new_entries:
+            return
+        entries = sorted(list(self) + new_entries, key=lambda entry: entry[2])
+        merged = array("q")
+        for component_name, section, timestamp_ns in entries:
+            merged.extend((_intern_name(component_name), _intern_name(section), timestamp_ns))
+        self._entries = merged
+
+    def to_dict(self):
+        """
+        Returns the history as a dictionary of component name to a
+        dictionary of section name to timestamp in seconds.
+        """
+        history = {}
+        for component_name, section, timestamp_ns in self:
+            history.setdefault(component_name, {})[section] = timestamp_ns / 1e9
+        return history
+
+    def to_table(self):
+        """
+        Returns the names that the history uses and its entries, where the
+        ids in the entries are indices into the returned names.
+        """
+        local_ids = {}
+        names = []
+        entries = array("q", self._entries)
+        for index in range(len(entries)):
+            if index % self.ENTRY_SIZE == 2:
+                continue
+            local_id = local_ids.get(entries[index])
+            if local_id is None:
+                local_id = local_ids[entries[index]] = len(names)
+                names.append(_names[entries[index]])
+            entries[index] = local_id
+        return names, entries
+
+    @classmethod
+    def from_table(cls, names, entries):
+        """
+        Creates a history from the output of to_table.
+        """
+        history = cls()
+        name_ids = [_intern_name(name) for name in names]
+        history._entries = array("q", entries)
+        for index in range(len(entries)):
+            if index % cls.ENTRY_SIZE != 2:
+                history._entries[index] = name_ids[entries[index]]
+        return history
+
+    def __getstate__(self):
+        return self.to_table()
+
+    def __setstate__(self, state):
+        self._entries = self.from_table(*state)._entries
+
+    def __iter__(self):
+        entries = self._entries
+        for index in range(0, len(entries), self.ENTRY_SIZE):
+            yield _names[entries[index]], _names[entries[index + 1]], entries[index + 2]
+
+    def __len__(self):
+        return len(self._entries) // self.ENTRY_SIZE
+
+    def __eq__(self, other):
+        return isinstance(other, MessageHistory) and list(self) == list(other)
+
+    def __str__(self):
+        return str(self.to_dict())
@@ -0,0 +1,166 @@
+from bisect import bisect_left
+import logging
+import os
+import threading
+import time
+
+from pipert.core import tracing
+
+# upper bounds (in seconds) of the buckets of the execution time histogram,
+# the same as the buckets of PrometheusCollector, with one more bucket for
+# longer times
+EXECUTION_TIME_BUCKETS = (0.0001, 0.0002, 0.0005, 0.001, 0.002, 0.005, 0.01,
+                          0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5)
+_BUCKET_BOUNDS_NS = tuple(int(bound * 1e9) for bound in EXECUTION_TIME_BUCKETS)
+
+# seconds between two flushes of the aggregated metrics to the collectors
+DEFAULT_FLUSH_INTERVAL = 1.0
+
+# the most message histories that a routine keeps between two flushes for
+# the latency breakdown, the rest are not reported
+MAX_EXITS_PER_FLUSH = 1000
+
+
+class ExecutionTimeStats:
+    """
+    The execution times of a routine's main_logic during one flush
+    interval: a histogram over EXECUTION_TIME_BUCKETS and the count, sum
+    and max of the times.
+    """
+    __slots__ = ("counts", "count", "sum_ns", "max_ns")
+
+    def __init__(self):
+        self.counts = [0] * (len(EXECUTION_TIME_BUCKETS) + 1)
+        self.count = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def add(self, execution_time_ns):
+        self.counts[bisect_left(_BUCKET_BOUNDS_NS, execution_time_ns)] += 1
+        self.count += 1
+        self.sum_ns += execution_time_ns
+        if execution_time_ns > self.max_ns:
+            self.max_ns = execution_time_ns
+
+    def to_dict(self):
+        """
+        Returns the stats with the times in seconds.
+        """
+        return {
+            "buckets": list(EXECUTION_TIME_BUCKETS),
+            "counts": list(self.counts),
+            "count": self.count,
+            "sum": self.sum_ns / 1e9,
+            "max": self.max_ns / 1e9
+        }
+
+
+class RoutineMetrics:
+    """
+    Accumulates the metrics of a routine locally, until they are flushed to
+    its metrics collector by the MetricsFlusher.
+    """
+
+    def __init__(self, routine_name, component_name, metrics_collector):
+        self.routine_name = routine_name
+        self.component_name = component_name
+        self.metrics_collector = metrics_collector
+        self.execution_times = ExecutionTimeStats()
+        self.exits = []
+
+    def add_exit(self, history):
+        """
+        Keeps a copy of the history of a message that leaves the component,
+        its latency breakdown is reported when the metrics are flushed.
+        """
+        if len(self.exits) < MAX_EXITS_PER_FLUSH:
+            self.exits.append(history.copy())
+
+    def take(self):
+        """
+        Returns the stats that were accumulated since the last call and
+        starts new ones. The stats are swapped rather than locked, an
+        execution time that is added during the swap may be lost.
+        """
+        execution_times = self.execution_times
+        self.execution_times = ExecutionTimeStats()
+        return execution_times
+
+    def flush(self):
+        execution_times = self.take()
+        if execution_times.count:
+            self.metrics_collector.collect_execution_time_stats(
+                execution_times, self.routine_name, self.component_name)
+        exits, self.exits = self.exits, []
+        for history in exits:
+            self.metrics_collector.collect_latency_breakdown(
+                tracing.latency_breakdown(history), self.component_name)
+
+
+class MetricsFlusher:
+    """
+    A background thread that flushes the metrics of the registered routines
+    to their metrics collectors every 'interval' seconds, so the routines
+    themselves don't wait on the collectors.
+    """
+
+    def __init__(self, interval=DEFAULT_FLUSH_INTERVAL):
+        self.interval = interval
+        self._routines_metrics = []
+        self._lock = threading.Lock()
+        self._thread = None
+        self._logger = logging.getLogger(__name__)
+
+    def register(self, routine_metrics):
+        with self._lock:
+            self._routines_metrics.append(routine_metrics)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True,
+                                                name="pipert-metrics-flusher")
+                self._thread.start()
+
+    def unregister(self, routine_metrics):
+        """
+        Stops flushing the metrics of a routine, after flushing what is left.
+        """
+        with self._lock:
+            if routine_metrics in self._routines_metrics:
+                self._routines_metrics.remove(routine_metrics)
+        self._flush_routine(routine_metrics)
+
+    def flush(self):
+        with self._lock:
+            routines_metrics = list(self._routines_metrics)
+        for routine_metrics in routines_metrics:
+            self._flush_routine(routine_metrics)
+
+    def _flush_routine(self, routine_metrics):
+        try:
+            routine_metrics.flush()
+        except Exception:
+            self._logger.exception("Failed to flush the metrics of routine %s",
+                                   routine_metrics.routine_name)
+
+    def _run(self):
+        # a daemon thread, it runs for as long as the process does
+        while True:
+            time.sleep(self.interval)
+            self.flush()
+
+
+_flusher = None
+_flusher_pid = None
+
+
+def get_metrics_flusher():
+    """
+    Returns the MetricsFlusher of the current process (a routine that runs
+    as a process gets a flusher of its own).
+    """
+    global _flusher, _flusher_pid
+    if _flusher_pid != os.getpid():
+        # the thread of a flusher that was created before a fork doesn't
+        # exist in the child, but its interval is kept
+        _flusher = MetricsFlusher(DEFAULT_FLUSH_INTERVAL if _flusher is None else _flusher.interval)
+        _flusher_pid = os.getpid()
+    return _flusher
@@ -23,6 +23,23 @@ class MetricsCollector(ABC):
         """
         pass
 
+    def collect_execution_time_stats(self, execution_times, routine_name, component_name):
+        """
+        Saves the execution times of the routine's logic that were
+        aggregated since the last flush (see pipert.core.metrics_aggregator).
+        By default only their mean is passed to collect_execution_time, once
+        per flush, override this to save the aggregation itself.
+
+        Args:
+            execution_times: an ExecutionTimeStats.
+            routine_name: the name of the relevant routine.
+            component_name: the name of the routine's component.
+        """
+        if execution_times.count == 0:
+            return
+        self.collect_execution_time(execution_times.sum_ns / execution_times.count / 1e9,
+                                    routine_name, component_name)
+
     @abstractmethod
     def collect_latency(self, latency, output_component):
         """
@@ -37,6 +54,20 @@ class MetricsCollector(ABC):
         """
         pass
 
+    def collect_latency_breakdown(self, breakdown, component_name):
+        """
+        Saves the latency of a message that left a component, decomposed
+        into the time it waited in queues, was computed and was in transport
+        (see pipert.core.tracing.latency_breakdown).
+        By default only the total latency is passed to collect_latency,
+        override this to save the decomposition.
+
+        Args:
+            breakdown: the latency breakdown of the message, in seconds.
+            component_name: the name of the component the message left.
+        """
+        self.collect_latency(breakdown["total"], component_name)
+
 
 class NullCollector(MetricsCollector):
 
@@ -49,5 +80,11 @@ class NullCollector(MetricsCollector):
     def collect_execution_time(self, execution_time, routine_name, component_name):
         pass
 
+    def collect_execution_time_stats(self, execution_times, routine_name, component_name):
+        pass
+
+    def collect_latency_breakdown(self, breakdown, component_name):
+        pass
+
     def collect_latency(self, latency, output_component):
         pass
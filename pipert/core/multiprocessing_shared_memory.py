@@ -1,13 +1,18 @@
 from multiprocessing.shared_memory import SharedMemory
+import struct
+
+# Every shared memory starts with a header that holds the sequence number of
+# the frame that was last written into it, the data itself comes right after.
+SEQUENCE_HEADER = struct.Struct("Q")
+HEADER_SIZE = SEQUENCE_HEADER.size
 
 
 class MemoryIdGenerator:
     """
-    Generates a new id for a unique shared memory each time get_next is
-    called. The id's are in the following format:
-    "{component_name}_{serial_memory_number}", this helps make a unique
-    shared memory each time even with threads so that we won't override
-    any existing shared memories that were already created.
+    Iterates over a set amount of id's. The id's are in the following
+    format: "{component_name}_{serial_memory_number}", the serial number
+    wraps around after 'max_count' id's so every id represents a slot in
+    a ring of shared memories.
     """
     def __init__(self, component_name, max_count):
         self.component_name = component_name
@@ -16,18 +21,22 @@ class MemoryIdGenerator:
 
     def get_next(self):
         """
-        Generates the next id to use for the shared memory and return
-        the name of a shared memory to free if necessary.
+        Get the next shared memory name.
+
+        Returns: Next shared memory name in the ring.
         """
-        next_name = "{0}_{1}".format(self.component_name, self.name_count)
-        name_to_unlink = ""
+        next_name = "{0}_{1}".format(self.component_name,
+                                     self.name_count % self.max_count)
         self.name_count += 1
-        if self.name_count >= self.max_count:
-            name_to_unlink = "{0}_{1}".format(self.component_name,
-                                              (self.name_count
-                                               - self.max_count))
 
-        return next_name, name_to_unlink
+        return next_name
+
+    def release_last(self):
+        """
+        Takes back the last name, so the next call to get_next returns it
+        again.
+        """
+        self.name_count -= 1
 
 
 def get_shared_memory_object(name):
@@ -44,44 +53,77 @@ def get_shared_memory_object(name):
     return memory
 
 
+def read_sequence(memory):
+    """
+    Returns the sequence number of the data that was last written into
+    a shared memory created by MpSharedMemoryGenerator.
+    Params:
+        -memory: A SharedMemory object.
+    """
+    return SEQUENCE_HEADER.unpack_from(memory.buf, 0)[0]
+
+
 class MpSharedMemoryGenerator:
     """
-    Generates a new shared memory each time get_next_shared_memory is called
-    and is responsible for cleaning up shared memories if the count that
-    exists now exceeds the max or the proccess has ended.
+    Manages a ring of 'max_count' shared memories that are reused in place.
+    Each call to get_next_shared_memory returns the next slot of the ring
+    after bumping its sequence number, so readers can detect that the data
+    they refer to was overwritten. A slot is reallocated only when the
+    requested size changes, and all of them are cleaned up when the
+    component stops.
     """
     def __init__(self, component_name, max_count=5):
         self.memory_id_gen = MemoryIdGenerator(component_name, max_count)
         self.max_count = max_count
         self.shared_memories = {}
+        self.memory_sizes = {}
+        self.sequence = 0
 
     def get_next_shared_memory(self, size=500000):
-        next_name, name_to_unlink = self.memory_id_gen.get_next()
-
-        try:
-            memory = SharedMemory(name=next_name, create=True, size=size)
-        except FileExistsError:
-            memory = SharedMemory(name=next_name)
-            memory.close()
-            memory.unlink()
-            memory = SharedMemory(name=next_name, create=True, size=size)
+        """
+        Returns the next shared memory in the ring, with room for 'size'
+        bytes of data after the sequence header.
+        """
+        next_name = self.memory_id_gen.get_next()
+        memory = self.shared_memories.get(next_name)
 
-        self.shared_memories[next_name] = memory
+        if memory is None or self.memory_sizes[next_name] != size:
+            if memory is not None:
+                self._destroy_memory(next_name)
+            memory = self._create_memory(next_name, size + HEADER_SIZE)
+            self.shared_memories[next_name] = memory
+            self.memory_sizes[next_name] = size
 
-        if name_to_unlink:
-            if name_to_unlink in self.shared_memories:
-                self._destroy_memory(name_to_unlink)
+        self.sequence += 1
+        SEQUENCE_HEADER.pack_into(memory.buf, 0, self.sequence)
 
         return memory
 
+    def release_last_shared_memory(self):
+        """
+        Returns the last shared memory to the ring, so the next call to
+        get_next_shared_memory reuses it. Only for a memory whose data
+        wasn't handed to any reader.
+        """
+        self.memory_id_gen.release_last()
+
     def cleanup(self):
-        for _ in range(self.max_count):
-            _, name_to_unlink = self.memory_id_gen.get_next()
-            if name_to_unlink:
-                if name_to_unlink in self.shared_memories:
-                    self._destroy_memory(name_to_unlink)
+        for name_to_unlink in list(self.shared_memories.keys()):
+            self._destroy_memory(name_to_unlink)
+
+    @staticmethod
+    def _create_memory(name, size):
+        try:
+            memory = SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            memory = SharedMemory(name=name)
+            memory.close()
+            memory.unlink()
+            memory = SharedMemory(name=name, create=True, size=size)
+        return memory
 
     def _destroy_memory(self, name_to_unlink):
         self.shared_memories[name_to_unlink].close()
         self.shared_memories[name_to_unlink].unlink()
         self.shared_memories.pop(name_to_unlink)
+        self.memory_sizes.pop(name_to_unlink)
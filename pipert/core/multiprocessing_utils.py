@@ -0,0 +1,18 @@
+import functools
+import importlib
+import os
+
+
+@functools.lru_cache(maxsize=None)
+def get_multiprocessing():
+    """
+    Returns the multiprocessing module of the routines' processes:
+    torch.multiprocessing, which shares tensors between processes, when the
+    TORCHVISION environment variable is 'yes', else multiprocessing.
+
+    The module is imported on the first call, so torch isn't imported by the
+    modules of the package until a process, event or queue is created.
+    """
+    if os.environ.get('TORCHVISION', 'no') == 'yes':
+        return importlib.import_module("torch.multiprocessing")
+    return importlib.import_module("multiprocessing")
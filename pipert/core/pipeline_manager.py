@@ -1,17 +1,27 @@
 import subprocess
+import sys
+import threading
+import time
 from typing import Optional
+import gevent
 import yaml
 import zerorpc
-import re
-from pipert.core.class_factory import ClassFactory
-from pipert.core.errors import QueueDoesNotExist
+from pipert.core.class_factory import ClassFactory, ROUTINES_ENTRY_POINT_GROUP
+from pipert.core.errors import QueueDoesNotExist, RoutineDoesNotExist
 from pipert.core.routine import Routine
-from os import listdir
-from os.path import isfile, join
+from pipert.core.component import COMPONENT_SERVING_MESSAGE, COMPONENT_READY_MESSAGE
+from pipert.core.zygote import ComponentZygote, DEFAULT_PRELOAD_MODULES, ZYGOTE_START_TIMEOUT
 from jsonschema import validate, ValidationError
 import functools
 from pipert.utils.logger_utils import create_parent_logger
 
+# seconds that a profiling call to a component may take beyond its duration
+PROFILING_TIMEOUT_MARGIN = 30
+# seconds that a component process may take to start serving
+COMPONENT_SPAWN_TIMEOUT = 60
+# seconds between two readiness checks of a component's routines
+READY_POLL_INTERVAL = 0.05
+
 
 def component_name_existence_error(need_to_be_exist):
     def decorator(func):
@@ -41,6 +51,17 @@ class PipelineManager:
         super().__init__()
         self.components = {}
         self.component_ports = {}
+        self.component_processes = {}
+        # seconds it took every component to get ready since it was spawned
+        self.component_startup_times = {}
+        self._component_spawn_times = {}
+        # set once a component process serves, or exited
+        self._component_process_events = {}
+        # set once the routines of a run of a component process finished
+        # their setup, or it exited
+        self._component_ready_events = {}
+        # the zygote that the components are forked from, when it is started
+        self.zygote = None
         self.ROUTINES_FOLDER_PATH = "pipert/contrib/routines"
         self.COMPONENTS_FOLDER_PATH = "pipert/contrib/components"
         self.ports_counter = 20000
@@ -49,12 +70,6 @@ class PipelineManager:
     @component_name_existence_error(need_to_be_exist=True)
     def add_routine_to_component(self, component_name,
                                  routine_type_name, **routine_parameters_kwargs):
-        if self._is_component_running(component_name=component_name):
-            return self._create_response(
-                False,
-                "You can't add a routine while your component is running"
-            )
-
         routine_class_object = self._get_routine_class_object_by_type_name(routine_type_name)
 
         if routine_class_object is None:
@@ -77,10 +92,33 @@ class PipelineManager:
                 " already exist in this component"
             )
 
+        if self._is_component_running(component_name=component_name):
+            # the component creates the routine itself and starts it right away
+            routine_name = routine_parameters_kwargs.pop("name")
+            routine_parameters_kwargs["routine_type_name"] = routine_type_name
+            try:
+                if self.components[component_name].add_routine(routine_name, routine_parameters_kwargs):
+                    return self._create_response(
+                        True,
+                        f"The routine {routine_name} has been added"
+                    )
+                return self._create_response(
+                    False,
+                    f"The routine {routine_name} can't be created"
+                )
+            except QueueDoesNotExist as e:
+                return self._create_response(
+                    False,
+                    e.message()
+                )
+
         try:
             # replace all queue names with the queue objects of the component before creating routine
             for key, value in routine_parameters_kwargs.items():
-                if 'queue' in key.lower():
+                if 'queue' in key.lower() and isinstance(value, list):
+                    routine_parameters_kwargs[key] = \
+                        [self.components[component_name].get_queue(queue_name=name) for name in value]
+                elif 'queue' in key.lower():
                     routine_parameters_kwargs[key] = self.components[component_name] \
                         .get_queue(queue_name=value)
 
@@ -106,11 +144,7 @@ class PipelineManager:
 
     @component_name_existence_error(need_to_be_exist=True)
     def remove_routine_from_component(self, component_name, routine_name):
-        if self._is_component_running(component_name=component_name):
-            return self._create_response(
-                False,
-                "You can't remove a routine while your component is running"
-            )
+        # a routine of a running component is drained before it is removed
         if self.components[component_name].remove_routine(routine_name):
             return self._create_response(
                 True,
@@ -123,12 +157,61 @@ class PipelineManager:
                 f" inside the component {component_name}"
             )
 
+    @component_name_existence_error(need_to_be_exist=True)
+    def replace_routine_in_component(self, component_name, routine_name,
+                                     routine_type_name, **routine_parameters_kwargs):
+        """
+        Replaces a routine of a component with a new one, a running
+        component keeps running while the routines are swapped, see
+        BaseComponent.replace_routine.
+        """
+        routine_parameters_kwargs["routine_type_name"] = routine_type_name
+        try:
+            if self.components[component_name].replace_routine(routine_name, routine_parameters_kwargs):
+                return self._create_response(
+                    True,
+                    f"The routine {routine_name} has been replaced"
+                )
+            return self._create_response(
+                False,
+                f"The routine {routine_name} can't be replaced"
+            )
+        except (QueueDoesNotExist, RoutineDoesNotExist) as e:
+            return self._create_response(
+                False,
+                e.message()
+            )
+
+    @component_name_existence_error(need_to_be_exist=True)
+    def rewire_queue_in_component(self, component_name, routine_name, parameter_name, queue_name):
+        """
+        Connects a routine of a component to another queue, also while the
+        component is running, see BaseComponent.rewire_queue.
+        """
+        try:
+            if self.components[component_name].rewire_queue(routine_name, parameter_name, queue_name):
+                return self._create_response(
+                    True,
+                    f"The routine {routine_name} now uses {queue_name} as {parameter_name}"
+                )
+            return self._create_response(
+                False,
+                f"The routine {routine_name} has no queue parameter named {parameter_name}"
+            )
+        except (QueueDoesNotExist, RoutineDoesNotExist) as e:
+            return self._create_response(
+                False,
+                e.message()
+            )
+
     @component_name_existence_error(need_to_be_exist=True)
     def create_queue_to_component(self, component_name,
-                                  queue_name, queue_size=1):
+                                  queue_name, queue_size=1, kind="queue", policy="block"):
         if self.components[component_name].\
                 create_queue(queue_name=queue_name,
-                             queue_size=queue_size):
+                             queue_size=queue_size,
+                             kind=kind,
+                             policy=policy):
             return self._create_response(
                 True,
                 f"The Queue {queue_name} has been created"
@@ -162,12 +245,21 @@ class PipelineManager:
 
     @component_name_existence_error(need_to_be_exist=True)
     def run_component(self, component_name):
+        if not self._wait_for_component_process(component_name, COMPONENT_SPAWN_TIMEOUT):
+            return self._create_response(
+                False,
+                f"The component {component_name} didn't start"
+            )
         if self._is_component_running(component_name=component_name):
             return self._create_response(
                 False,
                 f"The component {component_name} already running"
             )
         else:
+            ready_event = self._component_ready_events.get(component_name)
+            if ready_event is not None and self.component_processes[component_name].poll() is None:
+                # the event of a previous run
+                ready_event.clear()
             self.components[component_name].run_comp()
             return self._create_response(
                 True,
@@ -223,26 +315,8 @@ class PipelineManager:
         )
 
     def get_all_routine_types(self):
-        routine_file_names = [f for f in
-                              listdir(self.ROUTINES_FOLDER_PATH)
-                              if isfile(join(self.ROUTINES_FOLDER_PATH, f))]
-
-        routine_file_names = [file_name[:-3] for
-                              file_name in routine_file_names]
-        routine_file_names = \
-            [file_name[0].upper() + re.sub(r'_\w',
-                                           self._remove_string_with_underscore,
-                                           file_name)[1:]
-             for file_name in routine_file_names]
-
-        routines = []
-        for routine_name in routine_file_names:
-            current_routine_type = \
-                self._get_routine_class_object_by_type_name(routine_name) \
-                    .routine_type.value
-            routines.append({"name": routine_name,
-                             "type": current_routine_type})
-        return routines
+        return [{"name": routine_name, "type": description["type"]}
+                for routine_name, description in self._get_routine_descriptions().items()]
 
     @component_name_existence_error(need_to_be_exist=True)
     def change_component_execution_mode(self, component_name, execution_mode):
@@ -258,20 +332,15 @@ class PipelineManager:
                 f"Cannot find execution mode '{execution_mode}'"
             )
 
-    # helping method for changing the file name to class name
-    @staticmethod
-    def _remove_string_with_underscore(match):
-        return match.group(0).upper()[1]
-
     # helping method for changing the class name to file name
     @staticmethod
     def _add_underscore_before_uppercase(match):
         return '_' + match.group(0).lower()
 
     def get_routine_parameters(self, routine_type_name):
-        routine_class_object = self._get_routine_class_object_by_type_name(routine_type_name)
-        if routine_class_object is not None:
-            return routine_class_object.get_constructor_parameters()
+        description = self._get_routine_descriptions().get(routine_type_name)
+        if description is not None:
+            return description["parameters"]
         else:
             return self._create_response(
                 False,
@@ -283,7 +352,7 @@ class PipelineManager:
         vvv Expecting to get vvv
           "components": {
             "component_name": {
-              "queues": [str],
+              "queues": [str or {"name": str, "kind": str, "size": int, "policy": str}],
               "routines": {
                 "routine_name": {
                   "routine_type_name": str,
@@ -298,7 +367,21 @@ class PipelineManager:
         component_validator = {
             "type": "object",
             "properties": {
-                "queues": {"type": "array", "items": {"type": "string"}},
+                "queues": {"type": "array", "items": {
+                    "anyOf": [
+                        {"type": "string"},
+                        {
+                            "type": "object",
+                            "properties": {
+                                "name": {"type": "string"},
+                                "kind": {"type": "string"},
+                                "size": {"type": "integer"},
+                                "policy": {"type": "string"}
+                            },
+                            "required": ["name"]
+                        }
+                    ]
+                }},
                 "routines": {"type": "object"}
             },
             "required": ["queues", "routines"]
@@ -326,8 +409,12 @@ class PipelineManager:
                     yaml.dump(current_component_dict, file)
 
                 component_port = str(self.get_random_available_port())
-                cmd = "python3 " + COMPONENT_FACTORY_PATH + " -cp " + component_file_path + " -p " + component_port
-                subprocess.Popen(cmd, stdout=subprocess.PIPE, shell=True)
+                # the components start concurrently, wait_until_ready waits for all of them
+                if self.zygote is not None and self.zygote.is_alive():
+                    self._fork_component(component_name, component_file_path, component_port)
+                else:
+                    self._spawn_component(component_name, [sys.executable, COMPONENT_FACTORY_PATH,
+                                                           "-cp", component_file_path, "-p", component_port])
                 self.components[component_name] = zerorpc.Client()
                 self.components[component_name].connect("tcp://localhost:" + component_port)
                 self.component_ports[component_name] = component_port
@@ -345,10 +432,174 @@ class PipelineManager:
         else:
             return list(filter(lambda response: not response["Succeeded"], responses))
 
+    def _spawn_component(self, component_name, cmd):
+        process = subprocess.Popen(cmd, stdout=subprocess.PIPE, universal_newlines=True)
+        process_event, ready_event = threading.Event(), threading.Event()
+        self._track_component_process(component_name, process, process_event, ready_event)
+        threading.Thread(target=self._watch_component_output,
+                         args=(component_name, process, process_event, ready_event), daemon=True).start()
+
+    def _fork_component(self, component_name, component_file_path, component_port):
+        process = self.zygote.fork_component(component_name, component_file_path, component_port)
+        self._track_component_process(component_name, process, process.serving_event, process.ready_event)
+
+    def _track_component_process(self, component_name, process, process_event, ready_event):
+        self.component_processes[component_name] = process
+        self._component_spawn_times[component_name] = time.monotonic()
+        self._component_process_events[component_name] = process_event
+        self._component_ready_events[component_name] = ready_event
+        self.component_startup_times.pop(component_name, None)
+
+    def _watch_component_output(self, component_name, process, process_event, ready_event):
+        """
+        Reads the output of a component process until it exits, the process
+        event is set when the component prints that it serves and the ready
+        event when it prints that the routines of its run are set up, both
+        are set when it exits. Reading the output also keeps the process from
+        blocking on a full pipe.
+        """
+        for line in process.stdout:
+            line = line.rstrip()
+            if line == COMPONENT_SERVING_MESSAGE:
+                process_event.set()
+            elif line == COMPONENT_READY_MESSAGE:
+                ready_event.set()
+            else:
+                self.logger.debug("%s: %s", component_name, line)
+        # the output ends right before the process exits
+        process.wait()
+        process_event.set()
+        ready_event.set()
+
+    def _wait_for_component_process(self, component_name, timeout):
+        """
+        Waits until the process of a component that was spawned by
+        setup_components serves its zerorpc server.
+
+        Returns: True if the component serves, False if its process exited
+        or the timeout passed.
+        """
+        process_event = self._component_process_events.get(component_name)
+        if process_event is None:
+            # the component wasn't spawned by the pipeline manager
+            return True
+        # the event is set by another thread, blocking on it would block the
+        # gevent hub and with it the zerorpc connections of the manager
+        deadline = time.monotonic() + timeout
+        while not process_event.is_set() and time.monotonic() < deadline:
+            gevent.sleep(READY_POLL_INTERVAL)
+        return process_event.is_set() and self.component_processes[component_name].poll() is None
+
+    def _wait_for_component(self, component_name, deadline):
+        if not self._wait_for_component_process(component_name, deadline - time.monotonic()):
+            return False
+        ready_event = self._component_ready_events.get(component_name)
+        while True:
+            if ready_event is not None and ready_event.is_set():
+                # the component process announced that its routines are set
+                # up, or it exited
+                if self.component_processes[component_name].poll() is not None:
+                    return False
+                ready = True
+            else:
+                # a component that isn't running, or that wasn't spawned by
+                # the pipeline manager
+                try:
+                    ready = self.components[component_name].is_ready()
+                except (zerorpc.TimeoutExpired, zerorpc.LostRemote, zerorpc.RemoteError):
+                    ready = False
+            if ready:
+                if component_name not in self.component_startup_times:
+                    spawn_time = self._component_spawn_times.get(component_name)
+                    self.component_startup_times[component_name] = \
+                        None if spawn_time is None else time.monotonic() - spawn_time
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            # gevent.sleep keeps the zerorpc connections of the manager alive
+            gevent.sleep(READY_POLL_INTERVAL)
+
+    def start_zygote(self, preload_modules=None, timeout=ZYGOTE_START_TIMEOUT):
+        """
+        Starts a zygote process that imports the heavy modules of the
+        pipeline once, after which setup_components forks the components
+        from it instead of starting a new interpreter for every one of them
+        (see pipert.core.zygote).
+
+        Args:
+            preload_modules: the names of the modules that the zygote imports,
+            the modules that the contrib components use by default.
+            timeout: the number of seconds the zygote may take to import them.
+
+        Returns: a response with the modules and files that the zygote
+        imported.
+        """
+        self.stop_zygote()
+        zygote = ComponentZygote(DEFAULT_PRELOAD_MODULES if preload_modules is None else preload_modules,
+                                 folders=(self.ROUTINES_FOLDER_PATH, self.COMPONENTS_FOLDER_PATH))
+        if not zygote.start(timeout=timeout):
+            zygote.process.kill()
+            return self._create_response(
+                False,
+                "The zygote didn't start"
+            )
+        self.zygote = zygote
+        return self._create_response(
+            True,
+            zygote.preloaded
+        )
+
+    def stop_zygote(self):
+        """
+        Stops the zygote, the components that were forked from it keep
+        running and the next components are started as new processes.
+        """
+        if self.zygote is not None:
+            self.zygote.stop()
+            self.zygote = None
+        return self._create_response(
+            True,
+            "The zygote is stopped"
+        )
+
+    def wait_until_ready(self, timeout=COMPONENT_SPAWN_TIMEOUT):
+        """
+        Waits until all of the components are ready: their processes serve
+        and the routines of the running components finished their setup
+        (see BaseComponent.is_ready). The components are waited for
+        together, so the wait takes as long as the slowest of them.
+
+        Args:
+            timeout: the number of seconds to wait for all of the components.
+
+        Returns: a response with the startup time (in seconds) of every
+        component, from the time it was spawned until it was ready, or the
+        names of the components that aren't ready.
+        """
+        deadline = time.monotonic() + float(timeout)
+        not_ready = [component_name for component_name in list(self.components)
+                     if not self._wait_for_component(component_name, deadline)]
+        if not_ready:
+            return self._create_response(
+                False,
+                f"The components {', '.join(not_ready)} aren't ready"
+            )
+        return self._create_response(
+            True,
+            {component_name: self.component_startup_times.get(component_name)
+             for component_name in self.components}
+        )
+
     def _get_routine_class_object_by_type_name(self, routine_name: str) -> Optional[Routine]:
-        routine_factory = ClassFactory(self.ROUTINES_FOLDER_PATH)
+        routine_factory = ClassFactory(self.ROUTINES_FOLDER_PATH, ROUTINES_ENTRY_POINT_GROUP)
         return routine_factory.get_class(routine_name)
 
+    def _get_routine_descriptions(self):
+        # the routine modules are only imported when they changed since they
+        # were last described, which spares the imports of torch and such
+        routine_factory = ClassFactory(self.ROUTINES_FOLDER_PATH, ROUTINES_ENTRY_POINT_GROUP)
+        return routine_factory.describe_classes(_describe_routine)
+
     def _does_component_exist(self, component_name):
         return component_name in self.components
 
@@ -369,6 +620,45 @@ class PipelineManager:
             components.update(self.components[component_name].get_component_configuration())
         return {"components": components}
 
+    @component_name_existence_error(need_to_be_exist=True)
+    def get_queue_stats_of_component(self, component_name, queue_name=None):
+        """
+        Returns the counters of the queues of a component, see
+        BaseComponent.get_queue_stats.
+        """
+        try:
+            return self._create_response(
+                True,
+                self.components[component_name].get_queue_stats(queue_name)
+            )
+        except QueueDoesNotExist as e:
+            return self._create_response(
+                False,
+                e.message()
+            )
+
+    @component_name_existence_error(need_to_be_exist=True)
+    def profile_component(self, component_name, duration, routine_name=None):
+        """
+        Samples the stacks of the routines of a running component for
+        'duration' seconds, see BaseComponent.start_profiling.
+        """
+        component = self.components[component_name]
+        # the call blocks for the whole duration, longer than the default
+        # timeout of a zerorpc call
+        call_options = {"timeout": float(duration) + PROFILING_TIMEOUT_MARGIN} \
+            if isinstance(component, zerorpc.Client) else {}
+        try:
+            return self._create_response(
+                True,
+                component.start_profiling(float(duration), routine_name, **call_options)
+            )
+        except RoutineDoesNotExist as e:
+            return self._create_response(
+                False,
+                e.message()
+            )
+
     def get_random_available_port(self):
         self.ports_counter += 1
         return self.ports_counter
@@ -377,3 +667,10 @@ class PipelineManager:
     def set_routine_parameter_in_component(self, component_name, routine_name, attribute_name, attribute_value):
         self.logger.info(component_name + ", " + routine_name + ", " + attribute_name + ", " + attribute_value)
         self.components[component_name].set_routine_attribute(routine_name, attribute_name, attribute_value)
+
+
+def _describe_routine(routine_class):
+    return {
+        "type": routine_class.routine_type.value,
+        "parameters": routine_class.get_constructor_parameters()
+    }
@@ -0,0 +1,101 @@
+import queue
+import time
+
+from pipert.core import tracing
+from pipert.core.utlis.queue_handler import QueueListeners
+
+# what a full queue does with an item that is put into it:
+# block - waits for room like queue.Queue (raises queue.Full on timeout)
+# drop_oldest - drops the oldest item in the queue to make room (a ring buffer)
+# drop_newest - drops the item that is put
+POLICIES = ("block", "drop_oldest", "drop_newest")
+
+# upper bounds (in milliseconds) of the buckets of the time-in-queue
+# histogram, the last bucket counts the items that waited for longer
+TIME_IN_QUEUE_BUCKETS_MS = (1, 5, 10, 50, 100, 500, 1000)
+
+
+class PolicyQueue(queue.Queue):
+    """
+    A queue.Queue with an overflow policy (see POLICIES) that keeps
+    counters of its usage: the number of items that were put into it and
+    dropped from it, the highest number of items it held, and a histogram
+    of the time items waited in it before they were taken.
+    """
+
+    def __init__(self, maxsize=1, policy="block"):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown queue policy '{policy}', "
+                             f"the policies are {', '.join(POLICIES)}")
+        super().__init__(maxsize=maxsize)
+        self.policy = policy
+        self.enqueued = 0
+        self.dropped = 0
+        self.high_water_mark = 0
+        self.time_in_queue_counts = [0] * (len(TIME_IN_QUEUE_BUCKETS_MS) + 1)
+        self.listeners = QueueListeners()
+
+    def put(self, item, block=True, timeout=None):
+        """
+        Works just like the `put` method of `queue.Queue` with the block
+        policy, with the other policies a put never blocks or raises
+        queue.Full.
+        """
+        if self.policy == "block":
+            return super().put(item, block, timeout)
+        with self.not_full:
+            if 0 < self.maxsize <= self._qsize():
+                self.dropped += 1
+                if self.policy == "drop_newest":
+                    return
+                self.queue.popleft()
+                self.unfinished_tasks -= 1
+            self._put(item)
+            self.unfinished_tasks += 1
+            self.not_empty.notify()
+
+    def get_stats(self):
+        """
+        Returns the counters of the queue as a dictionary.
+        """
+        with self.mutex:
+            return {
+                "policy": self.policy,
+                "size": self.maxsize,
+                "length": self._qsize(),
+                "enqueued": self.enqueued,
+                "dropped": self.dropped,
+                "high_water_mark": self.high_water_mark,
+                "time_in_queue_ms": {
+                    "buckets": list(TIME_IN_QUEUE_BUCKETS_MS),
+                    "counts": list(self.time_in_queue_counts)
+                }
+            }
+
+    def reset_stats(self):
+        with self.mutex:
+            self.enqueued = 0
+            self.dropped = 0
+            self.high_water_mark = self._qsize()
+            self.time_in_queue_counts = [0] * (len(TIME_IN_QUEUE_BUCKETS_MS) + 1)
+
+    # the items are kept with the time they were put, the methods below are
+    # called by queue.Queue while holding the mutex
+    def _put(self, item):
+        tracing.on_enqueue(item)
+        self.queue.append((time.monotonic_ns(), item))
+        self.enqueued += 1
+        if len(self.queue) > self.high_water_mark:
+            self.high_water_mark = len(self.queue)
+        self.listeners.notify()
+
+    def _get(self):
+        put_time, item = self.queue.popleft()
+        waited_ms = (time.monotonic_ns() - put_time) / 1e6
+        bucket = 0
+        while bucket < len(TIME_IN_QUEUE_BUCKETS_MS) and \
+                waited_ms > TIME_IN_QUEUE_BUCKETS_MS[bucket]:
+            bucket += 1
+        self.time_in_queue_counts[bucket] += 1
+        tracing.on_dequeue(item)
+        return item
@@ -0,0 +1,100 @@
+"""
+A sampling profiler for the routine threads of a running component.
+
+A background thread takes the stacks of the sampled threads every 'interval'
+seconds (via sys._current_frames), which costs the routines nothing but the
+GIL time of the sample, and counts how many times every stack was seen.
+The counts are returned in the collapsed stack format that flamegraph.pl,
+speedscope and similar tools read: one line per stack, with the frames from
+the root to the leaf separated by semicolons and followed by the count.
+"""
+from collections import Counter
+import os
+import sys
+import threading
+import time
+
+DEFAULT_SAMPLING_INTERVAL = 0.005
+
+
+class StackSampler:
+    """
+    Samples the stacks of a set of threads of the current process.
+
+    Args:
+        threads: a dictionary of thread ident to the name that is used as
+        the root frame of the thread's stacks.
+        interval: the number of seconds between two samples.
+    """
+
+    def __init__(self, threads, interval=DEFAULT_SAMPLING_INTERVAL):
+        self.threads = threads
+        self.interval = interval
+        self.samples = 0
+        # (thread name, ((code, line number), ...)) -> count
+        self._stacks = Counter()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True, name="pipert-stack-sampler")
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        """
+        Takes one sample of the stacks of the threads.
+        """
+        frames = sys._current_frames()
+        for ident, name in self.threads.items():
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append((frame.f_code, frame.f_lineno))
+                frame = frame.f_back
+            self._stacks[(name, tuple(reversed(stack)))] += 1
+        self.samples += 1
+
+    def collapsed_stacks(self):
+        """
+        Returns the sampled stacks in the collapsed stack format, the most
+        sampled stack first.
+        """
+        lines = []
+        for (name, stack), count in self._stacks.most_common():
+            frames = [name] + [f"{code.co_name} ({os.path.basename(code.co_filename)}:{line})"
+                               for code, line in stack]
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines)
+
+
+def profile_threads(threads, duration, interval=DEFAULT_SAMPLING_INTERVAL, sleep=time.sleep):
+    """
+    Samples the stacks of the threads for 'duration' seconds.
+
+    Args:
+        threads: a dictionary of thread ident to the name of the thread.
+        duration: the number of seconds to sample for.
+        interval: the number of seconds between two samples.
+        sleep: the function that waits for the duration, a server that runs
+        on gevent passes gevent.sleep so it keeps serving in the meantime.
+
+    Returns: the StackSampler after it stopped.
+    """
+    sampler = StackSampler(threads, interval=interval)
+    sampler.start()
+    try:
+        sleep(duration)
+    finally:
+        sampler.stop()
+    return sampler
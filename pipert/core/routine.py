@@ -1,15 +1,16 @@
 import time
 from abc import ABC, abstractmethod
-from collections import defaultdict
+from collections import defaultdict, deque
 from enum import Enum
 import threading
 import os
-if os.environ.get('TORCHVISION', 'no') == 'yes':
-    import torch.multiprocessing as mp
-else:
-    import multiprocessing as mp
+import sys
+from .multiprocessing_utils import get_multiprocessing
 from .errors import NoRunnerException
 from .metrics_collector import NullCollector
+from .metrics_aggregator import RoutineMetrics, get_metrics_flusher
+from . import tracing
+from .utlis.queue_handler import wait_for_any, async_wait_for_any
 
 
 class Events(Enum):
@@ -44,6 +45,8 @@ class RoutineTypes(Enum):
 
 class Routine(ABC):
     routine_type = RoutineTypes.NO_TYPE
+    # number of seconds to wait for an input before checking the stop event
+    input_timeout = 0.1
 
     def __init__(self, logger, name="", component_name="",
                  extensions=None, metrics_collector=NullCollector(), *args, **kwargs):
@@ -55,7 +58,8 @@ class Routine(ABC):
         self.metrics_collector = metrics_collector
         self.use_memory = False
         self.generator = None
-        self.stop_event: mp.Event = None
+        self.frame_codec = None
+        self.stop_event = None
         self._event_handlers = defaultdict(list)
         self.state = None
         self._allowed_events = []
@@ -63,6 +67,19 @@ class Routine(ABC):
         self.runner = None
         self.runner_creator = None
         self.runner_creator_kwargs = {}
+        self.execution_mode = "thread"
+        # the AsyncRuntime of a routine that runs as a coroutine, see as_async
+        self.async_runtime = None
+        # set once the routine finished its setup and is about to run
+        self.ready_event = threading.Event()
+        # stops only this routine, so it can be removed from a running component
+        self.detach_event = threading.Event()
+        # when set to an event, the routine waits for it after its setup
+        # before running its main logic, see BaseComponent.replace_routine
+        self.start_gate = None
+        # (attribute name, value) updates that are applied between two
+        # iterations of the main logic
+        self._pending_updates = deque()
         self.logger = logger
         self._setup_extensions(extensions=extensions)
 
@@ -314,6 +331,75 @@ class Routine(ABC):
     def cleanup(self, *args, **kwargs):
         raise NotImplementedError
 
+    def get_input_queues(self):
+        """
+        Returns the queues that main_logic reads its input from.
+        If there are any, the routine waits until one of them has an item
+        (or the stop event is set) before each call to main_logic, instead
+        of calling it in a busy loop while there is no input.
+        """
+        return []
+
+    def update_between_iterations(self, attribute_name, value):
+        """
+        Sets an attribute of a running routine between two iterations of its
+        main logic, so an iteration never sees a mix of the old and the new
+        value. Only routines that run as threads can be updated this way, a
+        routine that runs as a process has its own copy of its attributes.
+        """
+        self._pending_updates.append((attribute_name, value))
+
+    def _apply_pending_updates(self):
+        while self._pending_updates:
+            attribute_name, value = self._pending_updates.popleft()
+            setattr(self, attribute_name, value)
+
+    def _should_stop(self):
+        return self.stop_event.is_set() or self.detach_event.is_set()
+
+    def _create_event(self):
+        """
+        Returns an event that can be shared with the routine's runner.
+        """
+        return get_multiprocessing().Event() if self.execution_mode == "process" else threading.Event()
+
+    def _begin_run(self):
+        """
+        Prepares the state, metrics and tracing stage of a run of the
+        routine.
+
+        Returns: the RoutineMetrics of the run and whether they are collected.
+        """
+        self.state = State()
+        # the execution times are aggregated here and flushed to the metrics
+        # collector from a background thread
+        metrics = RoutineMetrics(self.name, self.component_name, self.metrics_collector)
+        collect_metrics = not isinstance(self.metrics_collector, NullCollector)
+        if collect_metrics:
+            get_metrics_flusher().register(metrics)
+        # the messages this routine passes through queues are stamped with
+        # its stage name, see pipert.core.tracing
+        tracing.enter_stage(tracing.stage_name(self.component_name, self.name))
+        return metrics, collect_metrics
+
+    def _record_iteration(self, metrics, collect_metrics, tick):
+        self.state.count += 1
+        tock = time.monotonic_ns()
+        dequeued = tracing.end_logic(time.time_ns())
+
+        if self.state.output:
+            metrics.execution_times.add(tock - tick)
+            self.state.success += 1
+            if collect_metrics and self.routine_type == RoutineTypes.OUTPUT:
+                # the messages leave the component here
+                for msg in dequeued:
+                    metrics.add_exit(msg.history)
+
+    def _end_run(self, metrics, collect_metrics):
+        tracing.exit_stage()
+        if collect_metrics:
+            get_metrics_flusher().unregister(metrics)
+
     # TODO - replace plain 'setup()' and 'cleanup()' with context manager
     def _extended_run(self):
         """
@@ -321,42 +407,158 @@ class Routine(ABC):
         Returns:
 
         """
-        self.state = State()
+        metrics, collect_metrics = self._begin_run()
         # TODO - how to pass different args to setup/cleanup/main_logic?
         self.setup()
+        self.ready_event.set()
+        if self.start_gate is not None:
+            while not self.start_gate.wait(self.input_timeout) and not self._should_stop():
+                pass
         # TODO - maybe add _fire_event before and after the while loop?
-        while not self.stop_event.is_set():
+        while not self._should_stop():
+            self._apply_pending_updates()
+            input_queues = self.get_input_queues()
+            if input_queues and \
+                    not wait_for_any(input_queues, self.input_timeout, self.stop_event):
+                continue
             self._fire_event(Events.BEFORE_LOGIC)
-            tick = time.time()
+            tick = time.monotonic_ns()
+            tracing.start_logic(time.time_ns())
             try:
                 self.state.output = self.main_logic()
             except Exception as error:
                 self.logger.exception("The routine has crashed: " + str(error))
                 self.state.output = False
-            self.state.count += 1
-            tock = time.time()
-
-            if self.state.output:
-                self.metrics_collector.collect_execution_time(tock - tick, self.name, self.component_name)
-                self.state.success += 1
+            self._record_iteration(metrics, collect_metrics, tick)
             self._fire_event(Events.AFTER_LOGIC)
 
         self.cleanup()
+        self._end_run(metrics, collect_metrics)
+
+    async def async_setup(self):
+        """
+        The setup of a routine that runs on an event loop (see as_async),
+        runs setup on the executor of the runtime unless it is overridden.
+        """
+        await self.async_runtime.run_in_executor(self.setup)
+
+    async def async_main_logic(self):
+        """
+        The main logic of a routine that runs on an event loop (see
+        as_async). An I/O bound routine overrides it with a coroutine that
+        awaits its I/O, otherwise main_logic runs on the executor of the
+        runtime, so it doesn't block the other routines of the loop.
+        """
+        return await self.async_runtime.run_in_executor(self.main_logic)
+
+    async def async_cleanup(self):
+        """
+        The cleanup of a routine that runs on an event loop (see as_async),
+        runs cleanup on the executor of the runtime unless it is overridden.
+        """
+        await self.async_runtime.run_in_executor(self.cleanup)
+
+    async def _async_extended_run(self):
+        """
+        The run loop of a routine that runs on an event loop, the same as
+        _extended_run with the waits on the event loop: the puts into the
+        input queues wake the routine through the loop (see
+        async_wait_for_any), and the start gate is waited on by the
+        executor of the runtime.
+        """
+        # asyncio is only imported by the routines that run on an event loop
+        import asyncio
+        metrics, collect_metrics = self._begin_run()
+        try:
+            await self.async_setup()
+        except Exception as error:
+            self.logger.exception("The routine's setup has crashed: " + str(error))
+            self._end_run(metrics, collect_metrics)
+            raise
+        self.ready_event.set()
+        if self.start_gate is not None:
+            while not await self.async_runtime.run_in_executor(self.start_gate.wait, self.input_timeout) \
+                    and not self._should_stop():
+                pass
+        while not self._should_stop():
+            self._apply_pending_updates()
+            input_queues = self.get_input_queues()
+            if input_queues and \
+                    not await async_wait_for_any(input_queues, self.input_timeout, self.stop_event):
+                continue
+            self._fire_event(Events.BEFORE_LOGIC)
+            tick = time.monotonic_ns()
+            tracing.start_logic(time.time_ns())
+            try:
+                self.state.output = await self.async_main_logic()
+            except Exception as error:
+                self.logger.exception("The routine has crashed: " + str(error))
+                self.state.output = False
+            self._record_iteration(metrics, collect_metrics, tick)
+            self._fire_event(Events.AFTER_LOGIC)
+            # lets the other routines of the loop run between two iterations
+            await asyncio.sleep(0)
+
+        try:
+            await self.async_cleanup()
+        finally:
+            self._end_run(metrics, collect_metrics)
+
+    def _process_run(self):
+        """
+        The target of a routine that runs as a process. The shared memory
+        generator of such a routine belongs to it alone, so the memories it
+        created are cleaned up when the routine stops.
+        """
+        if self.use_memory and sys.version_info.minor < 8:
+            self.generator.create_memories()
+        try:
+            self._extended_run()
+        finally:
+            if self.use_memory and self.generator is not None:
+                self.generator.cleanup()
 
     def as_thread(self):
         self.runner_creator = threading.Thread
         self.runner_creator_kwargs = {"target": self._extended_run}
+        self.execution_mode = "thread"
+        self.ready_event = self._create_event()
+        self.detach_event = self._create_event()
         return self
 
     def as_process(self):
-        self.runner_creator = mp.Process
-        self.runner_creator_kwargs = {"target": self._extended_run}
+        self.runner_creator = get_multiprocessing().Process
+        self.runner_creator_kwargs = {"target": self._process_run}
+        self.execution_mode = "process"
+        self.ready_event = self._create_event()
+        self.detach_event = self._create_event()
+        return self
+
+    def as_async(self, runtime=None):
+        """
+        Runs the routine as a coroutine on the event loop of an
+        AsyncRuntime instead of on a thread of its own (see
+        pipert.core.async_runtime). Event handlers run on the event loop, so
+        they mustn't block.
+
+        Args:
+            runtime: the AsyncRuntime of the routine's component, the
+            runtime of the process by default.
+        """
+        from .async_runtime import AsyncRunner, get_async_runtime
+        self.async_runtime = get_async_runtime() if runtime is None else runtime
+        self.runner_creator = AsyncRunner
+        self.runner_creator_kwargs = {"target": self._async_extended_run, "runtime": self.async_runtime}
+        self.execution_mode = "async"
+        self.ready_event = self._create_event()
+        self.detach_event = self._create_event()
         return self
 
     def start(self):
         if self.runner_creator is None:
             # TODO - create better errors
             raise NoRunnerException("Runner not configured for routine")
+        self.ready_event.clear()
         self.runner = self.runner_creator(**self.runner_creator_kwargs)
         self.runner.start()
 
@@ -1,3 +1,22 @@
+import struct
+import numpy as np
+
+# Seqlock header written at the start of the memory by write_frame:
+# version counter, data length, dtype string, number of dimensions and up
+# to MAX_DIMS dimensions. The version is odd while a write is in progress.
+VERSION_HEADER = struct.Struct("=Q")
+FRAME_HEADER = struct.Struct("=QQ16sB4Q")
+MAX_DIMS = 4
+HEADER_SIZE = 128
+
+
+class TornReadError(Exception):
+    """
+    Exception class to raise if a frame couldn't be read from the shared
+    memory because it kept being overwritten while reading
+    """
+
+
 class SharedMemory:
     """
    A wrapper for posix_ipc.SharedMemory, posix_ipc.Semaphore and the correlating mapfile to simplify usage.
@@ -38,6 +57,92 @@ class SharedMemory:
 
         return file_content
 
+    def read_version(self):
+        """
+        Returns the current seqlock version of the memory.
+        """
+        return VERSION_HEADER.unpack_from(self.mapfile, 0)[0]
+
+    def write_frame(self, frame):
+        """
+        Writes a numpy array to the shared memory under a seqlock.
+
+        The version counter is made odd before the header and data are
+        written and even again afterwards, so readers that don't take the
+        semaphore can tell that they read a frame in the middle of a write.
+        The semaphore is only used to serialize the writers.
+        Args:
+            frame: A numpy array with up to MAX_DIMS dimensions.
+
+        Returns: The version of the memory after the write.
+
+        """
+        if frame.ndim > MAX_DIMS:
+            raise ValueError(f"Can't write a frame with more than {MAX_DIMS} dimensions")
+        if HEADER_SIZE + frame.nbytes > len(self.mapfile):
+            raise ValueError("The frame is larger than the shared memory")
+        shape = tuple(frame.shape) + (0,) * (MAX_DIMS - frame.ndim)
+
+        self.acquire_semaphore()
+        try:
+            version = self.read_version() + 1
+            if version % 2 == 0:
+                version += 1
+            VERSION_HEADER.pack_into(self.mapfile, 0, version)
+            FRAME_HEADER.pack_into(self.mapfile, 0, version, frame.nbytes,
+                                   frame.dtype.str.encode(), frame.ndim,
+                                   *shape)
+            shared_frame = np.ndarray(frame.shape, dtype=frame.dtype,
+                                      buffer=self.mapfile, offset=HEADER_SIZE)
+            shared_frame[...] = frame
+            del shared_frame
+            VERSION_HEADER.pack_into(self.mapfile, 0, version + 1)
+        finally:
+            self.release_semaphore()
+        return version + 1
+
+    def read_frame(self, copy=True, retries=100):
+        """
+        Reads the frame that was written by write_frame without taking the
+        semaphore, retrying if a writer changed the memory while reading.
+        Args:
+            copy: If this is False a read-only view on the memory is
+            returned instead of a copy. The view is only consistent as long
+            as is_version(version) returns True.
+            retries: The amount of torn reads (of the header or the frame) to
+            tolerate before giving up.
+
+        Returns: A tuple of the frame and the version it was read at.
+
+        Raises:
+            TornReadError: if the frame kept being overwritten while reading.
+        """
+        for _ in range(retries):
+            version, _, dtype, ndim, *shape = FRAME_HEADER.unpack_from(self.mapfile, 0)
+            if version % 2 == 1 or ndim > MAX_DIMS:
+                continue
+            try:
+                frame = np.ndarray(tuple(shape[:ndim]),
+                                   dtype=np.dtype(dtype.rstrip(b"\0").decode()),
+                                   buffer=self.mapfile, offset=HEADER_SIZE)
+            except (TypeError, ValueError):
+                # the header was read while a writer changed it, so the
+                # dtype or the shape are garbage
+                continue
+            if copy:
+                frame = frame.copy()
+            else:
+                frame.flags.writeable = False
+            if self.is_version(version):
+                return frame, version
+        raise TornReadError("The frame was overwritten while reading it")
+
+    def is_version(self, version):
+        """
+        Returns True if the memory wasn't written to since 'version'.
+        """
+        return self.read_version() == version
+
     def free_memory(self):
         """
         Cleans what is on the memory and deletes it.
@@ -25,6 +25,13 @@ class MemoryIdIterator:
 
         return next_name
 
+    def release_last(self):
+        """
+        Takes back the last name, so the next call to get_next returns it
+        again.
+        """
+        self.name_count -= 1
+
 
 def get_shared_memory_object(name):
     """
@@ -76,6 +83,14 @@ class SharedMemoryGenerator:
     def get_next_shared_memory_name(self):
         return self.memory_id_gen.get_next()
 
+    def release_last_shared_memory(self):
+        """
+        Returns the last shared memory name to the generator, so the next
+        call to get_next_shared_memory_name reuses it. Only for a memory
+        whose data wasn't handed to any reader.
+        """
+        self.memory_id_gen.release_last()
+
     def cleanup(self):
         """
         Cleans all of the allocated shared memories to free up the ram.
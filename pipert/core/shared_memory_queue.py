@@ -0,0 +1,216 @@
+import copy
+import os
+import queue
+import sys
+import time
+if sys.version_info.minor >= 8:
+    from multiprocessing import resource_tracker
+    from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator as smGen, \
+        get_shared_memory_object
+else:
+    from pipert.core.shared_memory_generator import SharedMemoryGenerator as smGen, \
+        get_shared_memory_object
+from pipert.core.message import Message, FramePayload, FrameMetadataPayload
+from pipert.core import tracing
+from pipert.core.multiprocessing_utils import get_multiprocessing
+
+# shared memories in the ring of every writer on top of the queue size: one
+# that is being written, one that a reader took out of the queue and didn't
+# copy yet and one more for a second reader
+RING_SLACK = 3
+
+
+def _unlink_memory(name):
+    memory = get_shared_memory_object(name)
+    if memory is None:
+        return
+    if sys.version_info.minor >= 8:
+        memory.close()
+        memory.unlink()
+    else:
+        memory.free_memory()
+
+
+def _detach(item):
+    """
+    Returns a shallow copy of a message (or of the messages in a tuple)
+    with a copy of its history.
+    """
+    if isinstance(item, tuple):
+        return tuple(_detach(element) for element in item)
+    if not isinstance(item, Message):
+        return item
+    msg = copy.copy(item)
+    msg.history = item.history.copy()
+    return msg
+
+
+def _is_frame_lost(payload):
+    if isinstance(payload, FramePayload):
+        return payload.data is None
+    return payload.data is None or payload.data[0] is None
+
+
+class SharedMemoryQueue:
+    """
+    A queue that can be shared between the routines of a component that run
+    in different processes.
+
+    Frames of the messages put into the queue are written into a ring of
+    shared memories that belongs to the writing process, so only the small
+    encoded message goes through the underlying multiprocessing queue. The
+    reader copies the frame out of the shared memory as soon as it takes the
+    message out of the queue. Other items are pickled as they are.
+
+    The rings outlive the processes that wrote them, so frames that are still
+    in the queue stay readable, and are all unlinked by close().
+
+    The queue has the same put/get interface as queue.Queue, so it works with
+    QueueHandler and with Routine.get_input_queues.
+    """
+
+    def __init__(self, maxsize=1, name="queue"):
+        self.maxsize = maxsize
+        self.name = name
+        self.ring_size = max(maxsize, 1) + RING_SLACK
+        mp = get_multiprocessing()
+        self._queue = mp.Queue(maxsize=maxsize)
+        # the number of items that were put into the queue and not taken out
+        # of it yet, the condition is notified by every put so a routine can
+        # wait for an item without taking it (see wait_for_item)
+        self._items = mp.Value("i", 0)
+        self._not_empty = mp.Condition(self._items.get_lock())
+        # the number of processes that wrote frames into the queue, each of
+        # them has its own ring of shared memories
+        self._writers = mp.Value("i", 0)
+        self._generator = None
+        self._generator_pid = None
+        if sys.version_info.minor >= 8:
+            # a tracker that is started by a writer process would unlink the
+            # ring of the writer as soon as it exits
+            resource_tracker.ensure_running()
+
+    def _get_generator(self):
+        if self._generator_pid != os.getpid():
+            with self._writers.get_lock():
+                writer_index = self._writers.value
+                self._writers.value += 1
+            self._generator = smGen(f"{self.name}_{writer_index}",
+                                    max_count=self.ring_size)
+            if sys.version_info.minor < 8:
+                self._generator.create_memories()
+            self._generator_pid = os.getpid()
+        return self._generator
+
+    def _encode(self, msg):
+        if not isinstance(msg, Message) or \
+                not isinstance(msg.payload, (FramePayload, FrameMetadataPayload)) or \
+                msg.payload.encoded or msg.is_empty():
+            return False
+        msg.payload = copy.copy(msg.payload)
+        msg.payload.encode(self._get_generator())
+        return True
+
+    def put(self, item, block=True, timeout=None):
+        """
+        Works just like the `put` method of `queue.Queue`
+        """
+        # the item is pickled by the feeder thread of the multiprocessing
+        # queue after put returns, so the queue gets a copy of the message
+        # with a history of its own, which is stamped with ENQUEUED. The
+        # message that was put is left as it was, even if the queue is full.
+        item = _detach(item)
+        tracing.on_enqueue(item)
+        encoded = self._encode(item)
+        try:
+            self._queue.put((encoded, item), block, timeout)
+        except queue.Full:
+            if encoded:
+                # the shared memory that was written isn't referenced by
+                # anything, so the next put can reuse it
+                self._generator.release_last_shared_memory()
+            raise
+        with self._not_empty:
+            self._items.value += 1
+            self._not_empty.notify_all()
+
+    def put_nowait(self, item):
+        return self.put(item, block=False)
+
+    def get(self, block=True, timeout=None):
+        """
+        Works just like the `get` method of `queue.Queue`.
+        A message whose frame was overwritten before it could be read is
+        dropped, as if it was never put into the queue.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            encoded, item = self._queue.get(block, timeout)
+            with self._not_empty:
+                self._items.value -= 1
+            if not encoded:
+                tracing.on_dequeue(item)
+                return item
+            item.payload.decode()
+            if not _is_frame_lost(item.payload):
+                tracing.on_dequeue(item)
+                return item
+            if not block:
+                raise queue.Empty
+            if deadline is not None:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    raise queue.Empty
+
+    def get_nowait(self):
+        return self.get(block=False)
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def empty(self):
+        return self._queue.empty()
+
+    def full(self):
+        return self._queue.full()
+
+    def wait_for_item(self, timeout):
+        """
+        Blocks until the queue has an item, the timeout passes or the
+        waiters are woken (see wake_waiters), without taking the item out of
+        the queue. An item that was just put may still be on its way to the
+        multiprocessing queue, so a get that doesn't block can miss it.
+
+        Returns:
+            True if the queue has an item, else False
+        """
+        with self._not_empty:
+            if self._items.value <= 0:
+                self._not_empty.wait(timeout)
+            return self._items.value > 0
+
+    def wake_waiters(self):
+        """
+        Wakes up the routines that wait for an item, in every process.
+        """
+        with self._not_empty:
+            self._not_empty.notify_all()
+
+    def close(self):
+        """
+        Unlinks the shared memories that all of the writers of the queue
+        wrote frames into, should be called once no routine uses the queue.
+        """
+        if self._generator is not None and self._generator_pid == os.getpid():
+            self._generator.cleanup()
+            self._generator = None
+            self._generator_pid = None
+        for writer_index in range(self._writers.value):
+            for memory_index in range(self.ring_size):
+                _unlink_memory(f"{self.name}_{writer_index}_{memory_index}")
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["_generator"] = None
+        state["_generator_pid"] = None
+        return state
@@ -0,0 +1,240 @@
+"""
+Automatic per-routine timestamps of the messages that pass through a
+pipeline, and the decomposition of their latency into queue wait, compute
+and transport.
+
+The run loop of a routine registers it as the current stage of its thread
+(or of its task, for a routine that runs on an event loop, see
+pipert.core.async_runtime).
+The component queues then record in the history of every message they
+pass, under the stage name "{component}/{routine}":
+dequeued - when the message was taken out of a queue by the stage.
+enqueued - when the message was put into a queue by the stage.
+logic_start, logic_end - the start and end of the main_logic call of the
+stage that handled the message. A message that the stage puts into a queue
+is handed off to the next stage, so its logic_end is the time of the put,
+and the stage doesn't record anything in its history after that.
+redis_sent, redis_received - recorded by the routines that pass messages
+through redis, see trace().
+
+All of the timestamps come from time.time_ns, like the rest of the history
+(see MessageHistory), so the stages of different processes and hosts can be
+compared.
+
+Tracing is on unless the PIPERT_TRACING environment variable is 'false', and
+can be switched at runtime with set_enabled.
+"""
+import contextvars
+import os
+import time
+
+from pipert.core.message import Message
+
+DEQUEUED = "dequeued"
+ENQUEUED = "enqueued"
+LOGIC_START = "logic_start"
+LOGIC_END = "logic_end"
+REDIS_SENT = "redis_sent"
+REDIS_RECEIVED = "redis_received"
+TRACE_SECTIONS = (DEQUEUED, ENQUEUED, LOGIC_START, LOGIC_END, REDIS_SENT, REDIS_RECEIVED)
+
+_enabled = os.environ.get("PIPERT_TRACING", "true").lower() != "false"
+
+
+class _Stage:
+    __slots__ = ("name", "logic_start", "touched", "handed_off", "dequeued")
+
+    def __init__(self, name):
+        self.name = name
+        self.logic_start = None
+        # id -> message, the messages are kept so their ids aren't reused
+        # during the main_logic call
+        self.touched = {}
+        self.handed_off = set()
+        self.dequeued = []
+
+
+# a context variable rather than a thread local, so routines that share the
+# thread of an event loop each have a stage of their own. A new thread starts
+# without a stage, like it would with a thread local.
+_current_stage = contextvars.ContextVar("pipert_tracing_stage", default=None)
+
+
+def set_enabled(enabled):
+    """
+    Turns the recording of the stages in the histories of the messages on
+    or off, in the current process.
+    """
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def stage_name(component_name, routine_name):
+    return f"{component_name}/{routine_name}"
+
+
+def enter_stage(name):
+    """
+    Makes the calling thread (or task) record the messages it handles under
+    the stage 'name', called by the run loop of a routine.
+    """
+    _current_stage.set(_Stage(name))
+
+
+def exit_stage():
+    _current_stage.set(None)
+
+
+def start_logic(timestamp_ns):
+    """
+    Marks the start of a main_logic call, the messages that are handled
+    during the call are stamped with it.
+    """
+    stage = _current_stage.get()
+    if stage is None:
+        return
+    stage.logic_start = timestamp_ns
+    stage.touched.clear()
+    stage.handed_off.clear()
+    stage.dequeued.clear()
+
+
+def end_logic(timestamp_ns):
+    """
+    Marks the end of a main_logic call on the messages that were handled
+    during it and are still held by the stage, the ones it put into queues
+    were marked when they were put.
+
+    Returns: the messages that the stage took out of queues during the
+    call.
+    """
+    stage = _current_stage.get()
+    if stage is None:
+        return []
+    for msg_id, msg in stage.touched.items():
+        if msg_id not in stage.handed_off:
+            msg.history.record(stage.name, LOGIC_END, timestamp_ns)
+    stage.logic_start = None
+    return stage.dequeued
+
+
+def _messages(item):
+    if isinstance(item, Message):
+        return (item,)
+    if isinstance(item, tuple):
+        return [element for element in item if isinstance(element, Message)]
+    return ()
+
+
+def trace(item, section):
+    """
+    Records a section of the current stage in the history of the message
+    (or of the messages in a tuple), does nothing outside of a stage.
+
+    A message that is ENQUEUED is about to be handed off to the next stage,
+    which may record in its history from another thread as soon as it is
+    put, so its LOGIC_END is recorded here and the stage leaves its history
+    alone for the rest of the main_logic call.
+    """
+    if not _enabled:
+        return
+    stage = _current_stage.get()
+    if stage is None:
+        return
+    for msg in _messages(item):
+        msg_id = id(msg)
+        if msg_id in stage.handed_off:
+            continue
+        if stage.logic_start is not None and msg_id not in stage.touched:
+            msg.history.record(stage.name, LOGIC_START, stage.logic_start)
+            stage.touched[msg_id] = msg
+        timestamp_ns = time.time_ns()
+        msg.history.record(stage.name, section, timestamp_ns)
+        if section == DEQUEUED:
+            stage.dequeued.append(msg)
+        elif section == ENQUEUED and stage.logic_start is not None:
+            msg.history.record(stage.name, LOGIC_END, timestamp_ns)
+            stage.handed_off.add(msg_id)
+
+
+def on_dequeue(item):
+    trace(item, DEQUEUED)
+
+
+def on_enqueue(item):
+    trace(item, ENQUEUED)
+
+
+def latency_breakdown(history):
+    """
+    Decomposes the latency of a message into the time it waited in queues,
+    the time stages computed it and the time it spent in transport between
+    components.
+
+    Args:
+        history: the MessageHistory of the message.
+
+    Returns: a dictionary with the 'total', 'queue_wait', 'compute' and
+    'transport' times in seconds, and the times of every stage under
+    'stages', in the order the stages handled the message.
+    """
+    stages = {}
+    first = last = None
+    last_enqueued = last_sent = None
+    for stage, section, timestamp in sorted(history, key=lambda entry: entry[2]):
+        first = timestamp if first is None else first
+        last = timestamp
+        if section not in TRACE_SECTIONS:
+            continue
+        times = stages.setdefault(stage, {"first": timestamp, "last": timestamp,
+                                          "start": None, "end": None, "input": None,
+                                          "queue_wait": 0, "transport": 0})
+        times["last"] = timestamp
+        if section == LOGIC_START and times["start"] is None:
+            times["start"] = timestamp
+        elif section == LOGIC_END:
+            times["end"] = timestamp
+        elif section == DEQUEUED:
+            if times["input"] is None:
+                times["input"] = timestamp
+            if last_enqueued is not None:
+                times["queue_wait"] += timestamp - last_enqueued
+                last_enqueued = None
+        elif section == REDIS_RECEIVED:
+            if times["input"] is None:
+                times["input"] = timestamp
+            if last_sent is not None:
+                times["transport"] += timestamp - last_sent
+                last_sent = None
+        elif section == ENQUEUED:
+            last_enqueued = timestamp
+        elif section == REDIS_SENT:
+            last_sent = timestamp
+
+    breakdown = {
+        "total": 0 if first is None else (last - first) / 1e9,
+        "queue_wait": 0,
+        "compute": 0,
+        "transport": 0,
+        "stages": []
+    }
+    for stage, times in stages.items():
+        # the time a stage waited for the message inside main_logic isn't
+        # computing it
+        start = max(timestamp for timestamp in (times["first"], times["start"], times["input"])
+                    if timestamp is not None)
+        end = times["last"] if times["end"] is None else times["end"]
+        stage_breakdown = {
+            "stage": stage,
+            "queue_wait": times["queue_wait"] / 1e9,
+            "compute": max(end - start, 0) / 1e9,
+            "transport": times["transport"] / 1e9
+        }
+        for kind in ("queue_wait", "compute", "transport"):
+            breakdown[kind] += stage_breakdown[kind]
+        breakdown["stages"].append(stage_breakdown)
+    return breakdown
@@ -1 +1,2 @@
-from .queue_handler import QueueHandler
+from .queue_handler import QueueHandler, QueueListeners, wait_for_any, async_wait_for_any, wake_waiters, \
+    has_any_item
@@ -1,8 +1,39 @@
 import queue
 import multiprocessing as mp
+import threading
 from typing import Union
 import time
 
+# seconds that wait_for_any waits on each queue in turn when waiting on
+# several queues that can't notify a shared event (see QueueListeners)
+MULTIPLE_QUEUES_WAIT_SLICE = 0.01
+
+
+class QueueListeners:
+    """
+    The events of the routines that wait on several queues at once (see
+    wait_for_any). A queue keeps its listeners under a 'listeners'
+    attribute and notifies them whenever an item is put into it, so a
+    routine waits on one event for all of its queues.
+    """
+
+    def __init__(self):
+        # replaced rather than mutated, so notify doesn't need the lock
+        self._events = ()
+        self._lock = threading.Lock()
+
+    def add(self, event):
+        with self._lock:
+            self._events = self._events + (event,)
+
+    def remove(self, event):
+        with self._lock:
+            self._events = tuple(listener for listener in self._events if listener is not event)
+
+    def notify(self):
+        for event in self._events:
+            event.set()
+
 
 class QueueHandler:
 
@@ -130,3 +161,155 @@ class QueueHandler:
             # TODO - could crash due to a race condition, could be solved with a lock
             self.q.put(item, block=False)
             return dropped
+
+
+def _wait_for_item(q, timeout, stop_event=None):
+    """
+    Blocks until the queue has an item, the stop event is set or the
+    timeout passes, without taking the item out of the queue.
+
+    Returns:
+        True if the queue has an item (or can't be waited on), else False
+    """
+    if hasattr(q, "wait_for_item"):
+        return q.wait_for_item(timeout)
+    not_empty = getattr(q, "not_empty", None)
+    if not_empty is None:
+        # a multiprocessing queue can't be waited on without consuming it
+        return True
+    with not_empty:
+        not_empty.wait_for(
+            lambda: q._qsize() > 0 or (stop_event is not None and stop_event.is_set()),
+            timeout)
+        return q._qsize() > 0
+
+
+def _wait_for_listened(queues, timeout, stop_event=None):
+    event = threading.Event()
+    for q in queues:
+        q.listeners.add(event)
+    try:
+        deadline = time.monotonic() + timeout
+        # the event is added before the queues are checked, so an item that
+        # is put in between sets it
+        while not has_any_item(queues):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or (stop_event is not None and stop_event.is_set()):
+                return False
+            event.wait(remaining)
+            event.clear()
+        return True
+    finally:
+        for q in queues:
+            q.listeners.remove(event)
+
+
+def wait_for_any(queues, timeout, stop_event=None):
+    """
+    Blocks until one of the queues has an item, the stop event is set or
+    the timeout passes, without taking the item out of the queue.
+    A single queue is waited on directly, several queues that have
+    listeners (see QueueListeners) are waited on with one event that each
+    of them sets when an item is put into it, other queues are waited on in
+    turns of `MULTIPLE_QUEUES_WAIT_SLICE` seconds.
+    Args:
+        queues: the queues to wait on
+        timeout: number of seconds until timeout
+        stop_event: an event that stops the wait once it is set, see
+        `wake_waiters`
+
+    Returns:
+        True if one of the queues has an item, else False
+    """
+    if len(queues) == 1:
+        return _wait_for_item(queues[0], timeout, stop_event)
+    if all(hasattr(q, "listeners") for q in queues):
+        return _wait_for_listened(queues, timeout, stop_event)
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        wait_slice = min(MULTIPLE_QUEUES_WAIT_SLICE, max(remaining, 0))
+        for q in queues:
+            if _wait_for_item(q, wait_slice, stop_event):
+                return True
+        if remaining <= 0 or (stop_event is not None and stop_event.is_set()):
+            return False
+
+
+class _LoopListener:
+    """
+    A queue listener of a coroutine that waits on an event loop, it can be
+    set from any thread.
+    """
+
+    def __init__(self, loop, event):
+        self._loop = loop
+        self.event = event
+
+    def set(self):
+        self._loop.call_soon_threadsafe(self.event.set)
+
+
+async def async_wait_for_any(queues, timeout, stop_event=None):
+    """
+    The same as `wait_for_any`, for a coroutine that runs on an event loop.
+    The puts into queues that have listeners wake the coroutine through the
+    loop, other queues are waited on by `wait_for_any` on the loop's
+    default executor.
+
+    Returns:
+        True if one of the queues has an item, else False
+    """
+    # asyncio is only imported by the routines that run on an event loop
+    import asyncio
+    loop = asyncio.get_running_loop()
+    if not all(hasattr(q, "listeners") for q in queues):
+        return await loop.run_in_executor(None, wait_for_any, queues, timeout, stop_event)
+    listener = _LoopListener(loop, asyncio.Event())
+    for q in queues:
+        q.listeners.add(listener)
+    try:
+        deadline = loop.time() + timeout
+        while not has_any_item(queues):
+            remaining = deadline - loop.time()
+            if remaining <= 0 or (stop_event is not None and stop_event.is_set()):
+                return False
+            try:
+                await asyncio.wait_for(listener.event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+            listener.event.clear()
+        return True
+    finally:
+        for q in queues:
+            q.listeners.remove(listener)
+
+
+def has_any_item(queues):
+    """
+    Returns True if one of the queues has an item, without blocking or
+    taking it out of the queue. A queue that can't tell is assumed to have
+    one.
+    """
+    for q in queues:
+        empty = getattr(q, "empty", None)
+        if empty is None or not empty():
+            return True
+    return False
+
+
+def wake_waiters(q):
+    """
+    Wakes up the routines that wait on the queue in `wait_for_any`, so they
+    can check their stop event.
+    """
+    listeners = getattr(q, "listeners", None)
+    if listeners is not None:
+        listeners.notify()
+    if hasattr(q, "wake_waiters"):
+        q.wake_waiters()
+        return
+    not_empty = getattr(q, "not_empty", None)
+    if not_empty is not None:
+        with not_empty:
+            not_empty.notify_all()
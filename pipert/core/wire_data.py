@@ -0,0 +1,153 @@
+"""
+The encoding of the non frame data of a message (the predictions and the
+frame metadata) in the binary wire format, see pipert.core.message.
+
+The data is encoded as JSON, and the values that JSON doesn't have (tuples,
+bytes, numpy arrays, tensors, Instances...) as objects that are tagged with
+the name of their type. Unlike pickle, decoding only ever creates the types
+that are registered here, so a message that was written to redis by anyone
+can't run code in the receiving component.
+
+Other types can be registered with register_data_type.
+"""
+import base64
+import json
+
+import numpy as np
+
+# the key of the type name in the object of a tagged value
+TYPE_KEY = "__pipert_type__"
+
+# qualified class name -> (type name, function that returns the state of an
+# object of the class, as data that can be encoded)
+_encoders = {}
+# type name -> function that creates the object from its decoded state
+_decoders = {}
+
+
+def _qualified_name(cls):
+    return f"{cls.__module__}.{cls.__qualname__}"
+
+
+def register_data_type(cls, to_state, from_state, name=None):
+    """
+    Makes the objects of a class encodable in the binary wire format.
+
+    Args:
+        cls: the class, or its qualified name ("module.ClassName") so the
+        module isn't imported until an object of it is decoded.
+        to_state: a function that returns the state of an object of the
+        class, made of encodable data.
+        from_state: a function that creates an object of the class from its
+        state.
+        name: the name of the type in the encoded data, the qualified name
+        of the class if None.
+    """
+    qualified_name = cls if isinstance(cls, str) else _qualified_name(cls)
+    name = qualified_name if name is None else name
+    _encoders[qualified_name] = (name, to_state)
+    _decoders[name] = from_state
+
+
+def _array_to_state(array):
+    if array.dtype.hasobject:
+        raise TypeError("Numpy arrays of objects can't be encoded")
+    # tobytes is in C order, whatever the layout of the array
+    return {"dtype": array.dtype.str, "shape": list(array.shape),
+            "data": base64.b64encode(array.tobytes()).decode("ascii")}
+
+
+def _array_from_state(state):
+    array = np.frombuffer(base64.b64decode(state["data"]), dtype=np.dtype(state["dtype"]))
+    # a writable copy, like the array that was encoded
+    return array.reshape(tuple(state["shape"])).copy()
+
+
+def _tensor_from_state(state):
+    import torch
+    return torch.from_numpy(state["array"])
+
+
+def _instances_from_state(state):
+    from pipert.utils.structures import Instances
+    return Instances(tuple(state["image_size"]), **state["fields"])
+
+
+def _boxes_from_state(state):
+    from pipert.utils.structures import Boxes
+    return Boxes(state["tensor"])
+
+
+register_data_type(np.ndarray, _array_to_state, _array_from_state, name="ndarray")
+register_data_type("torch.Tensor", lambda tensor: {"array": tensor.detach().cpu().numpy()},
+                   _tensor_from_state, name="tensor")
+register_data_type("pipert.utils.structures.instances.Instances",
+                   lambda instances: {"image_size": list(instances.image_size),
+                                      "fields": instances.get_fields()},
+                   _instances_from_state, name="Instances")
+register_data_type("pipert.utils.structures.boxes.Boxes", lambda boxes: {"tensor": boxes.tensor},
+                   _boxes_from_state, name="Boxes")
+
+
+def _to_data(value):
+    if value is None or isinstance(value, (bool, str, int, float)):
+        return value
+    if isinstance(value, list):
+        return [_to_data(item) for item in value]
+    if isinstance(value, tuple):
+        return {TYPE_KEY: "tuple", "items": [_to_data(item) for item in value]}
+    if isinstance(value, dict):
+        if all(isinstance(key, str) for key in value) and TYPE_KEY not in value:
+            return {key: _to_data(item) for key, item in value.items()}
+        return {TYPE_KEY: "dict", "items": [[_to_data(key), _to_data(item)] for key, item in value.items()]}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {TYPE_KEY: "bytes", "data": base64.b64encode(value).decode("ascii")}
+    if isinstance(value, np.generic):
+        return {TYPE_KEY: "scalar", "array": _to_data(np.asarray(value))}
+    encoder = _encoders.get(_qualified_name(type(value)))
+    if encoder is None:
+        raise TypeError(f"Objects of type {_qualified_name(type(value))} can't be encoded in the binary "
+                        f"message format, see pipert.core.wire_data.register_data_type")
+    name, to_state = encoder
+    state = _to_data(to_state(value))
+    state[TYPE_KEY] = name
+    return state
+
+
+def _from_data(obj):
+    name = obj.pop(TYPE_KEY, None)
+    if name is None:
+        return obj
+    if name == "tuple":
+        return tuple(obj["items"])
+    if name == "dict":
+        return {key: item for key, item in obj["items"]}
+    if name == "bytes":
+        return base64.b64decode(obj["data"])
+    if name == "scalar":
+        return obj["array"][()]
+    from_state = _decoders.get(name)
+    if from_state is None:
+        raise ValueError(f"Unknown data type '{name}' in the message")
+    return from_state(obj)
+
+
+def encode_data(value):
+    """
+    Encodes a value made of encodable data (see the module's documentation).
+
+    Raises:
+        TypeError: if the value has an object that can't be encoded.
+    """
+    return json.dumps(_to_data(value), separators=(",", ":")).encode()
+
+
+def decode_data(data):
+    """
+    Decodes a value that was encoded by encode_data.
+
+    Raises:
+        ValueError: if the data isn't a valid encoding.
+    """
+    # the objects are decoded from the innermost ones out
+    return json.loads(bytes(data), object_hook=_from_data)
@@ -0,0 +1,355 @@
+"""
+A zygote: a process that imports the heavy modules of the pipeline once and
+forks the component processes from itself on demand, so a new component
+doesn't pay for the interpreter start and the imports (torch, cv2, ...)
+again.
+
+The pipeline manager talks to the zygote over its stdin and stdout, one JSON
+object per line:
+- the manager writes {"id": ..., "config_path": ..., "port": ...} to fork a
+  component.
+- the zygote writes {"event": "zygote-ready", "preloaded": [...]} once it
+  imported the modules, and for every forked component {"id": ..., "event":
+  "forked", "pid": ...}, then {"id": ..., "event": "serving"} once its
+  zerorpc server is bound, {"id": ..., "event": "ready"} whenever the
+  routines of a run of it finished their setup and {"id": ..., "event":
+  "exited", "returncode": ...} once it exits.
+
+The zygote doesn't start any thread, zmq context or gevent hub, so the
+components are forked from a clean state. The output of the components goes
+to the zygote's stderr, and the components keep running if the zygote is
+stopped.
+
+Usage: python -m pipert.core.zygote [--modules MODULE ...]
+       [--folders FOLDER ...]
+"""
+import argparse
+import glob
+import importlib
+import importlib.util
+import json
+import os
+import select
+import signal
+import subprocess
+import sys
+import threading
+import traceback
+
+# the modules that the components of the pipeline use, the ones that can't be
+# imported here are skipped
+DEFAULT_PRELOAD_MODULES = ("numpy", "cv2", "torch", "torchvision", "redis", "zerorpc",
+                           "pipert.core.component", "pipert.utils.scripts.component_factory")
+# the folders of the routines and the components whose modules, and so their
+# dependencies, are imported by the zygote
+DEFAULT_PRELOAD_FOLDERS = ("pipert/contrib/routines", "pipert/contrib/components")
+# seconds that the zygote may take to import the modules
+ZYGOTE_START_TIMEOUT = 120
+ZYGOTE_READY_EVENT = "zygote-ready"
+# seconds between two checks for components that exited
+_REAP_INTERVAL = 0.1
+# what a forked component writes to its pipe to the zygote, see serve_component
+_PIPE_EVENTS = {b"s": "serving", b"r": "ready"}
+
+
+# the stream of the events to the pipeline manager, the zygote's stdout
+_events = None
+
+
+def _write_event(**event):
+    _events.write(json.dumps(event) + "\n")
+    _events.flush()
+
+
+def preload(modules, folders):
+    """
+    Imports the modules and the python files of the folders.
+
+    Returns: the names of the modules and the paths of the files that were
+    imported.
+    """
+    preloaded = []
+    for module_name in modules:
+        try:
+            importlib.import_module(module_name)
+        except Exception:
+            # not installed, or fails to import without its hardware
+            continue
+        preloaded.append(module_name)
+    for folder in folders:
+        for path in sorted(glob.glob(os.path.join(folder, "*.py"))):
+            if os.path.basename(path) == "__init__.py":
+                continue
+            spec = importlib.util.spec_from_file_location(os.path.basename(path)[:-3], path)
+            try:
+                spec.loader.exec_module(importlib.util.module_from_spec(spec))
+            except Exception:
+                continue
+            preloaded.append(path)
+    return preloaded
+
+
+def _run_forked_component(request, events_write):
+    returncode = 1
+    try:
+        # the zygote's stdin belongs to the pipeline manager
+        devnull = os.open(os.devnull, os.O_RDONLY)
+        os.dup2(devnull, 0)
+        os.close(devnull)
+        from pipert.utils.scripts.component_factory import serve_component
+        serve_component(request["config_path"], request["port"],
+                        on_serving=lambda: os.write(events_write, b"s"),
+                        on_ready=lambda: os.write(events_write, b"r"))
+        returncode = 0
+    except SystemExit as error:
+        if isinstance(error.code, int):
+            returncode = error.code
+        elif error.code is not None:
+            print(error.code, file=sys.stderr)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        # a forked process never returns into the zygote's loop
+        os._exit(returncode)
+
+
+def _fork_component(request, inherited_fds):
+    events_read, events_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        for fd in inherited_fds + [events_read]:
+            os.close(fd)
+        _run_forked_component(request, events_write)
+    os.close(events_write)
+    return pid, events_read
+
+
+def _reap_components(children):
+    while children:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            return
+        if pid == 0:
+            return
+        request_id = children.pop(pid, None)
+        if request_id is not None:
+            # like subprocess.Popen.returncode (os.waitstatus_to_exitcode needs python 3.9)
+            returncode = -os.WTERMSIG(status) if os.WIFSIGNALED(status) else os.WEXITSTATUS(status)
+            _write_event(id=request_id, event="exited", returncode=returncode)
+
+
+def run_zygote(modules=DEFAULT_PRELOAD_MODULES, folders=DEFAULT_PRELOAD_FOLDERS):
+    """
+    Preloads the modules and forks the components that are requested on
+    stdin, until stdin is closed.
+    """
+    global _events
+    # anything that is printed by the zygote or the components goes to
+    # stderr, so it doesn't mix with the events
+    _events = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+    _write_event(event=ZYGOTE_READY_EVENT, preloaded=preload(modules, folders))
+    stdin_fd = sys.stdin.fileno()
+    # pid -> request id of the running components
+    children = {}
+    # read end of the events pipe -> request id of the running components
+    event_pipes = {}
+    pending = b""
+    while True:
+        readable, _, _ = select.select([stdin_fd] + list(event_pipes), [], [], _REAP_INTERVAL)
+        for fd in readable:
+            if fd != stdin_fd:
+                data = os.read(fd, 64)
+                for event in data:
+                    _write_event(id=event_pipes[fd], event=_PIPE_EVENTS[bytes((event,))])
+                # an empty read means that the component exited
+                if not data:
+                    del event_pipes[fd]
+                    os.close(fd)
+                continue
+            data = os.read(stdin_fd, 65536)
+            if not data:
+                return
+            pending += data
+            while b"\n" in pending:
+                line, pending = pending.split(b"\n", 1)
+                request = json.loads(line)
+                pid, events_read = _fork_component(request, [_events.fileno()] + list(event_pipes))
+                children[pid] = request["id"]
+                event_pipes[events_read] = request["id"]
+                _write_event(id=request["id"], event="forked", pid=pid)
+        _reap_components(children)
+
+
+class ForkedComponentProcess:
+    """
+    A component process that was forked by the zygote, with the part of the
+    subprocess.Popen interface that the pipeline manager uses.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.pid = None
+        self.returncode = None
+        # set once the component serves its zerorpc server, or exited
+        self.serving_event = threading.Event()
+        # set once the routines of a run of the component finished their
+        # setup, or it exited
+        self.ready_event = threading.Event()
+        self._forked_event = threading.Event()
+        self._exited_event = threading.Event()
+
+    def poll(self):
+        return self.returncode
+
+    def wait(self, timeout=None):
+        if not self._exited_event.wait(timeout):
+            raise subprocess.TimeoutExpired(self.name, timeout)
+        return self.returncode
+
+    def send_signal(self, sig):
+        self._forked_event.wait()
+        if self.pid is not None and self.returncode is None:
+            try:
+                os.kill(self.pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def terminate(self):
+        self.send_signal(signal.SIGTERM)
+
+    def kill(self):
+        self.send_signal(signal.SIGKILL)
+
+    def _set_forked(self, pid):
+        self.pid = pid
+        self._forked_event.set()
+
+    def _set_serving(self):
+        self.serving_event.set()
+
+    def _set_ready(self):
+        self.ready_event.set()
+
+    def _set_exited(self, returncode):
+        self.returncode = returncode
+        self._forked_event.set()
+        self._exited_event.set()
+        self.serving_event.set()
+        self.ready_event.set()
+
+
+class ComponentZygote:
+    """
+    Starts a zygote process and forks components from it (see the module's
+    documentation).
+
+    Args:
+        modules: the names of the modules that the zygote imports.
+        folders: the folders whose python files the zygote imports.
+    """
+
+    def __init__(self, modules=DEFAULT_PRELOAD_MODULES, folders=DEFAULT_PRELOAD_FOLDERS):
+        self.modules = list(modules)
+        self.folders = list(folders)
+        self.preloaded = None
+        self.process = None
+        self._processes = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._ready_event = threading.Event()
+
+    def start(self, timeout=ZYGOTE_START_TIMEOUT):
+        """
+        Starts the zygote and waits until it imported the modules.
+
+        Returns: True if the zygote is ready, else False.
+        """
+        self.process = subprocess.Popen(
+            [sys.executable, "-m", "pipert.core.zygote", "--modules", *self.modules, "--folders", *self.folders],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
+        threading.Thread(target=self._read_events, daemon=True, name="pipert-zygote-reader").start()
+        return self._ready_event.wait(timeout) and self.is_alive()
+
+    def is_alive(self):
+        return self.process is not None and self.process.poll() is None and self.preloaded is not None
+
+    def fork_component(self, name, config_path, port):
+        """
+        Forks a component that serves the component of the configuration
+        file on the given port (like component_factory.py does).
+
+        Returns: the ForkedComponentProcess of the component.
+        """
+        process = ForkedComponentProcess(name)
+        with self._lock:
+            request_id = self._next_id
+            self._next_id += 1
+            self._processes[request_id] = process
+            try:
+                self.process.stdin.write(json.dumps({"id": request_id, "config_path": config_path,
+                                                     "port": str(port)}) + "\n")
+                self.process.stdin.flush()
+            except (OSError, ValueError):
+                # the zygote exited
+                del self._processes[request_id]
+                process._set_exited(1)
+        return process
+
+    def stop(self):
+        """
+        Stops the zygote, the components that it forked keep running.
+        """
+        if self.process is None:
+            return
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        self.process.wait()
+
+    def _read_events(self):
+        for line in self.process.stdout:
+            event = json.loads(line)
+            if event["event"] == ZYGOTE_READY_EVENT:
+                self.preloaded = event["preloaded"]
+                self._ready_event.set()
+                continue
+            with self._lock:
+                process = self._processes.get(event["id"])
+                if event["event"] == "exited":
+                    self._processes.pop(event["id"], None)
+            if process is None:
+                continue
+            if event["event"] == "forked":
+                process._set_forked(event["pid"])
+            elif event["event"] == "serving":
+                process._set_serving()
+            elif event["event"] == "ready":
+                process._set_ready()
+            elif event["event"] == "exited":
+                process._set_exited(event["returncode"])
+        self.process.wait()
+        self._ready_event.set()
+        # the zygote can't report on its components anymore
+        with self._lock:
+            processes, self._processes = self._processes, {}
+        for process in processes.values():
+            if process.pid is None:
+                process._set_exited(1)
+            else:
+                process._forked_event.set()
+                process._set_serving()
+                process._set_ready()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--modules', help='Modules to import', nargs='*', default=list(DEFAULT_PRELOAD_MODULES))
+    parser.add_argument('--folders', help='Folders whose python files are imported', nargs='*',
+                        default=list(DEFAULT_PRELOAD_FOLDERS))
+    opts = parser.parse_args()
+    run_zygote(opts.modules, opts.folders)
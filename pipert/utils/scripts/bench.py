@@ -0,0 +1,273 @@
+"""
+Benchmarks a component of a pipeline configuration with synthetic inputs
+and outputs, and writes the results as JSON so they can be compared between
+versions.
+
+The input routines of the component are replaced with SyntheticFrameSource
+routines and its output routines are removed, every queue that routines put
+messages into and no routine takes messages out of gets a CountingSink.
+The component then runs for a warmup period, which isn't measured, and for
+the benchmark duration, after which the following are reported:
+- the frames per second that reached the sinks, and the p50/p95/p99 latency
+  from the time a frame was generated to the time it reached a sink.
+- the counters of every queue, including the frames it dropped.
+- the CPU time and utilization of every routine, and the frames it dropped
+  when it counts them.
+
+Usage: python -m pipert.utils.scripts.bench -cp CONFIG_PATH [-c COMPONENT]
+       [-d DURATION] [-w WARMUP] [--fps FPS] [--width WIDTH]
+       [--height HEIGHT] [-o OUTPUT_PATH]
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+from pipert.core.class_factory import ClassFactory, ROUTINES_ENTRY_POINT_GROUP
+from pipert.core.component import BaseComponent
+from pipert.core.routine import RoutineTypes
+from pipert.utils.useful_methods import open_config_file
+
+ROUTINES_FOLDER_PATH = "pipert/contrib/routines"
+SOURCE_ROUTINE_TYPE_NAME = "SyntheticFrameSource"
+SINK_ROUTINE_TYPE_NAME = "CountingSink"
+LATENCY_PERCENTILES = (50, 95, 99)
+
+
+def _get_routine_class(routine_factory, routine_type_name):
+    try:
+        return routine_factory.get_class(routine_type_name)
+    except ImportError:
+        # the routine can't be benchmarked here, the component skips it
+        return None
+
+
+def _get_queue_names(routine_parameters, parameter_types, direction):
+    """
+    Returns the names of the queues that are passed to a routine in the
+    parameters of the given direction ("QueueIn" or "QueueOut").
+    """
+    queue_names = []
+    for parameter_name, parameter_type in parameter_types.items():
+        if not str(parameter_type).startswith(direction) or parameter_name not in routine_parameters:
+            continue
+        value = routine_parameters[parameter_name]
+        queue_names.extend(value if isinstance(value, list) else [value])
+    return queue_names
+
+
+def build_bench_config(component_config, fps=30, width=640, height=480):
+    """
+    Returns the configuration of the benchmarked component: the given
+    configuration with synthetic sources in place of its input routines and
+    counting sinks in place of its outputs.
+
+    Args:
+        component_config: the configuration of one component, as a
+        dictionary of the component's name to its parameters.
+        fps: the rate of the synthetic sources, 0 for as fast as possible.
+        width: the width of the synthetic frames.
+        height: the height of the synthetic frames.
+    """
+    component_name, component_parameters = list(component_config.items())[0]
+    routine_factory = ClassFactory(ROUTINES_FOLDER_PATH, ROUTINES_ENTRY_POINT_GROUP)
+    routines = {}
+    produced, consumed = [], set()
+    for routine_name, routine_parameters in component_parameters["routines"].items():
+        routine_class = _get_routine_class(routine_factory, routine_parameters.get("routine_type_name", ""))
+        if routine_class is None:
+            routines[routine_name] = routine_parameters
+            continue
+        parameter_types = routine_class.get_constructor_parameters() or {}
+        in_queues = _get_queue_names(routine_parameters, parameter_types, "QueueIn")
+        out_queues = _get_queue_names(routine_parameters, parameter_types, "QueueOut")
+        if routine_class.routine_type == RoutineTypes.INPUT:
+            for index, queue_name in enumerate(out_queues):
+                source_name = routine_name if len(out_queues) == 1 else f"{routine_name}_{index}"
+                routines[source_name] = {
+                    "routine_type_name": SOURCE_ROUTINE_TYPE_NAME,
+                    "out_queue": queue_name,
+                    "fps": fps,
+                    "width": width,
+                    "height": height,
+                    "execution_mode": routine_parameters.get("execution_mode", "thread")
+                }
+            produced.extend(out_queues)
+        elif routine_class.routine_type != RoutineTypes.OUTPUT:
+            routines[routine_name] = routine_parameters
+            produced.extend(out_queues)
+            consumed.update(in_queues)
+
+    queues = list(component_parameters["queues"])
+    queue_names = [queue["name"] if isinstance(queue, dict) else queue for queue in queues]
+    for queue_name in dict.fromkeys(produced):
+        if queue_name in consumed:
+            continue
+        if queue_name not in queue_names:
+            # an output queue of a special component, like the queue of a
+            # display, is a regular queue in the benchmark
+            queues.append(queue_name)
+            queue_names.append(queue_name)
+        # the sinks run as threads of the benchmark, which reads their counters
+        routines[f"sink_{queue_name}"] = {
+            "routine_type_name": SINK_ROUTINE_TYPE_NAME,
+            "in_queue": queue_name
+        }
+
+    bench_parameters = {key: value for key, value in component_parameters.items()
+                        if key not in ("component_type_name", "monitoring_system")}
+    bench_parameters["queues"] = queues
+    bench_parameters["routines"] = routines
+    return {component_name: bench_parameters}
+
+
+def get_cpu_time(routine):
+    """
+    Returns the CPU time (in seconds) that the runner of a routine used so
+    far, or None if it can't be measured on this platform.
+    """
+    runner = routine.runner
+    if runner is None or runner.ident is None:
+        return None
+    try:
+        if routine.execution_mode == "thread":
+            return time.clock_gettime(time.pthread_getcpuclockid(runner.ident))
+        with open(f"/proc/{runner.pid}/stat") as stat_file:
+            # the fields after the command name, which may contain spaces
+            fields = stat_file.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+    except (AttributeError, OSError, ValueError, IndexError):
+        return None
+
+
+def summarize_latencies(latencies_ns):
+    """
+    Returns the percentiles, mean and max of the latencies in milliseconds.
+    """
+    if not latencies_ns:
+        return None
+    latencies_ms = np.array(latencies_ns) / 1e6
+    summary = {f"p{percentile}": float(np.percentile(latencies_ms, percentile))
+               for percentile in LATENCY_PERCENTILES}
+    summary["mean"] = float(latencies_ms.mean())
+    summary["max"] = float(latencies_ms.max())
+    return summary
+
+
+def _reset_queue_stats(component):
+    for queue in component.queues.values():
+        if hasattr(queue, "reset_stats"):
+            queue.reset_stats()
+
+
+def run_benchmark(component_config, duration=10, warmup=2, fps=30, width=640, height=480):
+    """
+    Runs the benchmark of a component (see the module's documentation).
+
+    Args:
+        component_config: the configuration of one component, as a
+        dictionary of the component's name to its parameters.
+        duration: the number of seconds that are measured.
+        warmup: the number of seconds the component runs before measuring.
+        fps: the rate of the synthetic sources, 0 for as fast as possible.
+        width: the width of the synthetic frames.
+        height: the height of the synthetic frames.
+
+    Returns: the results as a dictionary.
+    """
+    bench_config = build_bench_config(component_config, fps=fps, width=width, height=height)
+    component = BaseComponent(bench_config)
+    routines = component.get_routines()
+    sinks = {name: routine for name, routine in routines.items()
+             if routine.__class__.__name__ == SINK_ROUTINE_TYPE_NAME}
+    if not sinks:
+        raise ValueError(f"Component {component.name} has no outputs to measure")
+
+    component.run_comp()
+    try:
+        time.sleep(warmup)
+        for sink in sinks.values():
+            sink.reset()
+        _reset_queue_stats(component)
+        start_cpu_times = {name: get_cpu_time(routine) for name, routine in routines.items()}
+        start = time.monotonic()
+        time.sleep(duration)
+        elapsed = time.monotonic() - start
+        end_cpu_times = {name: get_cpu_time(routine) for name, routine in routines.items()}
+        sink_results = {name: (sink.count, list(sink.latencies_ns)) for name, sink in sinks.items()}
+        queue_stats = component.get_queue_stats()
+    finally:
+        component.stop_run()
+
+    frames = sum(count for count, _ in sink_results.values())
+    routine_results = {}
+    for name, routine in routines.items():
+        start_cpu, end_cpu = start_cpu_times[name], end_cpu_times[name]
+        cpu_time = None if start_cpu is None or end_cpu is None else end_cpu - start_cpu
+        routine_results[name] = {
+            "routine_type_name": routine.__class__.__name__,
+            "execution_mode": routine.execution_mode,
+            "cpu_seconds": cpu_time,
+            "cpu_percent": None if cpu_time is None else 100 * cpu_time / elapsed,
+            # the state of a routine that runs as a process isn't readable here
+            "dropped": getattr(routine.state, "dropped", None)
+        }
+    return {
+        "component": component.name,
+        "python": platform.python_version(),
+        "duration": elapsed,
+        "source": {"fps": fps, "width": width, "height": height},
+        "frames": frames,
+        "fps": frames / elapsed,
+        "latency_ms": summarize_latencies([latency for _, latencies in sink_results.values()
+                                           for latency in latencies]),
+        "sinks": {name: {"queue": bench_config[component.name]["routines"][name]["in_queue"],
+                         "frames": count,
+                         "fps": count / elapsed,
+                         "latency_ms": summarize_latencies(latencies)}
+                  for name, (count, latencies) in sink_results.items()},
+        "queues": queue_stats,
+        "routines": routine_results
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-cp', '--config_path', help='Configuration file path', type=str, required=True)
+    parser.add_argument('-c', '--component', help='Name of the benchmarked component, '
+                                                  'the first component by default', type=str, default=None)
+    parser.add_argument('-d', '--duration', help='Measured seconds', type=float, default=10)
+    parser.add_argument('-w', '--warmup', help='Seconds to run before measuring', type=float, default=2)
+    parser.add_argument('--fps', help='Rate of the synthetic sources, 0 for unlimited', type=float, default=30)
+    parser.add_argument('--width', help='Width of the synthetic frames', type=int, default=640)
+    parser.add_argument('--height', help='Height of the synthetic frames', type=int, default=480)
+    parser.add_argument('-o', '--output_path', help='Path of the JSON results', type=str,
+                        default='bench_result.json')
+    opts = parser.parse_args()
+
+    config = open_config_file(opts.config_path)
+    if isinstance(config, str):
+        sys.exit(config)
+    components = config.get("components", config)
+    component_name = opts.component or list(components)[0]
+    if component_name not in components:
+        sys.exit(f"Component {component_name} isn't in {opts.config_path}")
+
+    results = run_benchmark({component_name: components[component_name]}, duration=opts.duration,
+                            warmup=opts.warmup, fps=opts.fps, width=opts.width, height=opts.height)
+    with open(opts.output_path, 'w') as output_file:
+        json.dump(results, output_file, indent=2)
+
+    latency = results["latency_ms"] or {}
+    print(f"{results['component']}: {results['fps']:.1f} fps, latency p50 {latency.get('p50', 0):.2f} ms, "
+          f"p95 {latency.get('p95', 0):.2f} ms, p99 {latency.get('p99', 0):.2f} ms")
+    for queue_name, stats in results["queues"].items():
+        print(f"  queue {queue_name}: dropped {stats.get('dropped', 'n/a')}")
+    for routine_name, routine_results in results["routines"].items():
+        cpu_percent = routine_results["cpu_percent"]
+        print(f"  routine {routine_name}: cpu {'n/a' if cpu_percent is None else f'{cpu_percent:.1f}%'}")
+    print(f"Results written to {opts.output_path}")
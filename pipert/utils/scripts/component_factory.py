@@ -1,28 +1,39 @@
 import argparse
 import sys
 import zerorpc
-from pipert.core.class_factory import ClassFactory
-from pipert.core.component import BaseComponent
+from pipert.core.class_factory import ClassFactory, COMPONENTS_ENTRY_POINT_GROUP
+from pipert.core.component import BaseComponent, COMPONENT_SERVING_MESSAGE, COMPONENT_READY_MESSAGE
 from pipert.utils.useful_methods import open_config_file
 
 COMPONENTS_FOLDER_PATH = "pipert/contrib/components"
 
 
-if __name__ == '__main__':
-    parser = argparse.ArgumentParser()
-    parser.add_argument('-cp', '--config_path', help='Configuration file path', type=str,
-                        default='pipert/core/config.yaml')
-    parser.add_argument('-p', '--port', help='ZeroRPC port', type=str, default=None)
-    opts, unknown = parser.parse_known_args()
+def _print_serving_message():
+    # the pipeline manager waits for this line before calling the component
+    print(COMPONENT_SERVING_MESSAGE, flush=True)
 
-    if opts.port is None:
-        sys.exit("Must get port for the zeroRPC server in the script parameters")
 
-    component_config = open_config_file(opts.config_path)
+def _print_ready_message():
+    print(COMPONENT_READY_MESSAGE, flush=True)
+
+
+def serve_component(config_path, port, on_serving=_print_serving_message, on_ready=_print_ready_message):
+    """
+    Creates the component of a configuration file and serves it with a
+    zerorpc server until the process is killed.
+
+    Args:
+        config_path: the path of the component's configuration file.
+        port: the port of the zerorpc server.
+        on_serving: called once the server is bound.
+        on_ready: called whenever the routines of a run of the component
+        finished their setup (see BaseComponent._notify_when_ready).
+    """
+    component_config = open_config_file(config_path)
 
     if isinstance(component_config, str):
         sys.exit(component_config)
-    component_factory = ClassFactory(COMPONENTS_FOLDER_PATH)
+    component_factory = ClassFactory(COMPONENTS_FOLDER_PATH, COMPONENTS_ENTRY_POINT_GROUP)
 
     _, component_params = list(component_config.items())[0]
 
@@ -32,6 +43,22 @@ if __name__ == '__main__':
     else:
         component_class = BaseComponent
 
-    zpc = zerorpc.Server(component_class(component_config))
-    zpc.bind("tcp://0.0.0.0:{0}".format(opts.port))
+    component = component_class(component_config)
+    component._ready_callback = on_ready
+    zpc = zerorpc.Server(component)
+    zpc.bind("tcp://0.0.0.0:{0}".format(port))
+    on_serving()
     zpc.run()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-cp', '--config_path', help='Configuration file path', type=str,
+                        default='pipert/core/config.yaml')
+    parser.add_argument('-p', '--port', help='ZeroRPC port', type=str, default=None)
+    opts, unknown = parser.parse_known_args()
+
+    if opts.port is None:
+        sys.exit("Must get port for the zeroRPC server in the script parameters")
+
+    serve_component(opts.config_path, opts.port)
@@ -32,6 +32,9 @@ class CliConnection(object):
 
 
 pipeline_manager = PipelineManager()
+if os.environ.get("ZYGOTE", "").lower() == 'true':
+    # the components are forked from a process that imported their modules
+    pipeline_manager.start_zygote()
 
 if not os.environ.get("UI", "").lower() == 'true':
     cli_server = zerorpc.Server(CliConnection(pipeline_manager))
@@ -0,0 +1,173 @@
+import logging
+from queue import Queue
+from threading import Timer
+
+import numpy as np
+import pytest
+
+from pipert.core.batch_routine import BatchRoutine, FanInBatchRoutine
+from pipert.core.message import Message
+from pipert.core.routine import State
+from tests.pipert.core.utils.component.dummy_component import DummyComponent
+
+
+class DummyBatchRoutine(BatchRoutine):
+    def __init__(self, *args, **kwargs):
+        super().__init__(logger=logging.getLogger("test_logs.log"), *args, **kwargs)
+        self.batches = []
+
+    def process_batch(self, batch):
+        self.batches.append(batch)
+        return [int(frame.sum()) for frame in batch]
+
+
+@pytest.fixture(scope="function")
+def batch_routine():
+    routine = DummyBatchRoutine(Queue(maxsize=10), Queue(maxsize=10),
+                                batch_size=4, max_batch_wait_ms=50)
+    routine.state = State()
+    routine.setup()
+    return routine
+
+
+def test_empty_queue(batch_routine):
+    assert not batch_routine.main_logic()
+
+
+def test_batch_is_stacked_and_results_keep_ids(batch_routine):
+    messages = [Message(np.full((2, 2), i), "cam" + str(i)) for i in range(6)]
+    for msg in messages:
+        msg.record_entry("comp", logging.getLogger("test_logs.log"))
+        batch_routine.in_queue.put(msg)
+    assert batch_routine.main_logic()
+    assert batch_routine.main_logic()
+    assert batch_routine.batches[0].shape == (4, 2, 2)
+    assert len(batch_routine.batches[1]) == 2
+    for i, msg in enumerate(messages):
+        result = batch_routine.out_queue.get(block=False)
+        assert result.id == msg.id
+        assert result.source_address == msg.source_address
+        assert result.history.has("comp", "entry")
+        assert result.get_payload() == 4 * i
+        # the result records its own trace
+        assert result.history is not msg.history
+        result.record_exit("comp", logging.getLogger("test_logs.log"))
+        assert not msg.history.has("comp", "exit")
+
+
+def test_messages_are_not_batched_by_default():
+    routine = DummyBatchRoutine(Queue(maxsize=10), Queue(maxsize=10))
+    routine.state = State()
+    routine.setup()
+    routine.in_queue.put(Message(np.ones((2, 2)), "cam1"))
+    routine.in_queue.put(Message(np.ones((2, 2)), "cam2"))
+    assert routine.main_logic()
+    assert routine.batches[0].shape == (1, 2, 2)
+    assert routine.in_queue.qsize() == 1
+
+
+def test_frames_of_different_shapes(batch_routine):
+    batch_routine.in_queue.put(Message(np.ones((2, 2)), "cam1"))
+    batch_routine.in_queue.put(Message(np.ones((3, 3)), "cam2"))
+    assert batch_routine.main_logic()
+    assert isinstance(batch_routine.batches[0], list)
+
+
+def test_waits_for_the_rest_of_the_batch(batch_routine):
+    batch_routine.in_queue.put(Message(np.ones((2, 2)), "cam1"))
+    Timer(0.01, batch_routine.in_queue.put, args=(Message(np.ones((2, 2)), "cam2"),)).start()
+    assert batch_routine.main_logic()
+    assert len(batch_routine.batches[0]) == 2
+
+
+def test_full_output_queue_drops_oldest_result(batch_routine):
+    batch_routine.out_queue = Queue(maxsize=1)
+    for i in range(3):
+        batch_routine.in_queue.put(Message(np.full((2, 2), i), "cam"))
+    assert batch_routine.main_logic()
+    assert batch_routine.out_queue.get(block=False).get_payload() == 8
+    assert batch_routine.state.dropped == 2
+
+
+class DummyFanInRoutine(FanInBatchRoutine):
+    def __init__(self, *args, **kwargs):
+        super().__init__(logger=logging.getLogger("test_logs.log"), *args, **kwargs)
+        self.batches = []
+
+    def process_batch(self, batch):
+        self.batches.append(batch)
+        return [int(frame.sum()) for frame in batch]
+
+
+def _fan_in_routine(sources, **kwargs):
+    routine = DummyFanInRoutine([Queue(maxsize=10) for _ in range(sources)],
+                                [Queue(maxsize=10) for _ in range(sources)], **kwargs)
+    routine.state = State()
+    routine.setup()
+    return routine
+
+
+def test_fan_in_routes_results_to_sources():
+    routine = _fan_in_routine(3, batch_size=3, max_pending=2)
+    for source in range(3):
+        routine.in_queues[source].put(Message(np.full((2, 2), source), str(source)))
+    assert routine.main_logic()
+    assert routine.batches[0].shape == (3, 2, 2)
+    for source in range(3):
+        result = routine.out_queues[source].get(block=False)
+        assert result.source_address == str(source)
+        assert result.get_payload() == 4 * source
+    assert not routine.main_logic()
+
+
+def test_fan_in_round_robin_is_fair():
+    routine = _fan_in_routine(2, batch_size=2, max_pending=4)
+    for i in range(4):
+        routine.in_queues[0].put(Message(np.zeros((2, 2)), "busy"))
+    routine.in_queues[1].put(Message(np.zeros((2, 2)), "quiet"))
+    assert routine.main_logic()
+    assert routine.out_queues[0].qsize() == 1
+    assert routine.out_queues[1].qsize() == 1
+
+
+def test_fan_in_keeps_newest_pending_messages():
+    routine = _fan_in_routine(1, batch_size=1, max_pending=1)
+    for i in range(3):
+        routine.in_queues[0].put(Message(np.full((2, 2), i), "cam"))
+    assert routine.main_logic()
+    assert routine.out_queues[0].get(block=False).get_payload() == 8
+    assert routine.state.dropped == 2
+
+
+def test_fan_in_deadline_scheduling():
+    routine = _fan_in_routine(2, batch_size=1, max_pending=1, scheduling="deadline",
+                              latency_budgets_ms=[1000, 10])
+    routine.in_queues[0].put(Message(np.zeros((2, 2)), "relaxed"))
+    routine.in_queues[1].put(Message(np.zeros((2, 2)), "urgent"))
+    assert routine.main_logic()
+    assert routine.out_queues[1].qsize() == 1
+    assert routine.out_queues[0].qsize() == 0
+
+
+def test_fan_in_bad_parameters():
+    with pytest.raises(ValueError):
+        DummyFanInRoutine([Queue()], [])
+    with pytest.raises(ValueError):
+        DummyFanInRoutine([Queue()], [Queue()], scheduling="random")
+
+
+def test_fan_in_routine_in_component():
+    comp = DummyComponent({})
+    comp.name = "comp"
+    for name in ("in1", "in2", "out1", "out2"):
+        comp.create_queue(name)
+    routine = DummyFanInRoutine([comp.queues["in1"], comp.queues["in2"]],
+                                [comp.queues["out1"], comp.queues["out2"]], name="fan_in")
+    comp.register_routine(routine.as_thread())
+    routine_dict = comp.get_component_configuration()["comp"]["routines"]["fan_in"]
+    assert routine_dict["in_queues"] == ["in1", "in2"]
+    assert routine_dict["out_queues"] == ["out1", "out2"]
+    assert comp.does_routines_use_queue("in2")
+    routine_parameters = {"in_queues": ["in1", "in2"]}
+    comp._replace_queue_names_with_queue_objects(routine_parameters)
+    assert routine_parameters["in_queues"][1] is comp.queues["in2"]
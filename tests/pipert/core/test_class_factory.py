@@ -0,0 +1,106 @@
+import importlib.metadata
+import os
+
+import pytest
+
+from pipert.core import class_factory
+from pipert.core.class_factory import ClassFactory
+from pipert.contrib.routines.counting_sink import CountingSink
+
+MODULE_SOURCE = '''
+import os
+
+LOADS_PATH = os.path.join(os.path.dirname(__file__), "loads")
+with open(LOADS_PATH, "a") as loads_file:
+    loads_file.write("x")
+
+
+class SomeClass:
+    value = {value}
+'''
+
+
+def write_module(folder, value):
+    path = folder / "some_class.py"
+    path.write_text(MODULE_SOURCE.format(value=value))
+    # the modification time changes even on file systems with a coarse resolution
+    os.utime(path, ns=(value * 10 ** 9, value * 10 ** 9))
+
+
+def count_loads(folder):
+    return len((folder / "loads").read_text())
+
+
+@pytest.fixture(scope="function")
+def classes_folder(tmp_path, monkeypatch):
+    monkeypatch.setattr(class_factory, "MANIFESTS_FOLDER_PATH", str(tmp_path / "manifests"))
+    folder = tmp_path / "classes"
+    folder.mkdir()
+    write_module(folder, 1)
+    return folder
+
+
+def describe(class_object):
+    return {"value": class_object.value}
+
+
+def test_get_class_loads_module_once(classes_folder):
+    factory = ClassFactory(str(classes_folder))
+    some_class = factory.get_class("SomeClass")
+    assert some_class.value == 1
+    assert factory.get_class("SomeClass") is some_class
+    assert ClassFactory(str(classes_folder)).get_class("SomeClass") is some_class
+    assert count_loads(classes_folder) == 1
+
+
+def test_get_class_reloads_changed_module(classes_folder):
+    factory = ClassFactory(str(classes_folder))
+    assert factory.get_class("SomeClass").value == 1
+    write_module(classes_folder, 2)
+    assert factory.get_class("SomeClass").value == 2
+    assert count_loads(classes_folder) == 2
+
+
+def test_get_class_that_does_not_exist(classes_folder):
+    assert ClassFactory(str(classes_folder)).get_class("OtherClass") is None
+
+
+def test_get_class_from_entry_point(classes_folder, monkeypatch):
+    entry_point = importlib.metadata.EntryPoint(name="Sink", value="pipert.contrib.routines.counting_sink:CountingSink",
+                                                group="pipert.routines")
+    monkeypatch.setattr(importlib.metadata, "entry_points", lambda group: [entry_point])
+    factory = ClassFactory(str(classes_folder), "pipert.routines")
+    assert factory.get_class("Sink") is CountingSink
+    assert factory.get_class_names() == ["SomeClass", "Sink"]
+
+
+def test_describe_classes_from_manifest(classes_folder, monkeypatch):
+    factory = ClassFactory(str(classes_folder))
+    assert factory.describe_classes(describe) == {"SomeClass": {"value": 1}}
+    assert count_loads(classes_folder) == 1
+
+    class_factory._modules.clear()
+    assert ClassFactory(str(classes_folder)).describe_classes(describe) == {"SomeClass": {"value": 1}}
+    assert count_loads(classes_folder) == 1
+
+    write_module(classes_folder, 2)
+    assert ClassFactory(str(classes_folder)).describe_classes(describe) == {"SomeClass": {"value": 2}}
+    assert count_loads(classes_folder) == 2
+
+
+def test_describe_classes_after_a_base_class_changed(classes_folder):
+    (classes_folder / "derived_class.py").write_text(
+        "import importlib.util, os\n"
+        "spec = importlib.util.spec_from_file_location('base', os.path.join(os.path.dirname(__file__), 'base.py'))\n"
+        "base = importlib.util.module_from_spec(spec)\n"
+        "spec.loader.exec_module(base)\n"
+        "class DerivedClass(base.Base):\n"
+        "    pass\n")
+    (classes_folder / "base.py").write_text("class Base:\n    value = 1\n")
+    assert ClassFactory(str(classes_folder)).describe_classes(describe)["DerivedClass"] == {"value": 1}
+
+    (classes_folder / "base.py").write_text("class Base:\n    value = 2\n")
+    os.utime(classes_folder / "base.py", ns=(10 ** 9, 10 ** 9))
+    # a new process, whose modules aren't loaded yet
+    class_factory._modules.clear()
+    assert ClassFactory(str(classes_folder)).describe_classes(describe)["DerivedClass"] == {"value": 2}
@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+from pipert.core.codecs import get_codec, decode_frame, RawCodec, JpegCodec
+from pipert.core.message import Message, message_encode, message_decode
+
+
+def create_frame():
+    return (np.random.rand(48, 64, 3) * 255).astype(np.uint8)
+
+
+@pytest.mark.parametrize("codec_name", ["none", "png", "lz4", "zstd"])
+def test_lossless_codecs(codec_name):
+    if codec_name == "png":
+        pytest.importorskip("cv2")
+    elif codec_name in ("lz4", "zstd"):
+        pytest.importorskip({"lz4": "lz4", "zstd": "zstandard"}[codec_name])
+    frame = create_frame()
+    codec = get_codec(codec_name)
+    data = codec.encode(frame)
+    assert (decode_frame(codec_name, data, frame.shape, frame.dtype) == frame).all()
+
+
+def test_jpeg_codec():
+    pytest.importorskip("cv2")
+    frame = np.full((48, 64, 3), 100, dtype=np.uint8)
+    codec = get_codec({"name": "jpeg", "quality": 80})
+    assert isinstance(codec, JpegCodec)
+    data = codec.encode(frame)
+    assert len(data) < frame.nbytes
+    decoded_frame = decode_frame("jpeg", data, frame.shape, frame.dtype)
+    assert decoded_frame.shape == frame.shape
+    assert np.abs(decoded_frame.astype(int) - frame).max() <= 2
+    with pytest.raises(ValueError):
+        codec.encode(frame.astype(np.float32))
+
+
+def test_get_codec_that_does_not_exist():
+    with pytest.raises(ValueError):
+        get_codec("bla")
+    assert isinstance(get_codec({"name": "none"}), RawCodec)
+
+
+@pytest.mark.parametrize("binary", [False, True])
+def test_message_encode_with_codec(binary):
+    pytest.importorskip("cv2")
+    frame = create_frame()
+    encoded_msg = message_encode(Message(frame, "localhost"), codec=get_codec("png"), binary=binary)
+    decoded_msg = message_decode(encoded_msg, allow_pickle=not binary)
+    assert decoded_msg.payload.codec == "png"
+    assert (decoded_msg.get_payload() == frame).all()
+
+    encoded_msg = message_encode(Message((frame, {"id": 1}), "localhost"), codec=get_codec("png"), binary=binary)
+    decoded_frame, metadata = message_decode(encoded_msg, allow_pickle=not binary).get_payload()
+    assert (decoded_frame == frame).all()
+    assert metadata == {"id": 1}
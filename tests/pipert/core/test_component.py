@@ -1,12 +1,17 @@
 import logging
+import threading
 import time
 from threading import Thread
 
 import pytest
+import redis
 from multiprocessing import Process
 
 from pipert.core.metrics_collector import NullCollector
-from tests.pipert.core.utils.routines.dummy_routines import DummyRoutine, DummyRoutineWithQueue
+from pipert.core.latest_slot import LatestSlot
+from pipert.core.shared_memory_queue import SharedMemoryQueue
+from tests.pipert.core.utils.routines.dummy_routines import DummyRoutine, DummyRoutineWithQueue, \
+    DummyFrameProducerRoutine
 from tests.pipert.core.utils.component.dummy_component import DummyComponent
 import os
 
@@ -175,3 +180,227 @@ def test_set_monitoring_with_good_params(component_with_queue_and_routine):
     })
     assert not isinstance(component_with_queue_and_routine.metrics_collector, NullCollector)
 
+
+def test_component_frame_codec():
+    comp = DummyComponent({"comp": {"queues": [], "routines": {}, "frame_codec": "none"}})
+    assert comp.frame_codec.name == "none"
+    assert comp.get_component_configuration()["comp"]["frame_codec"] == "none"
+    rout = DummyRoutine()
+    comp.register_routine(rout)
+    assert rout.frame_codec is comp.frame_codec
+
+
+def test_process_routine_with_shared_memory_queue():
+    comp = DummyComponent({})
+    comp.name = "comp"
+    assert comp.create_queue("que1", 1, between_processes=True)
+    assert isinstance(comp.queues["que1"], SharedMemoryQueue)
+    rout = DummyFrameProducerRoutine(out_queue=comp.queues["que1"], name="producer")
+    comp.register_routine(rout.as_process())
+    comp.run_comp()
+    try:
+        msg = comp.queues["que1"].get(timeout=5)
+        assert msg.get_payload().shape == (4, 4, 3)
+    finally:
+        assert comp.stop_run() == 0
+    assert comp.get_component_configuration()["comp"]["routines"]["producer"]["execution_mode"] == "process"
+
+
+def test_setup_component_with_latest_slot():
+    component_configuration = {
+        "comp": {
+            "shared_memory": False,
+            "queues": ["que1", {"name": "que2", "kind": "latest"}],
+            "routines": {},
+            "component_type_name": "DummyComponent"
+        }
+    }
+    comp = DummyComponent(component_configuration)
+    assert isinstance(comp.queues["que2"], LatestSlot)
+    assert not isinstance(comp.queues["que1"], LatestSlot)
+    assert comp.get_component_configuration() == component_configuration
+    assert not comp.create_queue("que3", kind="stack")
+
+
+def test_setup_component_with_queue_policies():
+    component_configuration = {
+        "comp": {
+            "shared_memory": False,
+            "queues": ["que1", {"name": "que2", "size": 3, "policy": "drop_oldest"}],
+            "routines": {},
+            "component_type_name": "DummyComponent"
+        }
+    }
+    comp = DummyComponent(component_configuration)
+    assert comp.queues["que2"].maxsize == 3
+    assert comp.queues["que2"].policy == "drop_oldest"
+    assert comp.get_component_configuration() == component_configuration
+    assert not comp.create_queue("que3", policy="drop_all")
+    comp.queues["que2"].put(1)
+    stats = comp.get_queue_stats()
+    assert stats["que2"]["enqueued"] == 1
+    assert stats["que1"]["enqueued"] == 0
+    assert list(comp.get_queue_stats("que2").keys()) == ["que2"]
+
+
+def wait_for(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+@pytest.fixture(scope="function")
+def running_component_with_source_and_sink():
+    component_configuration = {
+        "comp": {
+            "queues": ["frames", "other"],
+            "routines": {
+                "source": {"routine_type_name": "SyntheticFrameSource", "out_queue": "frames",
+                           "fps": 200, "width": 4, "height": 4},
+                "sink": {"routine_type_name": "CountingSink", "in_queue": "frames"}
+            }
+        }
+    }
+    comp = DummyComponent(component_configuration)
+    comp.run_comp()
+    yield comp
+    comp.stop_run()
+
+
+def test_replace_routine_of_running_component(running_component_with_source_and_sink):
+    comp = running_component_with_source_and_sink
+    old_sink = comp.get_routines()["sink"]
+    wait_for(lambda: old_sink.count > 0)
+    assert comp.replace_routine("sink", {"routine_type_name": "CountingSink", "in_queue": "frames"})
+    new_sink = comp.get_routines()["sink"]
+    assert new_sink is not old_sink
+    assert not old_sink.runner.is_alive()
+    wait_for(lambda: new_sink.count > 0)
+    assert comp.get_routines()["source"].runner.is_alive()
+
+
+def test_add_and_remove_routine_of_running_component(running_component_with_source_and_sink):
+    comp = running_component_with_source_and_sink
+    assert comp.add_routine("other_sink", {"routine_type_name": "CountingSink", "in_queue": "other"})
+    other_sink = comp.get_routines()["other_sink"]
+    assert other_sink.runner.is_alive()
+    assert comp.remove_routine("other_sink")
+    assert not other_sink.runner.is_alive()
+    assert "other_sink" not in comp.get_routines()
+    assert comp.get_routines()["sink"].runner.is_alive()
+
+
+def test_rewire_queue_of_running_component(running_component_with_source_and_sink):
+    comp = running_component_with_source_and_sink
+    assert comp.rewire_queue("source", "out_queue", "other")
+    assert comp.queues["other"].get(timeout=5).get_payload().shape == (4, 4, 3)
+    assert comp.get_component_configuration()["comp"]["routines"]["source"]["out_queue"] == "other"
+    assert not comp.rewire_queue("source", "fps", "other")
+
+
+def test_replace_process_routine_of_running_component():
+    source_configuration = {"routine_type_name": "SyntheticFrameSource", "out_queue": "frames",
+                            "fps": 200, "width": 4, "height": 4, "execution_mode": "process"}
+    comp = DummyComponent({"comp": {"queues": ["frames"], "routines": {"source": source_configuration}}})
+    comp.run_comp()
+    try:
+        old_source = comp.get_routines()["source"]
+        assert comp.queues["frames"].get(timeout=5) is not None
+        assert comp.replace_routine("source", dict(source_configuration, width=8))
+        assert not old_source.runner.is_alive()
+        wait_for(lambda: comp.queues["frames"].get(timeout=5).get_payload().shape == (4, 8, 3))
+    finally:
+        assert comp.stop_run() == 0
+
+
+def test_is_ready(running_component_with_source_and_sink):
+    comp = running_component_with_source_and_sink
+    wait_for(comp.is_ready)
+    assert all(routine.ready_event.is_set() for routine in comp.get_routines().values())
+
+
+def test_async_routines_of_component():
+    component_configuration = {
+        "comp": {
+            "queues": ["frames"],
+            "routines": {
+                "source": {"routine_type_name": "SyntheticFrameSource", "out_queue": "frames",
+                           "fps": 200, "width": 4, "height": 4, "execution_mode": "async"},
+                "sink": {"routine_type_name": "CountingSink", "in_queue": "frames", "execution_mode": "async"}
+            }
+        }
+    }
+    comp = DummyComponent(component_configuration)
+    comp.run_comp()
+    try:
+        sink = comp.get_routines()["sink"]
+        wait_for(lambda: sink.count > 0)
+        assert {routine.runner.ident for routine in comp.get_routines().values()} == {comp.async_runtime.ident}
+    finally:
+        comp.stop_run()
+    assert not any(routine.runner.is_alive() for routine in comp.get_routines().values())
+    assert comp.get_component_configuration()["comp"]["routines"]["sink"]["execution_mode"] == "async"
+
+
+def test_async_redis_routines_of_component(monkeypatch):
+    import pipert.core.message
+    # the threads that the messages are encoded and decoded on
+    coding_threads = set()
+
+    def record_thread(function):
+        def wrapper(*args):
+            coding_threads.add(threading.get_ident())
+            return function(*args)
+        return wrapper
+
+    for function_name in ("_binary_encode", "_binary_decode"):
+        monkeypatch.setattr(pipert.core.message, function_name,
+                            record_thread(getattr(pipert.core.message, function_name)))
+    redis_key = f"test_async_{os.getpid()}"
+    component_configuration = {
+        "comp": {
+            "queues": ["frames", "received"],
+            "routines": {
+                "source": {"routine_type_name": "SyntheticFrameSource", "out_queue": "frames",
+                           "fps": 100, "width": 4, "height": 4},
+                "to_redis": {"routine_type_name": "MessageToRedis", "message_queue": "frames",
+                             "redis_send_key": redis_key, "max_stream_length": 10, "execution_mode": "async"},
+                "from_redis": {"routine_type_name": "MessageFromRedis", "message_queue": "received",
+                               "redis_read_key": redis_key, "execution_mode": "async"},
+                "sink": {"routine_type_name": "CountingSink", "in_queue": "received"}
+            }
+        }
+    }
+    comp = DummyComponent(component_configuration)
+    comp.run_comp()
+    try:
+        sink = comp.get_routines()["sink"]
+        wait_for(lambda: sink.count > 0)
+        # the frames are encoded and decoded off the event loop
+        assert coding_threads and comp.async_runtime.ident not in coding_threads
+    finally:
+        comp.stop_run()
+        redis.Redis().delete(redis_key)
+
+
+def test_ready_callback_is_called_after_the_routines_setup():
+    component_configuration = {
+        "comp": {
+            "queues": ["frames"],
+            "routines": {
+                "source": {"routine_type_name": "SyntheticFrameSource", "out_queue": "frames",
+                           "fps": 200, "width": 4, "height": 4},
+                "sink": {"routine_type_name": "CountingSink", "in_queue": "frames"}
+            }
+        }
+    }
+    comp = DummyComponent(component_configuration)
+    ready_states = []
+    comp._ready_callback = lambda: ready_states.append(comp.is_ready())
+    comp.run_comp()
+    try:
+        wait_for(lambda: ready_states)
+        assert ready_states == [True]
+    finally:
+        comp.stop_run()
@@ -0,0 +1,50 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+# optional or heavy dependencies that the core modules import only when
+# they are used
+DEFERRED_MODULES = ("torch", "torchvision", "cv2", "redis", "gevent", "zerorpc", "importlib.metadata")
+# milliseconds that the modules of pipert may take to import themselves,
+# without their dependencies, which are measured with -X importtime
+PIPERT_IMPORT_TIME_BUDGET_MS = 150
+
+
+def get_import_times(statement):
+    """
+    Returns the self and cumulative import time (in microseconds) of every
+    module that the statement imports, in a new interpreter.
+    """
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    env.pop("TORCHVISION", None)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", statement], env=env,
+                            stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    import_times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, cumulative_time, module_name = line[len("import time:"):].split("|")
+        import_times[module_name.strip()] = (int(self_time), int(cumulative_time))
+    return import_times
+
+
+@pytest.mark.parametrize("module_name", ["pipert.core", "pipert.core.routine", "pipert.core.component",
+                                         "pipert.core.class_factory", "pipert.core.message"])
+def test_import_defers_heavy_modules(module_name):
+    import_times = get_import_times(f"import {module_name}")
+    assert module_name in import_times
+    assert [name for name in DEFERRED_MODULES if name in import_times] == []
+
+
+def test_import_time_budget():
+    import_times = get_import_times("import pipert.core.component")
+    pipert_time_ms = sum(self_time for name, (self_time, _) in import_times.items()
+                         if name.split(".")[0] == "pipert") / 1000
+    assert pipert_time_ms < PIPERT_IMPORT_TIME_BUDGET_MS
+
+
+def test_component_factory_imports_no_routine_dependencies():
+    import_times = get_import_times("import pipert.utils.scripts.component_factory")
+    assert [name for name in ("torch", "torchvision", "cv2", "redis") if name in import_times] == []
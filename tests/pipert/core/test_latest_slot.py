@@ -0,0 +1,68 @@
+import time
+from queue import Empty
+from threading import Timer
+
+import pytest
+
+from pipert.core.latest_slot import LatestSlot
+from pipert.core.utlis import QueueHandler, wait_for_any
+
+
+@pytest.fixture(scope="function")
+def slot():
+    return LatestSlot()
+
+
+def test_put_overwrites_and_counts_drops(slot):
+    slot.put(1)
+    slot.put(2)
+    slot.put(3)
+    assert slot.get(block=False) == 3
+    assert slot.dropped == 2
+    assert slot.sequence == 3
+
+
+def test_get_from_empty_slot(slot):
+    with pytest.raises(Empty):
+        slot.get(block=False)
+    slot.put(1)
+    slot.get(block=False)
+    with pytest.raises(Empty):
+        slot.get(timeout=0.01)
+
+
+def test_put_never_full(slot):
+    slot.put(1)
+    assert not slot.full()
+    slot.put(2, timeout=0)
+    assert slot.qsize() == 1
+    assert QueueHandler(slot).deque_non_blocking_put(3)
+    assert slot.get_nowait() == 3
+    assert slot.empty()
+
+
+def test_blocking_get_waits_for_put(slot):
+    Timer(0.05, slot.put, args=(1,)).start()
+    start = time.time()
+    assert slot.get(timeout=2) == 1
+    assert time.time() - start < 1
+
+
+def test_read_by_sequence(slot):
+    assert slot.read(0, timeout=0.01) is None
+    slot.put("a")
+    sequence, item = slot.read(0)
+    assert item == "a"
+    assert slot.read(sequence, timeout=0.01) is None
+    # reading doesn't take the item
+    assert slot.get(block=False) == "a"
+
+
+def test_wait_for_any_and_wake(slot):
+    assert not wait_for_any([slot], 0.01)
+    Timer(0.05, slot.wake_waiters).start()
+    start = time.time()
+    assert not wait_for_any([slot], 2)
+    assert time.time() - start < 1
+    slot.put(1)
+    assert wait_for_any([slot], 0.01)
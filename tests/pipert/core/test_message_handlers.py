@@ -1,5 +1,8 @@
+import asyncio
+import threading
+import time
 import pytest
-from pipert.core.message_handlers import RedisHandler
+from pipert.core.message_handlers import MessageHandler, RedisHandler, AsyncRedisHandler
 from urllib.parse import urlparse
 
 key = "Test"
@@ -53,3 +56,68 @@ def test_redis_read_most_recent_message_cannot_read_the_same_message(redis_handl
     redis_handler.send(key, "AAA")
     assert redis_handler.read_most_recent_msg(key).decode() == "AAA"
     assert redis_handler.read_most_recent_msg(key) is None
+
+
+def test_redis_send_many(redis_handler):
+    redis_handler.send_many(key, ["AAA", "BBB", "CCC"])
+    assert redis_handler.conn.xlen(key) == 3
+    assert redis_handler.receive(key).decode() == "CCC"
+
+
+def test_redis_read_batch_reads_last_message(redis_handler):
+    redis_handler.send_many(key, ["AAA", "BBB"])
+    assert [msg.decode() for msg in redis_handler.read_batch(key, 10)] == ["BBB"]
+
+
+def test_redis_read_batch(redis_handler):
+    redis_handler.send(key, "AAA")
+    assert redis_handler.read_batch(key, 10)[0].decode() == "AAA"
+    redis_handler.send_many(key, ["BBB", "CCC", "DDD"])
+    assert [msg.decode() for msg in redis_handler.read_batch(key, 2)] == ["BBB", "CCC"]
+    assert [msg.decode() for msg in redis_handler.read_batch(key, 2)] == ["DDD"]
+    assert redis_handler.read_batch(key, 2) == []
+
+
+def test_redis_read_batch_blocks_until_timeout(redis_handler):
+    redis_handler.send(key, "AAA")
+    redis_handler.read_batch(key, 10)
+    start = time.time()
+    assert redis_handler.read_batch(key, 10, block_ms=100) == []
+    assert time.time() - start >= 0.1
+
+
+def test_redis_read_most_recent_message_blocking(redis_handler):
+    redis_handler.send(key, "AAA")
+    assert redis_handler.read_most_recent_msg(key, block_ms=100).decode() == "AAA"
+    start = time.time()
+    assert redis_handler.read_most_recent_msg(key, block_ms=100) is None
+    assert time.time() - start >= 0.1
+
+
+def test_redis_read_most_recent_message_wakes_on_send(redis_handler):
+    redis_handler.send(key, "AAA")
+    redis_handler.read_most_recent_msg(key)
+    sender = threading.Timer(0.05, redis_handler.send, args=(key, "BBB"))
+    sender.start()
+    assert redis_handler.read_most_recent_msg(key, block_ms=2000).decode() == "BBB"
+    sender.join()
+
+
+def test_async_redis_handler(redis_handler):
+    async def send_and_read():
+        async_handler = AsyncRedisHandler(urlparse("redis://127.0.0.1:6379"))
+        await async_handler.connect()
+        try:
+            await async_handler.send(key, "AAA")
+            assert (await async_handler.read_most_recent_msg(key, block_ms=100)).decode() == "AAA"
+            assert await async_handler.read_most_recent_msg(key, block_ms=50) is None
+            await async_handler.send_many(key, ["BBB", "CCC"])
+            assert [msg.decode() for msg in await async_handler.read_batch(key, 10)] == ["BBB", "CCC"]
+            await async_handler.send(key, "DDD")
+            assert (await async_handler.read_next_msg(key)).decode() == "DDD"
+        finally:
+            await async_handler.close()
+
+    asyncio.run(send_and_read())
+    assert redis_handler.receive(key).decode() == "DDD"
+    assert isinstance(AsyncRedisHandler(None), MessageHandler)
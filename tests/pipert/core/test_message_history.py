@@ -0,0 +1,72 @@
+import pickle
+import threading
+import time
+from pipert.core.message_history import MessageHistory, to_wall_time
+
+
+def test_record_and_get():
+    history = MessageHistory()
+    assert history.get("comp", "entry") is None
+    history.record("comp", "entry", 1)
+    history.record("comp", "exit", 5)
+    history.record("comp", "entry", 3)
+    assert history.get("comp", "entry") == 3
+    assert history.get("comp", "exit") == 5
+    assert history.has("comp")
+    assert history.has("comp", "exit")
+    assert not history.has("other")
+    assert len(history) == 3
+    assert history.to_dict() == {"comp": {"entry": 3e-9, "exit": 5e-9}}
+
+
+def test_merge():
+    first = MessageHistory()
+    first.record("comp1", "entry", 1)
+    second = MessageHistory()
+    second.record("comp1", "entry", 1)
+    second.record("comp2", "entry", 2)
+    first.merge(second)
+    assert list(first) == [("comp1", "entry", 1), ("comp2", "entry", 2)]
+
+
+def test_merge_keeps_the_latest_timestamp_last():
+    first = MessageHistory()
+    first.record("comp", "entry", 5)
+    second = MessageHistory()
+    second.record("comp", "entry", 3)
+    second.record("comp", "exit", 7)
+    first.merge(second)
+    assert first.get("comp", "entry") == 5
+    assert first.get("comp", "exit") == 7
+    assert [timestamp for _, _, timestamp in first] == [3, 5, 7]
+
+
+def test_concurrent_records_keep_the_entries_aligned():
+    history = MessageHistory()
+
+    def record(section):
+        for timestamp in range(10000):
+            history.record("comp", section, timestamp)
+
+    threads = [threading.Thread(target=record, args=(section,)) for section in ("entry", "exit")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(history) == 20000
+    assert {section for _, section, _ in history} == {"entry", "exit"}
+
+
+def test_table_and_pickle():
+    history = MessageHistory()
+    history.record("comp1", "entry")
+    history.record("comp2", "custom")
+    names, entries = history.to_table()
+    assert names == ["comp1", "entry", "comp2", "custom"]
+    assert list(entries[:2]) == [0, 1]
+    assert MessageHistory.from_table(names, entries) == history
+    assert pickle.loads(pickle.dumps(history)) == history
+
+
+def test_to_wall_time():
+    assert abs(to_wall_time(time.time_ns()) - time.time()) < 0.1
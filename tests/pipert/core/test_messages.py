@@ -1,13 +1,16 @@
 import logging
 import time
 import numpy as np
+import pytest
+import struct
 import sys
 if sys.version_info.minor >= 8:
     from pipert.core.multiprocessing_shared_memory import MpSharedMemoryGenerator as smGen
 else:
     from pipert.core.shared_memory_generator import SharedMemoryGenerator as smGen
 from pipert.core.message import Message, FramePayload, message_encode, \
-    message_decode, PredictionPayload, FrameMetadataPayload
+    message_decode, PredictionPayload, FrameMetadataPayload, BINARY_MAGIC
+from pipert.core.message_history import to_wall_time
 
 
 class DummyMessage(Message):
@@ -64,18 +67,38 @@ def test_get_end_to_end_latency():
     msg = create_msg()
     logger = logging.getLogger('vidcap')
     logger.addHandler(logging.NullHandler())
-    msg.record_entry("VideoCapture", logger)
-    assert msg.get_latency("VideoCapture") is None
-    msg.record_exit("VideoCapture", logger)
-    assert msg.get_end_to_end_latency("FlaskVideoDisplay") is None
-    msg.record_entry("FlaskVideoDisplay", logger)
-    msg.record_exit("FlaskVideoDisplay", logger)
+    msg.record_entry("Camera", logger)
+    assert msg.get_latency("Camera") is None
+    msg.record_exit("Camera", logger)
+    assert not msg.reached_exit
+    assert msg.get_end_to_end_latency("Display") is None
+    msg.record_entry("Display", logger)
+    time.sleep(0.01)
+    msg.record_exit("Display", logger, pipeline_exit=True)
     assert msg.reached_exit
-    latency = msg.get_end_to_end_latency("FlaskVideoDisplay")
-    assert latency is not None
+    latency = msg.get_end_to_end_latency("Display")
+    assert latency >= 0.01
     assert not msg.is_empty()
 
 
+def test_end_to_end_latency_across_processes(monkeypatch):
+    # the monotonic clocks of two processes (or hosts) don't share an epoch
+    monotonic_ns = time.monotonic_ns
+    logger = logging.getLogger('test')
+    logger.addHandler(logging.NullHandler())
+    monkeypatch.setattr(time, "monotonic_ns", lambda: monotonic_ns() - 10 ** 15)
+    msg = create_msg()
+    msg.record_entry("Camera", logger)
+    msg.record_exit("Camera", logger)
+    for binary in (False, True):
+        monkeypatch.setattr(time, "monotonic_ns", lambda: monotonic_ns() + 10 ** 15)
+        decoded_msg = message_decode(message_encode(msg, binary=binary), allow_pickle=True)
+        decoded_msg.record_entry("Display", logger)
+        decoded_msg.record_exit("Display", logger, pipeline_exit=True)
+        assert 0 <= decoded_msg.get_end_to_end_latency("Display") < 1
+        assert abs(to_wall_time(decoded_msg.history.get("Camera", "entry")) - time.time()) < 1
+
+
 def test_message_encode_shared_memory():
     generator = DummyGenerator()
     msg = create_msg()
@@ -109,3 +132,110 @@ def test_prediction_payload_decode_encode():
     decoded_message = message_decode(encoded_message)
     decoded_message_data = decoded_message.get_payload()
     assert preds == decoded_message_data
+
+
+def test_message_decode_shared_memory_zero_copy():
+    generator = DummyGenerator()
+    img = (np.random.rand(480, 640, 3) * 255).astype(np.uint8)
+    msg = DummyMessage(img, "localhost")
+    encoded_msg = message_encode(msg, generator)
+    decoded_msg = message_decode(encoded_msg, zero_copy=True)
+    frame = decoded_msg.get_payload()
+    assert (frame == img).all()
+    assert not frame.flags.writeable
+    del frame
+    decoded_msg.payload.release()
+    assert decoded_msg.payload._shared_memory is None
+    generator.cleanup()
+
+
+def test_message_decode_shared_memory_copy():
+    generator = DummyGenerator()
+    img = (np.random.rand(480, 640, 3) * 255).astype(np.uint8)
+    msg = DummyMessage(img, "localhost")
+    decoded_msg = message_decode(message_encode(msg, generator))
+    frame = decoded_msg.get_payload()
+    assert (frame == img).all()
+    assert frame.flags.writeable
+    assert decoded_msg.payload._shared_memory is None
+    generator.cleanup()
+
+
+def test_message_decode_shared_memory_overwritten():
+    generator = DummyGenerator()
+    img = (np.random.rand(48, 64, 3) * 255).astype(np.uint8)
+    encoded_msg = message_encode(DummyMessage(img, "localhost"), generator)
+    for _ in range(generator.max_count):
+        message_encode(DummyMessage(img, "localhost"), generator)
+    decoded_msg = message_decode(encoded_msg)
+    assert decoded_msg.get_payload() is None
+    generator.cleanup()
+
+
+def test_message_binary_encode():
+    img = (np.random.rand(48, 64, 3) * 255).astype(np.uint8)
+    msg = DummyMessage(img, 0)
+    logger = logging.getLogger('test')
+    msg.record_entry("test", logger)
+    encoded_msg = message_encode(msg, binary=True)
+    assert encoded_msg.startswith(BINARY_MAGIC)
+    decoded_msg = message_decode(encoded_msg)
+    assert decoded_msg.id == msg.id
+    assert decoded_msg.source_address == 0
+    assert decoded_msg.history == msg.history
+    assert isinstance(decoded_msg.payload, FramePayload)
+    frame = decoded_msg.get_payload()
+    assert frame.dtype == img.dtype
+    assert (frame == img).all()
+    # the frame is a view on the encoded message
+    assert not frame.flags.writeable
+    # the header is little endian: the frame size follows the magic, four
+    # single byte fields and the shared memory sequence
+    assert struct.unpack_from("<Q", encoded_msg, 16)[0] == img.nbytes
+
+
+def test_message_binary_encode_shared_memory():
+    generator = DummyGenerator()
+    img = np.random.rand(48, 64)
+    msg = DummyMessage(img, "localhost")
+    decoded_msg = message_decode(message_encode(msg, generator, binary=True))
+    assert (decoded_msg.get_payload() == img).all()
+    generator.cleanup()
+
+
+def test_message_binary_encode_other_payloads():
+    img = np.random.rand(48, 64)
+    msg = Message((img, {"id": 2}), "localhost")
+    decoded_msg = message_decode(message_encode(msg, binary=True), lazy=True)
+    assert isinstance(decoded_msg.payload, FrameMetadataPayload)
+    frame, metadata = decoded_msg.get_payload()
+    assert metadata == {"id": 2}
+    assert (frame == img).all()
+
+    msg = Message({"test": 1}, "localhost")
+    decoded_msg = message_decode(message_encode(msg, binary=True))
+    assert isinstance(decoded_msg.payload, PredictionPayload)
+    assert decoded_msg.get_payload() == {"test": 1}
+
+
+def test_message_binary_lazy_decode_can_be_pickled():
+    img = np.random.rand(48, 64)
+    decoded_msg = message_decode(message_encode(DummyMessage(img, "localhost"), binary=True), lazy=True)
+    assert (message_decode(message_encode(decoded_msg, binary=False), allow_pickle=True).get_payload() == img).all()
+
+
+def test_message_decode_refuses_pickle_by_default():
+    encoded_msg = message_encode(create_msg(), binary=False)
+    with pytest.raises(ValueError):
+        message_decode(encoded_msg)
+    assert message_decode(encoded_msg, allow_pickle=True).get_payload().shape == (576, 720, 3)
+
+
+def test_message_binary_encode_does_not_pickle():
+    predictions = ({"boxes": np.ones((2, 4), dtype=np.float32), "labels": ("a", "b")}, {1: b"x"})
+    encoded_msg = message_encode(Message({"data": predictions}, "localhost"))
+    assert b"numpy" not in encoded_msg
+    metadata, extra = message_decode(encoded_msg).get_payload()["data"]
+    assert metadata["labels"] == ("a", "b")
+    assert metadata["boxes"].dtype == np.float32 and (metadata["boxes"] == 1).all()
+    assert extra == {1: b"x"}
@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+from pipert.core.metrics_aggregator import ExecutionTimeStats, RoutineMetrics, MetricsFlusher, \
+    EXECUTION_TIME_BUCKETS
+from pipert.core.metrics_collector import MetricsCollector
+from multiprocessing import Event
+from tests.pipert.core.utils.routines.dummy_routines import DummyRoutine
+
+
+class RecordingCollector(MetricsCollector):
+    def __init__(self):
+        super().__init__()
+        self.execution_times = []
+
+    def setup(self):
+        pass
+
+    def collect_execution_time(self, execution_time, routine_name, component_name):
+        self.execution_times.append((execution_time, routine_name, component_name))
+
+    def collect_latency(self, latency, output_component):
+        pass
+
+
+def test_execution_time_stats():
+    stats = ExecutionTimeStats()
+    stats.add(50000)
+    stats.add(100000)
+    stats.add(3000000)
+    stats.add(10 ** 10)
+    assert stats.count == 4
+    assert stats.max_ns == 10 ** 10
+    assert stats.counts[0] == 2
+    assert stats.counts[EXECUTION_TIME_BUCKETS.index(0.005)] == 1
+    assert stats.counts[-1] == 1
+    assert stats.to_dict()["sum"] == pytest.approx(10.00315)
+
+
+def test_flush_collects_the_mean_time_by_default():
+    collector = RecordingCollector()
+    metrics = RoutineMetrics("rout", "comp", collector)
+    metrics.execution_times.add(1500000)
+    metrics.flush()
+    assert collector.execution_times == [(0.0015, "rout", "comp")]
+    metrics.execution_times.add(1500000)
+    metrics.execution_times.add(10 ** 10)
+    metrics.flush()
+    assert collector.execution_times[1:] == [(pytest.approx(5.00075), "rout", "comp")]
+    metrics.flush()
+    assert len(collector.execution_times) == 2
+
+
+def test_flusher_flushes_in_background():
+    collector = RecordingCollector()
+    flusher = MetricsFlusher(interval=0.01)
+    metrics = RoutineMetrics("rout", "comp", collector)
+    flusher.register(metrics)
+    metrics.execution_times.add(1000)
+    time.sleep(0.1)
+    assert len(collector.execution_times) == 1
+    metrics.execution_times.add(1000)
+    flusher.unregister(metrics)
+    assert len(collector.execution_times) == 2
+
+
+class StatsRecordingCollector(RecordingCollector):
+
+    def __init__(self):
+        super().__init__()
+        self.count = 0
+
+    def collect_execution_time_stats(self, execution_times, routine_name, component_name):
+        self.count += execution_times.count
+
+
+def test_routine_flushes_metrics_when_it_stops():
+    collector = StatsRecordingCollector()
+    routine = DummyRoutine()
+    routine.metrics_collector = collector
+    routine.stop_event = Event()
+    routine.as_thread()
+    routine.start()
+    time.sleep(0.05)
+    routine.stop_event.set()
+    routine.runner.join()
+    assert collector.count == routine.state.success > 0
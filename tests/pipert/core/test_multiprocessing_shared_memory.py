@@ -27,10 +27,42 @@ def test_get_next_shared_memory():
 def test_max_count():
     generator = DummySharedMemoryGenerator()
     first_memory = generator.get_next_shared_memory()
-    for _ in range(generator.max_count):
+    for _ in range(generator.max_count - 1):
         generator.get_next_shared_memory()
 
-    assert first_memory.name not in generator.shared_memories
+    assert len(generator.shared_memories) == generator.max_count
+    assert generator.get_next_shared_memory() is first_memory
+    assert len(generator.shared_memories) == generator.max_count
+    generator.cleanup()
+
+
+def test_release_last_shared_memory():
+    generator = DummySharedMemoryGenerator()
+    first_memory = generator.get_next_shared_memory()
+    generator.release_last_shared_memory()
+    assert generator.get_next_shared_memory() is first_memory
+    assert generator.get_next_shared_memory().name == "dummy_component_1"
+    generator.cleanup()
+
+
+def test_resize_memory():
+    generator = DummySharedMemoryGenerator()
+    for _ in range(generator.max_count):
+        generator.get_next_shared_memory(size=3)
+    memory = generator.get_next_shared_memory(size=6)
+    assert memory.name == "dummy_component_0"
+    assert memory.size >= 6 + sm.HEADER_SIZE
+    assert generator.memory_sizes["dummy_component_0"] == 6
+    generator.cleanup()
+
+
+def test_sequence_number():
+    generator = DummySharedMemoryGenerator()
+    first_memory = generator.get_next_shared_memory(size=3)
+    first_sequence = sm.read_sequence(first_memory)
+    for _ in range(generator.max_count):
+        generator.get_next_shared_memory(size=3)
+    assert sm.read_sequence(first_memory) != first_sequence
     generator.cleanup()
 
 
@@ -38,6 +70,7 @@ def test_write_and_read_from_memory():
     generator = DummySharedMemoryGenerator()
     memory_name = generator.get_next_shared_memory(size=3).name
     memory = sm.get_shared_memory_object(memory_name)
-    memory.buf[:] = b"AAA"
-    assert bytes(memory.buf) == b"AAA"
+    memory.buf[sm.HEADER_SIZE:sm.HEADER_SIZE + 3] = b"AAA"
+    assert bytes(memory.buf[sm.HEADER_SIZE:sm.HEADER_SIZE + 3]) == b"AAA"
+    memory.close()
     generator.cleanup()
@@ -1,10 +1,13 @@
 from unittest.mock import MagicMock
+import os
+import uuid
 import pytest
 import logging
 
 from pipert.core.component import BaseComponent
 from tests.pipert.core.utils.routines.dummy_routines import DummyRoutineWithQueue, DummyRoutine
 from pipert.core.pipeline_manager import PipelineManager
+from pipert.contrib.routines.counting_sink import CountingSink
 import zerorpc
 import gevent
 
@@ -184,3 +187,105 @@ def test_get_pipeline_creation(pipeline_manager_with_component_and_queue_and_rou
     }
 
     assert EXPECTED_PIPELINE_DICTIONARY == pipeline_manager_with_component_and_queue_and_routine.get_pipeline_creation()
+
+
+def test_get_queue_stats_of_component(pipeline_manager_with_component_and_queue):
+    response = pipeline_manager_with_component_and_queue.get_queue_stats_of_component(
+        component_name="comp", queue_name="queue1")
+    assert response["Succeeded"], response["Message"]
+    assert response["Message"]["queue1"]["enqueued"] == 0
+    response = pipeline_manager_with_component_and_queue.get_queue_stats_of_component(
+        component_name="comp", queue_name="queue2")
+    assert not response["Succeeded"]
+
+
+def test_profile_component(pipeline_manager_with_component):
+    response = pipeline_manager_with_component.profile_component(
+        component_name="comp", duration=0.01)
+    assert response["Succeeded"], response["Message"]
+    assert response["Message"]["routines"] == []
+    response = pipeline_manager_with_component.profile_component(
+        component_name="comp", duration=0.01, routine_name="rout")
+    assert not response["Succeeded"]
+
+
+def test_live_changes_to_running_component(pipeline_manager):
+    pipeline_manager._get_routine_class_object_by_type_name = MagicMock(return_value=CountingSink)
+    pipeline_manager.components["comp"] = BaseComponent(
+        {"comp": {"queues": ["frames", "other"], "routines": {}}})
+    pipeline_manager.run_component(component_name="comp")
+    try:
+        response = pipeline_manager.add_routine_to_component(
+            component_name="comp", routine_type_name="CountingSink", in_queue="frames", name="sink")
+        assert response["Succeeded"], response["Message"]
+        assert pipeline_manager.components["comp"].get_routines()["sink"].runner.is_alive()
+
+        response = pipeline_manager.rewire_queue_in_component(
+            component_name="comp", routine_name="sink", parameter_name="in_queue", queue_name="other")
+        assert response["Succeeded"], response["Message"]
+        response = pipeline_manager.rewire_queue_in_component(
+            component_name="comp", routine_name="sink", parameter_name="in_queue", queue_name="missing")
+        assert not response["Succeeded"]
+
+        response = pipeline_manager.replace_routine_in_component(
+            component_name="comp", routine_name="sink", routine_type_name="CountingSink", in_queue="frames")
+        assert response["Succeeded"], response["Message"]
+        response = pipeline_manager.replace_routine_in_component(
+            component_name="comp", routine_name="missing", routine_type_name="CountingSink", in_queue="frames")
+        assert not response["Succeeded"]
+
+        response = pipeline_manager.remove_routine_from_component(component_name="comp", routine_name="sink")
+        assert response["Succeeded"], response["Message"]
+        assert pipeline_manager.components["comp"].get_routines() == {}
+    finally:
+        pipeline_manager.stop_component(component_name="comp")
+
+
+def test_wait_until_ready_of_spawned_components(pipeline_manager, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", os.getcwd())
+    component_names = [f"ready_{uuid.uuid4().hex[:8]}" for _ in range(2)]
+    components = {"components": {component_name: {"queues": [], "routines": {}}
+                                 for component_name in component_names}}
+    try:
+        response = pipeline_manager.setup_components(components)
+        assert response["Succeeded"], response["Message"]
+        response = pipeline_manager.wait_until_ready(timeout=60)
+        assert response["Succeeded"], response["Message"]
+        assert set(response["Message"]) == set(component_names)
+        assert all(startup_time > 0 for startup_time in response["Message"].values())
+    finally:
+        for component_name in component_names:
+            process = pipeline_manager.component_processes.get(component_name)
+            if process is not None:
+                process.kill()
+                process.wait()
+            config_path = f"pipert/utils/config_files/{component_name}.yaml"
+            if os.path.exists(config_path):
+                os.remove(config_path)
+
+
+def test_wait_until_ready_of_component_that_exited(pipeline_manager):
+    pipeline_manager._spawn_component("comp", ["python3", "-c", "pass"])
+    pipeline_manager.components["comp"] = zerorpc.Client()
+    response = pipeline_manager.wait_until_ready(timeout=10)
+    assert not response["Succeeded"]
+    assert "comp" in response["Message"]
+
+
+def test_setup_components_from_zygote(pipeline_manager, monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", os.getcwd())
+    response = pipeline_manager.start_zygote(preload_modules=["numpy"])
+    assert response["Succeeded"], response["Message"]
+    component_name = f"zygote_{uuid.uuid4().hex[:8]}"
+    try:
+        response = pipeline_manager.setup_components({"components": {component_name: {"queues": [], "routines": {}}}})
+        assert response["Succeeded"], response["Message"]
+        response = pipeline_manager.wait_until_ready(timeout=60)
+        assert response["Succeeded"], response["Message"]
+        assert pipeline_manager.component_processes[component_name].pid is not None
+    finally:
+        pipeline_manager.stop_zygote()
+        process = pipeline_manager.component_processes.get(component_name)
+        if process is not None:
+            process.kill()
+        os.remove(f"pipert/utils/config_files/{component_name}.yaml")
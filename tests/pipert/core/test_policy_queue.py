@@ -0,0 +1,55 @@
+from queue import Empty, Full
+
+import pytest
+
+from pipert.core.policy_queue import PolicyQueue, TIME_IN_QUEUE_BUCKETS_MS
+
+
+def test_block_policy():
+    q = PolicyQueue(maxsize=2)
+    q.put(1)
+    q.put(2)
+    with pytest.raises(Full):
+        q.put(3, block=False)
+    assert q.get() == 1
+    assert q.get() == 2
+    with pytest.raises(Empty):
+        q.get(block=False)
+
+
+def test_drop_oldest_policy():
+    q = PolicyQueue(maxsize=2, policy="drop_oldest")
+    for i in range(5):
+        q.put(i, block=False)
+    assert [q.get(), q.get()] == [3, 4]
+    assert q.dropped == 3
+
+
+def test_drop_newest_policy():
+    q = PolicyQueue(maxsize=2, policy="drop_newest")
+    for i in range(5):
+        q.put(i, block=False)
+    assert [q.get(), q.get()] == [0, 1]
+    assert q.dropped == 3
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        PolicyQueue(policy="drop_all")
+
+
+def test_stats():
+    q = PolicyQueue(maxsize=3, policy="drop_oldest")
+    for i in range(4):
+        q.put(i)
+    q.get()
+    stats = q.get_stats()
+    assert stats["enqueued"] == 4
+    assert stats["dropped"] == 1
+    assert stats["high_water_mark"] == 3
+    assert stats["length"] == 2
+    assert stats["time_in_queue_ms"]["buckets"] == list(TIME_IN_QUEUE_BUCKETS_MS)
+    assert sum(stats["time_in_queue_ms"]["counts"]) == 1
+    q.reset_stats()
+    assert q.get_stats()["enqueued"] == 0
+    assert q.get_stats()["high_water_mark"] == 2
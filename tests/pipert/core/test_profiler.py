@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from pipert.core.errors import RoutineDoesNotExist
+from pipert.core.profiler import StackSampler, profile_threads
+from tests.pipert.core.utils.component.dummy_component import DummyComponent
+from tests.pipert.core.utils.routines.dummy_routines import DummyRoutine
+
+
+def busy_function(stop_event):
+    while not stop_event.is_set():
+        sum(range(100))
+
+
+def test_stack_sampler_collapses_stacks():
+    stop_event = threading.Event()
+    thread = threading.Thread(target=busy_function, args=(stop_event,))
+    thread.start()
+    try:
+        sampler = StackSampler({thread.ident: "busy"})
+        for _ in range(5):
+            sampler.sample()
+    finally:
+        stop_event.set()
+        thread.join()
+    assert sampler.samples == 5
+    lines = sampler.collapsed_stacks().splitlines()
+    assert sum(int(line.rsplit(" ", 1)[1]) for line in lines) == 5
+    assert all(line.startswith("busy;") for line in lines)
+    assert all("busy_function (test_profiler.py:" in line for line in lines)
+
+
+def test_profile_threads_samples_for_the_duration():
+    sampler = profile_threads({threading.get_ident(): "main"}, 0.05, interval=0.005)
+    assert sampler.samples > 0
+    assert "test_profile_threads_samples_for_the_duration" in sampler.collapsed_stacks()
+
+
+def test_component_start_profiling():
+    comp = DummyComponent({})
+    comp.name = "comp"
+    comp.register_routine(DummyRoutine(name="rout").as_thread())
+    comp.run_comp()
+    try:
+        profile = comp.start_profiling(0.1, interval=0.005)
+    finally:
+        comp.stop_run()
+    assert profile["routines"] == ["rout"]
+    assert profile["skipped_routines"] == []
+    assert profile["samples"] > 0
+    assert profile["collapsed_stacks"].startswith("rout;")
+    assert "_extended_run (routine.py:" in profile["collapsed_stacks"]
+    with pytest.raises(RoutineDoesNotExist):
+        comp.start_profiling(0.1, routine="missing")
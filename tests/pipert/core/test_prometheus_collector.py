@@ -0,0 +1,27 @@
+import pytest
+
+from pipert.core.metrics_aggregator import ExecutionTimeStats
+
+prometheus_client = pytest.importorskip("prometheus_client")
+
+
+def test_execution_time_stats_are_added_to_the_histogram():
+    from pipert.contrib.metrics_collectors.prometheus_collector import PrometheusCollector
+    collector = PrometheusCollector(0)
+    stats = ExecutionTimeStats()
+    for execution_time_ns in (50_000, 150_000, 150_000, 3_000_000):
+        stats.add(execution_time_ns)
+    collector.collect_execution_time_stats(stats, "routine", "stats_comp")
+    collector.collect_execution_time(10, "routine", "stats_comp")
+
+    def sample(suffix, **labels):
+        return prometheus_client.REGISTRY.get_sample_value(
+            "routine_processing_seconds" + suffix, {"routine": "routine", "component": "stats_comp", **labels})
+
+    assert sample("_bucket", le="0.0001") == 1
+    assert sample("_bucket", le="0.0002") == 3
+    assert sample("_bucket", le="0.005") == 4
+    assert sample("_bucket", le="5.0") == 4
+    assert sample("_bucket", le="+Inf") == 5
+    assert sample("_count") == 5
+    assert sample("_sum") == pytest.approx(10.00335)
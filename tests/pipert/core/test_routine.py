@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 import pytest
@@ -9,9 +10,15 @@ if os.environ.get('TORCHVISION', 'no') == 'yes':
 else:
     from multiprocessing import Event
 from pipert.core.routine import Events
+from pipert.core.async_runtime import AsyncRuntime
 from pipert.core.errors import NoRunnerException
+from pipert.core.latest_slot import LatestSlot
+from pipert.core.policy_queue import PolicyQueue
+from pipert.core.utlis import wait_for_any, async_wait_for_any, wake_waiters
 from tests.pipert.core.utils.routines.dummy_routines import DummySleepRoutine, \
-    DummyRoutine, dummy_before_stop_handler, DummyCrashingRoutine
+    DummyRoutine, dummy_before_stop_handler, DummyCrashingRoutine, DummyConsumerRoutine
+from queue import Queue
+from threading import Thread, Timer
 
 
 def dummy_before_handler(routine):
@@ -176,3 +183,122 @@ def test_setup_not_existing_extension():
     }
     r = DummyRoutine(extensions=extension)
     assert len(r._event_handlers) == 0
+
+
+def test_routine_waits_for_input():
+    q = Queue(maxsize=1)
+    r = DummyConsumerRoutine(q)
+    r.stop_event = Event()
+    r.as_thread()
+    r.start()
+    time.sleep(0.2)
+    assert r.state.count == 0
+    q.put(1)
+    time.sleep(0.05)
+    r.stop_event.set()
+    r.runner.join()
+    assert r.items == [1]
+    assert r.state.count == 1
+
+
+def test_routine_as_async():
+    runtime = AsyncRuntime()
+    q = Queue(maxsize=1)
+    r = DummyConsumerRoutine(q)
+    r.stop_event = Event()
+    r.as_async(runtime)
+    r.start()
+    assert r.ready_event.wait(5)
+    q.put(1)
+    deadline = time.monotonic() + 5
+    while r.state.count == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    r.stop_event.set()
+    r.runner.join(5)
+    assert not r.runner.is_alive()
+    assert r.items == [1]
+    assert r.state.count == 1
+
+
+def test_async_routines_share_the_event_loop():
+    runtime = AsyncRuntime(executor_workers=1)
+    stop_event = Event()
+    routines = [DummyConsumerRoutine(Queue(maxsize=1), name=f"consumer_{i}") for i in range(3)]
+    for i, r in enumerate(routines):
+        r.stop_event = stop_event
+        r.as_async(runtime)
+        r.start()
+        r.in_queue.put(i)
+    deadline = time.monotonic() + 5
+    while any(not r.items for r in routines) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stop_event.set()
+    for r in routines:
+        r.runner.join(5)
+    assert [r.items for r in routines] == [[0], [1], [2]]
+    assert len({r.runner.ident for r in routines}) == 1
+
+
+def test_wait_for_any():
+    queues = [Queue(maxsize=1), Queue(maxsize=1)]
+    start = time.time()
+    assert not wait_for_any(queues, 0.05)
+    assert time.time() - start >= 0.05
+    queues[1].put(1)
+    assert wait_for_any(queues, 1)
+    assert queues[1].get(block=False) == 1
+
+
+def test_wait_for_any_of_listened_queues():
+    queues = [PolicyQueue(maxsize=1), LatestSlot()]
+    assert not wait_for_any(queues, 0.01)
+    Timer(0.05, queues[1].put, args=(1,)).start()
+    start = time.time()
+    assert wait_for_any(queues, 2)
+    assert time.time() - start < 1
+    assert queues[1].get(block=False) == 1
+    assert queues[0].listeners._events == queues[1].listeners._events == ()
+
+
+def test_wake_waiters_of_listened_queues_on_stop():
+    queues = [PolicyQueue(maxsize=1), PolicyQueue(maxsize=1)]
+    e = Event()
+    waiter = Thread(target=wait_for_any, args=(queues, 5, e))
+    waiter.start()
+    time.sleep(0.05)
+    start = time.time()
+    e.set()
+    wake_waiters(queues[0])
+    waiter.join()
+    assert time.time() - start < 1
+
+
+def test_async_wait_for_any():
+    queues = [PolicyQueue(maxsize=1), LatestSlot()]
+
+    async def wait(queues, timeout):
+        start = time.time()
+        return await async_wait_for_any(queues, timeout), time.time() - start
+
+    assert asyncio.run(wait(queues, 0.01))[0] is False
+    Timer(0.05, queues[0].put, args=(1,)).start()
+    has_item, waited = asyncio.run(wait(queues, 2))
+    assert has_item and waited < 1
+    # queues without listeners are waited on by the executor
+    plain_queues = [Queue(maxsize=1), Queue(maxsize=1)]
+    Timer(0.05, plain_queues[1].put, args=(1,)).start()
+    has_item, waited = asyncio.run(wait(plain_queues, 2))
+    assert has_item and waited < 1
+
+
+def test_wake_waiters_on_stop():
+    q = Queue(maxsize=1)
+    e = Event()
+    waiter = Thread(target=wait_for_any, args=([q], 5, e))
+    waiter.start()
+    time.sleep(0.05)
+    start = time.time()
+    e.set()
+    wake_waiters(q)
+    waiter.join()
+    assert time.time() - start < 1
@@ -1,5 +1,9 @@
+import numpy as np
+import pytest
 import pipert.core.shared_memory_generator as sm
 from pipert.core.shared_memory_generator import get_shared_memory_object
+import pipert.core.shared_memory
+from pipert.core.shared_memory import TornReadError, VERSION_HEADER, FRAME_HEADER
 
 
 class DummySharedMemoryGenerator(sm.SharedMemoryGenerator):
@@ -46,3 +50,73 @@ def test_write_and_read_from_memory():
     memory.release_semaphore()
     assert data == b"AAA"
     generator.cleanup()
+
+
+def test_write_and_read_frame():
+    generator = DummySharedMemoryGenerator()
+    memory = get_shared_memory_object(generator.get_next_shared_memory_name())
+    frame = (np.random.rand(48, 64, 3) * 255).astype(np.uint8)
+    version = memory.write_frame(frame)
+    read_frame, read_version = memory.read_frame()
+    assert read_version == version
+    assert read_frame.dtype == frame.dtype
+    assert (read_frame == frame).all()
+    assert memory.write_frame(frame) != version
+    generator.cleanup()
+
+
+def test_read_frame_view():
+    generator = DummySharedMemoryGenerator()
+    memory = get_shared_memory_object(generator.get_next_shared_memory_name())
+    frame = np.arange(12, dtype=np.float32).reshape(3, 4)
+    memory.write_frame(frame)
+    view, version = memory.read_frame(copy=False)
+    assert (view == frame).all()
+    assert not view.flags.writeable
+    memory.write_frame(frame + 1)
+    assert not memory.is_version(version)
+    del view
+    generator.cleanup()
+
+
+def test_read_frame_during_write():
+    generator = DummySharedMemoryGenerator()
+    memory = get_shared_memory_object(generator.get_next_shared_memory_name())
+    memory.write_frame(np.zeros(3))
+    VERSION_HEADER.pack_into(memory.mapfile, 0, memory.read_version() + 1)
+    with pytest.raises(TornReadError):
+        memory.read_frame(retries=3)
+    generator.cleanup()
+
+
+class TornHeader:
+    """
+    Reads the frame header as if a writer changed it in the middle of the
+    first 'torn_reads' reads.
+    """
+    def __init__(self, torn_reads):
+        self.torn_reads = torn_reads
+
+    def unpack_from(self, buffer, offset=0):
+        version, size, dtype, ndim, *shape = FRAME_HEADER.unpack_from(buffer, offset)
+        if self.torn_reads:
+            self.torn_reads -= 1
+            return (version, size, b"\xff\x00garbage", ndim, *[2 ** 40] * len(shape))
+        return (version, size, dtype, ndim, *shape)
+
+
+@pytest.mark.parametrize("torn_reads", [1, 3])
+def test_read_frame_with_torn_header(monkeypatch, torn_reads):
+    generator = DummySharedMemoryGenerator()
+    memory = get_shared_memory_object(generator.get_next_shared_memory_name())
+    frame = np.arange(12, dtype=np.float32).reshape(3, 4)
+    memory.write_frame(frame)
+    monkeypatch.setattr(pipert.core.shared_memory, "FRAME_HEADER", TornHeader(torn_reads))
+    try:
+        if torn_reads < 3:
+            assert (memory.read_frame(retries=3)[0] == frame).all()
+        else:
+            with pytest.raises(TornReadError):
+                memory.read_frame(retries=3)
+    finally:
+        generator.cleanup()
@@ -0,0 +1,100 @@
+import multiprocessing as mp
+import time
+from queue import Empty, Full
+from threading import Timer
+
+import numpy as np
+import pytest
+
+from pipert.core import tracing
+from pipert.core.message import Message
+from pipert.core.shared_memory_queue import SharedMemoryQueue
+
+
+@pytest.fixture(scope="function")
+def shared_queue():
+    q = SharedMemoryQueue(maxsize=2, name="test_shared_queue")
+    yield q
+    q.close()
+
+
+def _put_frames(q, count):
+    for i in range(count):
+        q.put(Message(np.full((8, 8, 3), i, dtype=np.uint8), "child"))
+
+
+def test_put_and_get_frame_message(shared_queue):
+    frame = np.random.randint(0, 256, (16, 16, 3), dtype=np.uint8)
+    msg = Message(frame, "source")
+    shared_queue.put(msg)
+    received = shared_queue.get(timeout=1)
+    assert np.array_equal(received.get_payload(), frame)
+    assert received.id == msg.id
+    # the message that was put is left as it was
+    assert not msg.payload.encoded
+    assert msg.get_payload() is frame
+
+
+def test_put_and_get_other_items(shared_queue):
+    shared_queue.put({"a": 1})
+    assert shared_queue.get(timeout=1) == {"a": 1}
+
+
+def test_full_and_empty(shared_queue):
+    with pytest.raises(Empty):
+        shared_queue.get(block=False)
+    shared_queue.put(Message(np.zeros((4, 4)), "source"))
+    shared_queue.put(Message(np.ones((4, 4)), "source"))
+    with pytest.raises(Full):
+        shared_queue.put(Message(np.ones((4, 4)), "source"), block=False)
+    assert np.array_equal(shared_queue.get(timeout=1).get_payload(), np.zeros((4, 4)))
+    assert np.array_equal(shared_queue.get(timeout=1).get_payload(), np.ones((4, 4)))
+
+
+def test_full_put_leaves_the_message_alone(shared_queue):
+    stage = tracing.stage_name("Camera", "capture")
+    msgs = [Message(np.full((4, 4), i), "source") for i in range(3)]
+    try:
+        tracing.enter_stage(stage)
+        shared_queue.put(msgs[0])
+        shared_queue.put(msgs[1])
+        with pytest.raises(Full):
+            shared_queue.put(msgs[2], block=False)
+    finally:
+        tracing.exit_stage()
+    assert all(len(msg.history) == 0 for msg in msgs)
+    assert shared_queue.get(timeout=1).history.has(stage, tracing.ENQUEUED)
+    # the memory of the message that didn't fit is the next one to be used
+    assert shared_queue._generator.memory_id_gen.name_count == 2
+
+
+def test_wait_for_item(shared_queue):
+    assert not shared_queue.wait_for_item(0.01)
+    shared_queue.put(1)
+    assert shared_queue.wait_for_item(1)
+    assert shared_queue.get(timeout=1) == 1
+    assert not shared_queue.wait_for_item(0.01)
+
+
+def test_wait_for_item_of_another_process(shared_queue):
+    writer = mp.Process(target=_put_frames, args=(shared_queue, 1))
+    writer.start()
+    assert shared_queue.wait_for_item(5)
+    assert shared_queue.get(timeout=5).get_payload().shape == (8, 8, 3)
+    writer.join()
+
+
+def test_wake_waiters(shared_queue):
+    Timer(0.05, shared_queue.wake_waiters).start()
+    start = time.monotonic()
+    assert not shared_queue.wait_for_item(5)
+    assert time.monotonic() - start < 2
+
+
+def test_frames_from_another_process(shared_queue):
+    writer = mp.Process(target=_put_frames, args=(shared_queue, 5))
+    writer.start()
+    for i in range(5):
+        assert np.array_equal(shared_queue.get(timeout=5).get_payload(),
+                              np.full((8, 8, 3), i, dtype=np.uint8))
+    writer.join()
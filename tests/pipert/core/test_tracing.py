@@ -0,0 +1,125 @@
+import asyncio
+
+import numpy as np
+
+from pipert.core import tracing
+from pipert.core.message import Message
+from pipert.core.message_history import MessageHistory
+from pipert.core.policy_queue import PolicyQueue
+
+
+def create_msg():
+    return Message(np.zeros((2, 2), dtype=np.uint8), "source")
+
+
+def sections_of(msg, stage):
+    return [section for name, section, _ in msg.history if name == stage]
+
+
+def test_queues_record_the_sections_of_the_stage():
+    q = PolicyQueue(maxsize=2)
+    msg = create_msg()
+    producer = tracing.stage_name("Camera", "capture")
+    consumer = tracing.stage_name("Detector", "detect")
+    try:
+        tracing.enter_stage(producer)
+        tracing.start_logic(1)
+        q.put(msg)
+        tracing.end_logic(2)
+
+        tracing.enter_stage(consumer)
+        tracing.start_logic(3)
+        assert q.get() is msg
+        assert tracing.end_logic(4) == [msg]
+    finally:
+        tracing.exit_stage()
+    assert sections_of(msg, producer) == [tracing.LOGIC_START, tracing.ENQUEUED, tracing.LOGIC_END]
+    assert sections_of(msg, consumer) == [tracing.LOGIC_START, tracing.DEQUEUED, tracing.LOGIC_END]
+
+
+def test_the_history_is_left_alone_after_the_message_is_put():
+    q = PolicyQueue(maxsize=2)
+    msg = create_msg()
+    producer = tracing.stage_name("Camera", "capture")
+    try:
+        tracing.enter_stage(producer)
+        tracing.start_logic(1)
+        q.put(msg)
+        entries = list(msg.history)
+        # the consumer owns the message from here on
+        q.put(msg)
+        tracing.end_logic(2)
+    finally:
+        tracing.exit_stage()
+    assert list(msg.history) == entries
+    enqueued = msg.history.get(producer, tracing.ENQUEUED)
+    assert msg.history.get(producer, tracing.LOGIC_END) == enqueued
+
+
+def test_nothing_is_recorded_outside_of_a_stage():
+    q = PolicyQueue(maxsize=2)
+    msg = create_msg()
+    q.put(msg)
+    q.get()
+    assert len(msg.history) == 0
+
+
+def test_nothing_is_recorded_when_tracing_is_disabled():
+    q = PolicyQueue(maxsize=2)
+    msg = create_msg()
+    tracing.set_enabled(False)
+    try:
+        tracing.enter_stage(tracing.stage_name("Camera", "capture"))
+        tracing.start_logic(1)
+        q.put(msg)
+        tracing.end_logic(2)
+    finally:
+        tracing.exit_stage()
+        tracing.set_enabled(True)
+    assert len(msg.history) == 0
+
+
+def test_latency_breakdown():
+    history = MessageHistory()
+    # the capture stage computes the message for 10ns and enqueues it
+    history.record("Camera/capture", tracing.LOGIC_START, 0)
+    history.record("Camera/capture", tracing.ENQUEUED, 10)
+    history.record("Camera/capture", tracing.LOGIC_END, 12)
+    # it waits 20ns for the sender, which sends it through redis
+    history.record("Camera/send", tracing.LOGIC_START, 25)
+    history.record("Camera/send", tracing.DEQUEUED, 30)
+    history.record("Camera/send", tracing.REDIS_SENT, 35)
+    history.record("Camera/send", tracing.LOGIC_END, 36)
+    # it is received 65ns later and computed for 50ns
+    history.record("Detector/receive", tracing.LOGIC_START, 50)
+    history.record("Detector/receive", tracing.REDIS_RECEIVED, 100)
+    history.record("Detector/receive", tracing.LOGIC_END, 150)
+
+    breakdown = tracing.latency_breakdown(history)
+    assert breakdown["total"] == 150 / 1e9
+    assert breakdown["queue_wait"] == 20 / 1e9
+    assert breakdown["transport"] == 65 / 1e9
+    assert [stage["stage"] for stage in breakdown["stages"]] == \
+        ["Camera/capture", "Camera/send", "Detector/receive"]
+    # the time the receiver waited for the message inside main_logic isn't compute
+    assert [stage["compute"] for stage in breakdown["stages"]] == [12 / 1e9, 6 / 1e9, 50 / 1e9]
+
+
+def test_tasks_record_under_their_own_stages():
+    q = PolicyQueue(maxsize=2)
+    msgs = [create_msg(), create_msg()]
+
+    async def put(stage, msg):
+        tracing.enter_stage(stage)
+        tracing.start_logic(1)
+        # the other task enters its stage in the meantime
+        await asyncio.sleep(0.01)
+        q.put(msg)
+        tracing.end_logic(2)
+
+    async def put_in_two_tasks():
+        await asyncio.gather(put("Camera/first", msgs[0]), put("Camera/second", msgs[1]))
+
+    asyncio.run(put_in_two_tasks())
+    assert sections_of(msgs[0], "Camera/first") == [tracing.LOGIC_START, tracing.ENQUEUED, tracing.LOGIC_END]
+    assert sections_of(msgs[1], "Camera/second") == [tracing.LOGIC_START, tracing.ENQUEUED, tracing.LOGIC_END]
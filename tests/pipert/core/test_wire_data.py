@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from pipert.core.wire_data import encode_data, decode_data, register_data_type
+
+
+class Point:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+register_data_type(Point, lambda point: {"x": point.x, "y": point.y}, lambda state: Point(**state))
+
+
+def test_encode_and_decode_data():
+    value = {"id": 1, "score": 0.5, "name": "car", "empty": None, "flags": [True, False],
+             "box": (1, 2, 3, 4), "raw": b"\x00\x01", (1, 2): "tuple key",
+             "array": np.arange(6, dtype=np.uint16).reshape(2, 3), "scalar": np.float32(1.5)}
+    decoded = decode_data(encode_data(value))
+    array = decoded.pop("array")
+    assert array.dtype == np.uint16 and array.shape == (2, 3) and (array == value.pop("array")).all()
+    assert array.flags.writeable
+    scalar = decoded.pop("scalar")
+    assert isinstance(scalar, np.float32) and scalar == value.pop("scalar")
+    assert decoded == value
+
+
+def test_registered_data_type():
+    point = decode_data(encode_data([Point(1, (2, 3))]))[0]
+    assert isinstance(point, Point)
+    assert (point.x, point.y) == (1, (2, 3))
+
+
+def test_unknown_types_are_not_encoded_or_decoded():
+    with pytest.raises(TypeError):
+        encode_data({"object": object()})
+    with pytest.raises(TypeError):
+        encode_data(np.array([object()]))
+    with pytest.raises(ValueError):
+        decode_data(b'{"__pipert_type__": "os.system", "command": "true"}')
@@ -0,0 +1,47 @@
+import os
+
+import pytest
+import yaml
+import zerorpc
+
+from pipert.core.zygote import ComponentZygote
+
+
+@pytest.fixture(scope="function")
+def zygote(monkeypatch):
+    monkeypatch.setenv("PYTHONPATH", os.getcwd())
+    zygote = ComponentZygote(modules=["numpy", "pipert.utils.scripts.component_factory"], folders=[])
+    assert zygote.start(timeout=60)
+    yield zygote
+    zygote.stop()
+
+
+def test_zygote_preloads_modules(zygote):
+    assert zygote.preloaded == ["numpy", "pipert.utils.scripts.component_factory"]
+
+
+def test_fork_component(zygote, tmp_path):
+    config_path = tmp_path / "comp.yaml"
+    config_path.write_text(yaml.dump({"comp": {"queues": ["queue"], "routines": {}}}))
+    process = zygote.fork_component("comp", str(config_path), 21999)
+    try:
+        assert process.serving_event.wait(30)
+        assert process.poll() is None
+        client = zerorpc.Client()
+        client.connect("tcp://localhost:21999")
+        assert client.does_queue_exist("queue")
+        assert client.is_ready()
+        assert not process.ready_event.is_set()
+        client.run_comp()
+        assert process.ready_event.wait(30)
+        client.close()
+    finally:
+        process.kill()
+    assert process.wait(10) == -9
+
+
+def test_fork_component_that_fails(zygote, tmp_path):
+    process = zygote.fork_component("comp", str(tmp_path / "missing.yaml"), 21998)
+    assert process.serving_event.wait(30)
+    assert process.ready_event.is_set()
+    assert process.wait(10) == 1
@@ -6,6 +6,9 @@ if os.environ.get('TORCHVISION', 'no') == 'yes':
 else:
     from multiprocessing import Event
 import logging
+from queue import Empty, Full
+import numpy as np
+from pipert.core.message import Message
 
 
 class DummyCrashingRoutine(Routine):
@@ -113,3 +116,68 @@ class DummyRoutineWithQueue(Routine):
     def does_routine_use_queue(self, queue):
         return self.queue == queue
 
+
+class DummyConsumerRoutine(Routine):
+    def __init__(self, in_queue, *args, **kwargs):
+        super().__init__(logger=logging.getLogger("test_logs.log"), *args, **kwargs)
+        self.in_queue = in_queue
+        self.items = []
+
+    def main_logic(self, *args, **kwargs):
+        try:
+            self.items.append(self.in_queue.get(block=False))
+            return True
+        except Empty:
+            return False
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "in_queue": "QueueIn"
+        })
+        return dicts
+
+    def get_input_queues(self):
+        return [self.in_queue]
+
+    def does_routine_use_queue(self, queue):
+        return self.in_queue == queue
+
+
+class DummyFrameProducerRoutine(Routine):
+    def __init__(self, out_queue, frame_shape=(4, 4, 3), *args, **kwargs):
+        super().__init__(logger=logging.getLogger("test_logs.log"), *args, **kwargs)
+        self.out_queue = out_queue
+        self.frame_shape = frame_shape
+
+    def main_logic(self, *args, **kwargs):
+        frame = np.full(self.frame_shape, self.state.count % 256, dtype=np.uint8)
+        try:
+            self.out_queue.put(Message(frame, "producer"), timeout=0.1)
+            return True
+        except Full:
+            return False
+
+    def setup(self, *args, **kwargs):
+        pass
+
+    def cleanup(self, *args, **kwargs):
+        pass
+
+    @staticmethod
+    def get_constructor_parameters():
+        dicts = Routine.get_constructor_parameters()
+        dicts.update({
+            "out_queue": "QueueOut"
+        })
+        return dicts
+
+    def does_routine_use_queue(self, queue):
+        return self.out_queue == queue
@@ -0,0 +1,62 @@
+from pipert.utils.scripts.bench import build_bench_config, run_benchmark, summarize_latencies
+
+COMPONENT_CONFIG = {
+    "comp": {
+        "queues": ["frames"],
+        "monitoring_system": {"name": "Prometheus", "port": 8081},
+        "routines": {
+            "from_redis": {
+                "routine_type_name": "MessageFromRedis",
+                "redis_read_key": "cam",
+                "message_queue": "frames"
+            },
+            "upload_redis": {
+                "routine_type_name": "MessageToRedis",
+                "redis_send_key": "camera:1",
+                "message_queue": "frames",
+                "max_stream_length": 10
+            }
+        }
+    }
+}
+
+
+def test_build_bench_config():
+    bench_config = build_bench_config(COMPONENT_CONFIG, fps=100, width=32, height=24)
+    assert bench_config == {
+        "comp": {
+            "queues": ["frames"],
+            "routines": {
+                "from_redis": {
+                    "routine_type_name": "SyntheticFrameSource",
+                    "out_queue": "frames",
+                    "fps": 100,
+                    "width": 32,
+                    "height": 24,
+                    "execution_mode": "thread"
+                },
+                "sink_frames": {
+                    "routine_type_name": "CountingSink",
+                    "in_queue": "frames"
+                }
+            }
+        }
+    }
+
+
+def test_summarize_latencies():
+    summary = summarize_latencies([i * 1000000 for i in range(1, 101)])
+    assert summary["max"] == 100
+    assert 50 <= summary["p50"] <= 51
+    assert 99 <= summary["p99"] <= 100
+    assert summarize_latencies([]) is None
+
+
+def test_run_benchmark():
+    results = run_benchmark(COMPONENT_CONFIG, duration=0.5, warmup=0.1, fps=100, width=32, height=24)
+    assert results["frames"] > 0
+    assert results["fps"] > 0
+    assert results["latency_ms"]["p50"] >= 0
+    assert results["sinks"]["sink_frames"]["queue"] == "frames"
+    assert "frames" in results["queues"]
+    assert set(results["routines"]) == {"from_redis", "sink_frames"}